@@ -0,0 +1 @@
+# Grants Agent Package
@@ -1,11 +1,10 @@
 import streamlit as st
-import json
-import faiss
-import numpy as np
-import openai
 from dotenv import load_dotenv
 import os
-import requests
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables BEFORE any Streamlit commands
 load_dotenv()
@@ -14,168 +13,95 @@ load_dotenv()
 st.set_page_config(page_title="USDA Grants Finder", layout="wide")
 
 # Now load other configs
-openai.api_key = os.getenv("OPENAI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
-EMBED_MODEL = "text-embedding-3-large"
 LLM_MODEL = "gpt-4o"
 
-# Load FAISS index and metadata
-FAISS_INDEX_PATH = "usda_grants.faiss"
-META_PATH = "usda_grants_meta.json"
+STRATEGY_BADGES = {
+    "local_only": "📁 Local Database",
+    "web_only": "🌐 Web Search",
+    "hybrid": "🔄 Local + Web"
+}
 
-index = faiss.read_index(FAISS_INDEX_PATH)
-with open(META_PATH, "r", encoding="utf-8") as f:
-    programs = json.load(f)
+# Chat history entries rendered in full; older ones are paged on request
+RECENT_ENTRIES = 6
+HISTORY_PAGE_SIZE = 10
 
-# --- NEW: Match Score Calculator ---
-def calculate_match_score(program, farmer_profile):
-    """Calculate 0-100 match score based on farmer profile"""
-    score = 50  # Base score
-    
-    if not farmer_profile:
-        return score
-    
-    eligibility = " ".join(program.get("eligibility", [])).lower()
-    
-    # Boost for beginning farmers
-    if farmer_profile.get("beginning_farmer") and "beginning" in eligibility:
-        score += 30
-    
-    # Boost for veterans
-    if farmer_profile.get("veteran") and "veteran" in eligibility:
-        score += 20
-    
-    return min(score, 100)
-
-# --- NEW: Simple Checklist Generator ---
-def generate_simple_checklist(program):
-    """Generate a simple application checklist"""
-    
-    checklist_text = f"""## Application Checklist for {program.get('program_name')}
-
-### ✅ Before You Start
-- [ ] Read full program details at: {program.get('official_url')}
-- [ ] Check deadline: {program.get('application_deadlines')}
-- [ ] Confirm you meet eligibility requirements
-
-### 📋 Required Documents
-"""
-    
-    for doc in program.get('required_documents', []):
-        checklist_text += f"- [ ] {doc}\n"
-    
-    checklist_text += f"""
-### 📞 Contact Information
-If you have questions, contact: {program.get('contact_info')}
+WEB_RESULTS_COUNT = 5
 
-### 🚀 Next Steps
-1. Gather all required documents
-2. Contact your local office for guidance
-3. Submit application via: {program.get('application_method')}
+# Words that mean the user wants current information only the web can give
+WEB_INDICATORS = [
+    "latest", "recent", "new", "current", "2025", "2026",
+    "updated", "changes", "announcement", "news"
+]
 
-### 💡 Eligibility Requirements
-"""
-    
-    for req in program.get('eligibility', []):
-        checklist_text += f"- {req}\n"
-    
-    return checklist_text
+# Load FAISS index and metadata (shared with the rest of the grants pipeline so
+# query and index embeddings always have the same model and dimensions)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grants_agent import embeddings, prompting, search
+from shared import llm_gateway
 
 # --- Web Search Function ---
-def web_search_brave(query, num_results=5):
-    """Search using Brave Search API"""
+def web_search_brave(query, num_results=5, prefetched=None):
+    """
+    Search using Brave Search API (cached, quota-governed).
+    
+    `prefetched` is a future for a search already started in the background;
+    its outcome is reported here, on the Streamlit script thread.
+    """
     if not BRAVE_API_KEY:
         st.error("⚠️ BRAVE_API_KEY not found in .env file!")
         return None
     
-    url = "https://api.search.brave.com/res/v1/web/search"
-    headers = {
-        "Accept": "application/json",
-        "X-Subscription-Token": BRAVE_API_KEY
-    }
-    params = {
-        "q": query,
-        "count": num_results
-    }
-    
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        web_results = data.get("web", {}).get("results", [])
-        for item in web_results:
-            results.append({
-                "title": item.get("title", ""),
-                "snippet": item.get("description", ""),
-                "link": item.get("url", "")
-            })
-        
-        return results
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 401:
+        if prefetched is not None:
+            results, source = prefetched.result()
+        else:
+            results, source = search.cached_web_search(query, num_results)
+    except ValueError as e:
+        if "Invalid" in str(e):
             st.error("🔑 Invalid Brave API key. Check your .env file.")
-        elif e.response.status_code == 429:
-            st.error("⏱️ Rate limit exceeded. You've used your monthly quota.")
         else:
             st.error(f"❌ Brave API error: {str(e)}")
         return None
     except Exception as e:
         st.error(f"❌ Web search error: {str(e)}")
         return None
+    
+    # Degraded results are still usable; just say where they came from
+    if source == "stale_cache":
+        st.info("📦 Showing saved web results to conserve the monthly Brave quota.")
+    elif source in ("quota", "rate_limited"):
+        st.info("📁 Web search skipped to conserve the monthly Brave quota - answering from the local database.")
+    
+    return results
 
 # --- Helper Functions ---
-def embed_query(query):
-    """Create embedding for query"""
-    try:
-        resp = openai.Embedding.create(model=EMBED_MODEL, input=query)
-        return np.array(resp["data"][0]["embedding"]).astype("float32")
-    except Exception as e:
-        st.error(f"Embedding error: {str(e)}")
-        return None
-
 def search_local_programs(query, top_k=5, relevance_threshold=1.2):
-    """Search local FAISS database with confidence scoring and match scores"""
-    q_emb = embed_query(query)
-    if q_emb is None:
-        return [], 999
-    
-    D, I = index.search(np.array([q_emb]), top_k)
-    
-    results = []
-    for idx, distance in zip(I[0], D[0]):
-        if distance < relevance_threshold:
-            program = programs[idx].copy()
-            program["_distance"] = float(distance)
-            program["_confidence"] = 1 / (1 + distance)
-            
-            # NEW: Calculate match score
-            program["_match_score"] = calculate_match_score(program, st.session_state.farmer_profile)
-            
-            results.append(program)
-    
-    # Sort by match score (highest first)
-    results.sort(key=lambda x: x.get("_match_score", 0), reverse=True)
-    
-    avg_distance = float(np.mean(D[0])) if len(D[0]) > 0 else 999.0
-    
-    return results, avg_distance
+    """Search local FAISS + keyword indexes with confidence scoring and match scores"""
+    # Dense search falls back to offline embeddings if the OpenAI call fails,
+    # BM25 keyword hits are fused in, and match scores come from the shared
+    # eligibility scorer
+    return embeddings.search_local_programs(
+        query, st.session_state.farmer_profile, top_k, relevance_threshold
+    )
+
+def needs_web_search(query):
+    """True if the query asks for current information (known before any search)"""
+    query_lower = query.lower()
+    return any(indicator in query_lower for indicator in WEB_INDICATORS)
 
 def decide_search_strategy(query, local_results, avg_distance):
     """Decide whether to use local data, web search, or both"""
-    query_lower = query.lower()
+    needs_web = needs_web_search(query)
     
-    web_indicators = [
-        "latest", "recent", "new", "current", "2025", "2026",
-        "updated", "changes", "announcement", "news"
-    ]
+    # An exact keyword/acronym hit (e.g. "FSMIP") is answerable locally even
+    # when the embedding distance alone looks weak
+    exact_match = any(p.get("_lexical_score", 0) >= embeddings.LEXICAL_MATCH_SCORE for p in local_results)
     
-    needs_web = any(indicator in query_lower for indicator in web_indicators)
-    
-    local_is_good = len(local_results) > 0 and avg_distance < 1.0
-    local_is_moderate = len(local_results) > 0 and avg_distance < 1.5
-    local_is_poor = avg_distance >= 1.5
+    local_is_good = len(local_results) > 0 and (avg_distance < 1.0 or exact_match)
+    local_is_moderate = len(local_results) > 0 and (avg_distance < 1.5 or exact_match)
+    local_is_poor = avg_distance >= 1.5 and not exact_match
     
     if local_is_poor:
         return "web_only"
@@ -186,138 +112,168 @@ def decide_search_strategy(query, local_results, avg_distance):
     else:
         return "hybrid"
 
-def generate_hybrid_response(query, local_results, web_results, strategy, conversation_history=None):
-    """Generate response using local data, web data, or both"""
-    # Build local context
-    local_context = ""
-    if local_results:
-        local_parts = []
-        for i, program in enumerate(local_results, 1):
-            eligibility_str = ", ".join(program.get("eligibility", []))
-            match_score = program.get("_match_score", 50)
-            
-            local_parts.append(f"""
-Local Program {i}: {program.get("program_name", "N/A")}
-- Match Score: {match_score}/100
-- Match Confidence: {program.get("_confidence", 0):.2f}
-- Type: {program.get("program_type", "N/A")}
-- Agency: {program.get("agency", "N/A")}
-- Eligibility: {eligibility_str}
-- Funding: {program.get("funding_amount", "N/A")}
-- Application Method: {program.get("application_method", "N/A")}
-- Deadlines: {program.get("application_deadlines", "N/A")}
-- URL: {program.get("official_url", "N/A")}
-""")
-        local_context = "\n---\n".join(local_parts)
-    
-    # Build web context
-    web_context = ""
-    if web_results:
-        web_parts = []
-        for i, result in enumerate(web_results, 1):
-            web_parts.append(f"""
-Web Result {i}: {result.get("title", "N/A")}
-- Snippet: {result.get("snippet", "N/A")}
-- Source: {result.get("link", "N/A")}
-""")
-        web_context = "\n---\n".join(web_parts)
-    
-    # Create system prompt based on strategy
-    farmer_context = ""
-    if st.session_state.farmer_profile:
-        profile = st.session_state.farmer_profile
-        farmer_context = f"""
-**Farmer Profile:**
-- Beginning Farmer: {profile.get('beginning_farmer', False)}
-- Veteran: {profile.get('veteran', False)}
-- State: {profile.get('state', 'Not specified')}
+def web_search_query(query):
+    return f"USDA grants {query}"
 
-Use this profile to personalize your recommendations and highlight programs that are especially good matches.
-"""
+def retrieve(query, top_k=5):
+    """
+    Run local search, strategy and web search for a query.
     
-    if strategy == "web_only":
-        system_prompt = f"""You are a USDA grants expert assistant. 
-
-{farmer_context}
-
-The user asked: "{query}"
-
-I searched my local database of 8 USDA programs, but couldn't find relevant matches.
-
-However, I found current information from the web:
-
-**Web Search Results:**
-{web_context}
-
-**Instructions:**
-- Answer based on the web results
-- Cite sources with clickable links in markdown format: [Source Name](URL)
-- Be clear that this info is from web search
-- If web results don't fully answer the question, say so
-- Suggest checking official USDA websites for complete details
-- Be conversational and helpful"""
-
-    elif strategy == "local_only":
-        system_prompt = f"""You are a USDA grants expert with a database of 8 programs.
-
-{farmer_context}
-
-**Local Database Programs (sorted by match score):**
-{local_context}
-
-**Instructions:**
-- Answer based on your local database
-- Prioritize programs with higher match scores
-- Be specific about which programs match the user's needs
-- Include eligibility criteria and application details
-- Provide official URLs from the programs
-- Be conversational and helpful
-- If asked about programs not in the database, say so clearly"""
-
-    else:  # hybrid
-        system_prompt = f"""You are a USDA grants expert with both a local database AND web search capabilities.
-
-{farmer_context}
-
-**Local Database Results (sorted by match score):**
-{local_context}
-
-**Web Search Results:**
-{web_context}
-
-**Instructions:**
-- Combine information from both sources for a comprehensive answer
-- Prioritize local programs with higher match scores
-- Use local database for structured program details (eligibility, funding, deadlines)
-- Use web results for updates, recent changes, or additional context
-- Clearly distinguish between local database info and web sources
-- Cite web sources with links: [Source](URL)
-- Provide actionable next steps
-- Be conversational and helpful"""
-
-    messages = [{"role": "system", "content": system_prompt}]
-    
-    if conversation_history:
-        for entry in conversation_history[-6:]:
-            if entry["role"] in ["user", "assistant"]:
-                content = entry["content"] if entry["role"] == "user" else entry.get("text", "")
-                messages.append({
-                    "role": entry["role"],
-                    "content": content
-                })
+    When the query's wording already predicts a web search, the Brave call is
+    started in the background so it overlaps the embedding round trip instead
+    of waiting for it. The web results are dropped if the strategy still comes
+    out local-only.
     
-    messages.append({"role": "user", "content": query})
+    Returns (local_results, avg_distance, strategy, web_results).
+    """
+    search_query = web_search_query(query)
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        web_future = None
+        if BRAVE_API_KEY and needs_web_search(query):
+            web_future = executor.submit(search.cached_web_search, search_query, WEB_RESULTS_COUNT)
+        
+        local_results, avg_distance = search_local_programs(query, top_k=top_k)
+        strategy = decide_search_strategy(query, local_results, avg_distance)
+        
+        web_results = None
+        if strategy in ["web_only", "hybrid"]:
+            web_results = web_search_brave(search_query, num_results=WEB_RESULTS_COUNT, prefetched=web_future)
+        elif web_future is not None:
+            web_future.cancel()
+    finally:
+        executor.shutdown(wait=False)
     
+    return local_results, avg_distance, strategy, web_results
+
+def generate_hybrid_response(query, local_results, web_results, strategy, conversation_history=None):
+    """
+    Generate response using local data, web data, or both.
+    
+    The prompt is assembled under a token budget (see prompting.py). Returns
+    (text_stream, prompt_stats); text_stream yields the answer as it is
+    generated so the UI can render it incrementally.
+    """
+    messages, prompt_stats = prompting.build_messages(
+        query,
+        local_results,
+        web_results,
+        strategy,
+        conversation_history,
+        st.session_state.farmer_profile,
+        program_details_by_id=embeddings.program_prompt_details
+    )
+    return stream_chat(messages), prompt_stats
+
+def stream_chat(messages):
+    """Yield chat completion text chunks as they arrive (via the shared LLM gateway)"""
     try:
-        response = openai.ChatCompletion.create(
+        yield from llm_gateway.stream_chat(
+            "grants",
+            messages,
             model=LLM_MODEL,
-            messages=messages,
             temperature=0.6,
             max_tokens=1200
         )
-        return response.choices[0].message.content
     except Exception as e:
-        return f"Error generating response: {str(e)}"
+        yield f"Error generating response: {str(e)}"
+
+def timed_stream(chunks, start, timings):
+    """Pass chunks through, recording seconds from `start` to the first one"""
+    for chunk in chunks:
+        if "ttft" not in timings:
+            timings["ttft"] = time.perf_counter() - start
+        yield chunk
+
+# --- Chat History Rendering ---
+def render_programs(programs, turn):
+    """Program cards with match scores and checklists"""
+    with st.expander(f"📁 Recommended Programs ({len(programs)})"):
+        for idx, prog in enumerate(programs):
+            prog_name = prog.get("program_name", "Unknown")
+            confidence = prog.get("_confidence", 0)
+            match_score = prog.get("_match_score", 50)
+            
+            # Color code the match score
+            if match_score >= 70:
+                badge = "🟢 Great Match"
+                color = "green"
+            elif match_score >= 50:
+                badge = "🟡 Good Match"
+                color = "orange"
+            else:
+                badge = "🔴 Possible Match"
+                color = "red"
+            
+            st.markdown(f"### {badge}: {prog_name}")
+            st.markdown(f"**Match Score:** :{color}[{match_score}/100]")
+            st.markdown(f"**Search Relevance:** {confidence:.0%}")
+            st.markdown(f"**Funding:** {prog.get('funding_amount', 'N/A')}")
+            st.markdown(f"**Deadline:** {prog.get('application_deadlines', 'N/A')}")
+            st.markdown(f"**Type:** {prog.get('program_type', 'N/A')}")
+            
+            # NEW: Checklist button (rendered once per program at load)
+            checklist_data = embeddings.program_artifact(prog, "checklist")
+            col_a, col_b = st.columns(2)
+            with col_a:
+                if st.button(f"📝 Get Checklist", key=f"checklist_{turn}_{idx}"):
+                    st.markdown(checklist_data)
+            
+            with col_b:
+                # Download checklist
+                st.download_button(
+                    "⬇️ Download",
+                    data=checklist_data,
+                    file_name=f"{prog.get('program_id', 'program')}_checklist.md",
+                    mime="text/markdown",
+                    key=f"download_{turn}_{idx}"
+                )
+            
+            st.markdown("---")
+
+def render_web_results(web_results):
+    with st.expander(f"🌐 Web Results ({len(web_results)})"):
+        for result in web_results:
+            title = result.get("title", "No title")
+            link = result.get("link", "#")
+            snippet = result.get("snippet", "")
+            st.markdown(f"**[{title}]({link})**")
+            st.caption(snippet)
+            st.markdown("---")
+
+def render_entry(entry, turn, detailed=True):
+    """
+    Render one history entry. Assistant turns hold program references and the
+    web query, resolved against the program store and search cache only when
+    shown in detail.
+    """
+    if entry["role"] == "user":
+        st.markdown(f"**You:** {entry['content']}")
+        return
+    if entry["role"] != "assistant":
+        return
+    
+    st.markdown(f"**Assistant:** {entry['text']}")
+    
+    if entry.get("strategy"):
+        caption = f"Source: {STRATEGY_BADGES.get(entry['strategy'], 'Unknown')}"
+        if entry.get("prompt_tokens"):
+            caption += f" · Prompt: {entry['prompt_tokens']:,} tokens"
+        if entry.get("ttft") is not None:
+            caption += f" · First words in {entry['ttft']:.1f}s"
+        st.caption(caption)
+    
+    if not detailed:
+        return
+    
+    programs = [p for p in map(embeddings.resolve_program, entry.get("programs") or []) if p]
+    if programs:
+        render_programs(programs, turn)
+    
+    if entry.get("web_query"):
+        web_results = search.search_cache.get(entry["web_query"], WEB_RESULTS_COUNT, allow_stale=True)
+        if web_results:
+            render_web_results(web_results)
 
 # --- Streamlit UI ---
 
@@ -330,7 +286,7 @@ if not BRAVE_API_KEY:
     st.info("Get a free API key at: https://brave.com/search/api/")
     st.stop()
 
-if not openai.api_key:
+if not OPENAI_API_KEY:
     st.error("⚠️ OPENAI_API_KEY not found! Add it to your .env file.")
     st.stop()
 
@@ -353,76 +309,25 @@ col1, col2 = st.columns([2, 1])
 with col1:
     st.subheader("💬 Chat")
     
-    # Display conversation
-    for entry in st.session_state.history:
-        if entry["role"] == "user":
-            st.markdown(f"**You:** {entry['content']}")
-        elif entry["role"] == "assistant":
-            st.markdown(f"**Assistant:** {entry['text']}")
-            
-            strategy_badges = {
-                "local_only": "📁 Local Database",
-                "web_only": "🌐 Web Search",
-                "hybrid": "🔄 Local + Web"
-            }
-            if entry.get("strategy"):
-                st.caption(f"Source: {strategy_badges.get(entry['strategy'], 'Unknown')}")
-            
-            # NEW: Enhanced program display with match scores and checklists
-            if entry.get("local_programs"):
-                with st.expander(f"📁 Recommended Programs ({len(entry['local_programs'])})"):
-                    for idx, prog in enumerate(entry["local_programs"]):
-                        prog_name = prog.get("program_name", "Unknown")
-                        confidence = prog.get("_confidence", 0)
-                        match_score = prog.get("_match_score", 50)
-                        
-                        # Color code the match score
-                        if match_score >= 70:
-                            badge = "🟢 Great Match"
-                            color = "green"
-                        elif match_score >= 50:
-                            badge = "🟡 Good Match"
-                            color = "orange"
-                        else:
-                            badge = "🔴 Possible Match"
-                            color = "red"
-                        
-                        st.markdown(f"### {badge}: {prog_name}")
-                        st.markdown(f"**Match Score:** :{color}[{match_score}/100]")
-                        st.markdown(f"**Search Relevance:** {confidence:.0%}")
-                        st.markdown(f"**Funding:** {prog.get('funding_amount', 'N/A')}")
-                        st.markdown(f"**Deadline:** {prog.get('application_deadlines', 'N/A')}")
-                        st.markdown(f"**Type:** {prog.get('program_type', 'N/A')}")
-                        
-                        # NEW: Checklist button
-                        col_a, col_b = st.columns(2)
-                        with col_a:
-                            if st.button(f"📝 Get Checklist", key=f"checklist_{idx}_{len(st.session_state.history)}"):
-                                checklist = generate_simple_checklist(prog)
-                                st.markdown(checklist)
-                        
-                        with col_b:
-                            # Download checklist
-                            checklist_data = generate_simple_checklist(prog)
-                            st.download_button(
-                                "⬇️ Download",
-                                data=checklist_data,
-                                file_name=f"{prog.get('program_id', 'program')}_checklist.md",
-                                mime="text/markdown",
-                                key=f"download_{idx}_{len(st.session_state.history)}"
-                            )
-                        
-                        st.markdown("---")
-            
-            if entry.get("web_results"):
-                with st.expander(f"🌐 Web Results ({len(entry['web_results'])})"):
-                    for result in entry["web_results"]:
-                        title = result.get("title", "No title")
-                        link = result.get("link", "#")
-                        snippet = result.get("snippet", "")
-                        st.markdown(f"**[{title}]({link})**")
-                        st.caption(snippet)
-                        st.markdown("---")
+    # Display conversation: recent turns in full, older ones only on request
+    history = st.session_state.history
+    older = history[:-RECENT_ENTRIES] if len(history) > RECENT_ENTRIES else []
+    if older:
+        if st.toggle(f"🕘 Show {len(older)} earlier messages", key="show_earlier"):
+            n_pages = math.ceil(len(older) / HISTORY_PAGE_SIZE)
+            page = n_pages
+            if n_pages > 1:
+                page = st.number_input("Page", min_value=1, max_value=n_pages, value=n_pages, key="history_page")
+            first = (page - 1) * HISTORY_PAGE_SIZE
+            for turn in range(first, min(first + HISTORY_PAGE_SIZE, len(older))):
+                render_entry(older[turn], turn, detailed=False)
+            st.markdown("---")
+    
+    for turn in range(len(older), len(history)):
+        render_entry(history[turn], turn)
+    
+    # The answer to a new question streams in here, below the history
+    response_area = st.container()
     
     # Input
     user_input = st.text_input(
@@ -514,8 +419,9 @@ with col2:
     
     st.markdown("---")
     st.caption("**API Usage:**")
-    st.caption("• Brave: 2,000 searches/month")
-    st.caption("• OpenAI: Pay per token")
+    st.caption(f"• Brave: {search.quota.used():,}/{search.BRAVE_MONTHLY_QUOTA:,} searches this month (repeat queries are cached)")
+    grants_usage = llm_gateway.stats().get("grants", {})
+    st.caption(f"• OpenAI: Pay per token ({grants_usage.get('prompt_tokens', 0) + grants_usage.get('completion_tokens', 0):,} used by this server)")
 
 # Footer
 st.markdown("---")
@@ -525,38 +431,45 @@ st.caption("🔒 Your data is stored locally and never shared")
 if st.session_state.pending_query:
     query = st.session_state.pending_query
     st.session_state.pending_query = None
+    start = time.perf_counter()
     
     st.session_state.history.append({"role": "user", "content": query})
     
-    with st.spinner("🔍 Searching local database and web..."):
-        # Step 1: Search local database
-        local_results, avg_distance = search_local_programs(query, top_k=5)
+    with response_area:
+        st.markdown(f"**You:** {query}")
         
-        # Step 2: Decide strategy
-        strategy = decide_search_strategy(query, local_results, avg_distance)
+        with st.spinner("🔍 Searching local database and web..."):
+            # Steps 1-3: Local search, strategy, and web search if needed (started
+            # alongside the local search when the query predicts it)
+            local_results, avg_distance, strategy, web_results = retrieve(query, top_k=5)
         
-        # Step 3: Web search if needed
-        web_results = None
-        if strategy in ["web_only", "hybrid"]:
-            search_query = f"USDA grants {query}"
-            web_results = web_search_brave(search_query, num_results=5)
+        # Retrieval metadata shows before the answer starts
+        st.caption(f"Source: {STRATEGY_BADGES.get(strategy, 'Unknown')}")
+        if local_results:
+            st.caption("📁 " + " · ".join(p.get("program_name", "Unknown") for p in local_results))
         
-        # Step 4: Generate response
-        response_text = generate_hybrid_response(
+        # Step 4: Generate response, rendered as it streams
+        text_stream, prompt_stats = generate_hybrid_response(
             query,
             local_results,
             web_results,
             strategy,
             st.session_state.history[:-1]
         )
+        timings = {}
+        st.markdown("**Assistant:**")
+        response_text = st.write_stream(timed_stream(text_stream, start, timings))
         
-        # Save to history
+        # Save to history: program IDs and scores, and the web query (its
+        # results stay in the search cache) rather than full copies
         st.session_state.history.append({
             "role": "assistant",
             "text": response_text,
-            "local_programs": local_results,
-            "web_results": web_results,
-            "strategy": strategy
+            "programs": [embeddings.program_ref(p) for p in local_results],
+            "web_query": web_search_query(query) if web_results else None,
+            "strategy": strategy,
+            "prompt_tokens": prompt_stats["prompt_tokens"],
+            "ttft": timings.get("ttft")
         })
     
     st.rerun()
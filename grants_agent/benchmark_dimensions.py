@@ -0,0 +1,128 @@
+"""
+Benchmark reduced-dimension grant embeddings.
+
+Compares 256/512/1024-dim vectors against the full 3072-dim index on:
+- retrieval quality: recall@k of the full-size top-k results
+- speed: mean FAISS search time per query
+- memory: index size and bytes per vector
+
+Usage (from the repo root):
+    python -m grants_agent.benchmark_dimensions
+    python -m grants_agent.benchmark_dimensions --corpus-size 50000 --offline
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from .embeddings import (
+    EMBED_MODEL,
+    EMBED_NATIVE_DIMENSIONS,
+    FAISS_INDEX_PATH,
+    reduce_embeddings,
+)
+from shared import llm_gateway
+
+BENCHMARK_QUERIES = [
+    "What programs are available for beginning farmers?",
+    "What are the latest USDA grants for 2025?",
+    "How can I get help with organic certification costs?",
+    "operating loans for seed and fertilizer",
+    "housing for farm workers",
+    "crop insurance against drought",
+    "grants for farmers markets and CSAs",
+    "specialty crop block grant for fruit growers",
+    "marketing research funding for state departments of agriculture",
+    "veteran farmer loans",
+]
+
+def load_program_vectors():
+    """Read the full-size program vectors back out of the FAISS index"""
+    full_index = faiss.read_index(FAISS_INDEX_PATH)
+    return full_index.reconstruct_n(0, full_index.ntotal)
+
+def embed_benchmark_queries():
+    """Embed the benchmark queries once at full size (one batched request)"""
+    return np.array(llm_gateway.embed("benchmark", BENCHMARK_QUERIES, model=EMBED_MODEL), dtype="float32")
+
+def perturb(vectors, count, noise, rng):
+    """Sample `count` unit vectors scattered around the given ones"""
+    base = vectors[rng.integers(0, len(vectors), size=count)]
+    sampled = base + rng.normal(scale=noise, size=base.shape).astype("float32")
+    faiss.normalize_L2(sampled)
+    return sampled
+
+def recall_at_k(reference, candidate):
+    """Mean fraction of the reference top-k ids recovered in the candidate top-k"""
+    hits = [len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference, candidate)]
+    return float(np.mean(hits))
+
+def time_search(search_index, queries, k, repeats):
+    """Mean per-query search time in microseconds"""
+    search_index.search(queries, k)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        search_index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeats * len(queries)) * 1e6
+
+def run_benchmark(corpus, queries, dimensions, k, repeats):
+    """Return one result row per dimension, using full-size search as ground truth"""
+    k = min(k, len(corpus))
+    full_index = faiss.IndexFlatL2(corpus.shape[1])
+    full_index.add(corpus)
+    _, reference = full_index.search(queries, k)
+
+    rows = []
+    for dims in dimensions:
+        if dims == corpus.shape[1]:
+            search_index, reduced_queries = full_index, queries
+        else:
+            search_index = faiss.IndexFlatL2(dims)
+            search_index.add(reduce_embeddings(corpus, dims))
+            reduced_queries = reduce_embeddings(queries, dims)
+
+        _, found = search_index.search(reduced_queries, k)
+        rows.append({
+            "dimensions": dims,
+            "recall": recall_at_k(reference, found),
+            "search_us": time_search(search_index, reduced_queries, k, repeats),
+            "index_mb": search_index.ntotal * dims * 4 / 1e6,
+            "bytes_per_vector": dims * 4,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256, 512, 1024, EMBED_NATIVE_DIMENSIONS])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--corpus-size", type=int, default=0,
+                        help="Pad the corpus with perturbed program vectors to this size (0 = real programs only)")
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--offline", action="store_true",
+                        help="Use perturbed program vectors as queries instead of calling the embeddings API")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    programs = load_program_vectors()
+
+    corpus = programs
+    if args.corpus_size > len(programs):
+        corpus = np.vstack([programs, perturb(programs, args.corpus_size - len(programs), args.noise, rng)])
+
+    if args.offline:
+        queries = perturb(programs, len(BENCHMARK_QUERIES), args.noise * 2, rng)
+    else:
+        queries = embed_benchmark_queries()
+
+    print(f"Corpus: {len(corpus)} vectors | Queries: {len(queries)} | k={args.k}")
+    print(f"{'dims':>6} {'recall@k':>9} {'search µs/query':>16} {'index MB':>9} {'bytes/vector':>13}")
+    for row in run_benchmark(corpus, queries, args.dimensions, args.k, args.repeats):
+        print(f"{row['dimensions']:>6} {row['recall']:>9.3f} {row['search_us']:>16.1f} "
+              f"{row['index_mb']:>9.2f} {row['bytes_per_vector']:>13}")
+
+if __name__ == "__main__":
+    main()
@@ -29,4 +29,54 @@ If you have questions, contact: {program.get('contact_info')}
     for req in program.get('eligibility', []):
         checklist_text += f"- {req}\n"
     
-    return checklist_text
\ No newline at end of file
+    return checklist_text
+
+def generate_application_steps(program):
+    """Short application checklist shown with each grant in the advisory workflow"""
+    return f"""
+- [ ] Review full eligibility requirements at {program.get('official_url')}
+- [ ] Check application deadline: {program.get('application_deadlines')}
+- [ ] Gather required documents (see list above)
+- [ ] Prepare farm/business plan
+- [ ] Contact {program.get('agency')} for guidance
+- [ ] Submit application through official portal
+"""
+
+def generate_checklist_file(program):
+    """Downloadable checklist for the advisory workflow (per-farmer notes are appended by the caller)"""
+    eligibility = "\n".join(f"- {req}" for req in program.get('eligibility', []))
+    documents = "\n".join(f"- {doc}" for doc in program.get('required_documents') or ['See program website'])
+    return f"""# Application Checklist for {program.get('program_name')}
+
+## Program Information
+- **Agency:** {program.get('agency')}
+- **Type:** {program.get('program_type')}
+- **Funding:** {program.get('funding_amount')}
+- **Deadline:** {program.get('application_deadlines')}
+
+## Eligibility Requirements
+{eligibility}
+
+## Required Documents
+{documents}
+
+## Application Steps
+1. Review full program details at: {program.get('official_url')}
+2. Verify you meet all eligibility requirements
+3. Gather all required documents
+4. Prepare detailed farm/business plan
+5. Contact {program.get('contact_info') or 'local USDA office'} for guidance
+6. Submit application before deadline: {program.get('application_deadlines')}
+"""
+
+def program_details(program):
+    """Query-independent part of a program's prompt context (precompiled per program)"""
+    eligibility_str = ", ".join(program.get("eligibility", []))
+    return f"""- Type: {program.get("program_type", "N/A")}
+- Agency: {program.get("agency", "N/A")}
+- Eligibility: {eligibility_str}
+- Funding: {program.get("funding_amount", "N/A")}
+- Application Method: {program.get("application_method", "N/A")}
+- Deadlines: {program.get("application_deadlines", "N/A")}
+- URL: {program.get("official_url", "N/A")}
+"""
@@ -1,54 +1,415 @@
-from openai import OpenAI
 import numpy as np
 import faiss
 import json
 import os
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .filters import ProgramFilters, search_parameters
+from .checklist_generator import (
+    generate_application_steps,
+    generate_checklist_file,
+    generate_simple_checklist,
+    program_details,
+)
+from .lexical import LEXICAL_MATCH_SCORE, BM25Index, reciprocal_rank_fusion
+from .local_embeddings import HashedTfidfVectorizer
+from .scoring import EligibilityScorer
+from shared import llm_gateway
+
+# Embedding requests go through the shared LLM gateway (concurrency cap,
+# retries, usage counters). A query embedding should fail fast so search can
+# fall back to the offline backend, so each attempt is short and retried once
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "5"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "1"))
+# Label of embedding calls in the gateway's per-agent counters
+EMBED_AGENT = "embeddings"
 
 # Model configuration
 EMBED_MODEL = "text-embedding-3-large"
-FAISS_INDEX_PATH = "data/usda_grants.faiss"
-META_PATH = "data/usda_grants_meta.json"
+EMBED_NATIVE_DIMENSIONS = 3072
+# Max inputs per embeddings request
+EMBED_BATCH_SIZE = 2048
 
-# Load once at module level
-index = faiss.read_index(FAISS_INDEX_PATH)
-with open(META_PATH, "r", encoding="utf-8") as f:
+# text-embedding-3 vectors can be shortened (e.g. 256, 512, 1024) with the
+# API's `dimensions` parameter. The index is built at the same size, and the
+# query size is always taken from the loaded index so the two cannot drift.
+EMBED_DIMENSIONS = int(os.getenv("EMBED_DIMENSIONS", EMBED_NATIVE_DIMENSIONS))
+
+# Embedding backend: "openai" (text-embedding-3-large) or "hashed" (offline
+# TF-IDF, no network). If the configured backend fails at query time, search
+# falls back to EMBED_FALLBACK_BACKEND; set it empty to disable the fallback.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "openai")
+EMBED_FALLBACK_BACKEND = os.getenv("EMBED_FALLBACK_BACKEND", "hashed")
+
+# TF-IDF cosine similarities run much lower than OpenAI ones for equally
+# relevant matches. Hashed-backend similarities are raised to this power
+# before converting back to distances, a monotonic map (rankings are kept) so
+# the app's distance thresholds mean the same thing. Fitted on the benchmark
+# queries: relevant programs have TF-IDF cosine >= 0.13, unrelated ones
+# <= 0.11, so the 1.2 relevance threshold should fall at ~0.12
+# (0.12 ** 0.43 = 0.4, i.e. distance 1.2).
+HASHED_SIMILARITY_EXPONENT = 0.43
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+FAISS_INDEX_PATH = os.path.join(DATA_DIR, "usda_grants.faiss")
+META_PATH = os.path.join(DATA_DIR, "usda_grants_meta.json")
+PROGRAMS_PATH = os.path.join(DATA_DIR, "usda_grants.json")
+HASHED_INDEX_PATH = os.path.join(DATA_DIR, "usda_grants_hashed.faiss")
+HASHED_VECTORIZER_PATH = os.path.join(DATA_DIR, "usda_grants_hashed_idf.npz")
+
+with open(PROGRAMS_PATH, "r", encoding="utf-8") as f:
     programs = json.load(f)
 
-def embed_query(query):
-    """Create embedding for query using OpenAI 1.0+ syntax"""
+# Position of each program in `programs` (and in every index), by program_id
+program_index = {program.get("program_id"): i for i, program in enumerate(programs)}
+
+# Text artifacts rendered from a program record alone
+ARTIFACT_RENDERERS = {
+    "checklist": generate_simple_checklist,
+    "application_steps": generate_application_steps,
+    "checklist_file": generate_checklist_file,
+    "prompt_details": program_details,
+}
+
+def build_program_artifacts(records):
+    """Render every artifact of every program once: {program_id: {kind: text}}"""
+    return {
+        program.get("program_id"): {kind: render(program) for kind, render in ARTIFACT_RENDERERS.items()}
+        for program in records
+    }
+
+program_artifacts = build_program_artifacts(programs)
+program_prompt_details = {pid: artifacts["prompt_details"] for pid, artifacts in program_artifacts.items()}
+
+def program_artifact(program, kind):
+    """Precompiled artifact for a program, rendered on the spot only for records not in the store"""
+    artifacts = program_artifacts.get(program.get("program_id"))
+    if artifacts is not None:
+        return artifacts[kind]
+    return ARTIFACT_RENDERERS[kind](program)
+
+def program_text(program):
+    """Text used to embed a program for the local backends"""
+    parts = [
+        program.get("program_name", ""),
+        program.get("program_type", ""),
+        program.get("agency", ""),
+        program.get("summary", ""),
+    ]
+    parts += program.get("eligibility", [])
+    parts += program.get("keywords", [])
+    parts += program.get("example_use_cases", [])
+    return "\n".join(parts)
+
+class EmbeddingBackend:
+    """A FAISS index together with the query embedder that matches it"""
+
+    def __init__(self, name, index, embed_batch, similarity_exponent=1.0):
+        self.name = name
+        self.index = index
+        self._embed_batch = embed_batch
+        self.similarity_exponent = similarity_exponent
+
+    def embed_batch(self, texts):
+        """Embed several texts at once as an (n, d) float32 matrix"""
+        q_embs = np.ascontiguousarray(self._embed_batch(list(texts)), dtype="float32")
+        if q_embs.shape[1] != self.index.d:
+            raise ValueError(f"{self.name} query embedding has {q_embs.shape[1]} dims, index expects {self.index.d}")
+        return q_embs
+
+    def embed(self, query):
+        return self.embed_batch([query])[0]
+
+    def _rescale(self, D):
+        if self.similarity_exponent != 1.0:
+            # Unit vectors: distance = 2 - 2*cos. Orthogonal stays at 2.0,
+            # identical at 0, and the order in between is unchanged
+            cos = np.maximum(1 - D / 2, 0)
+            D = 2 - 2 * cos ** self.similarity_exponent
+        return D
+
+    def search(self, q_embs, top_k, mask=None):
+        """
+        Top-k search; with a boolean program `mask` only those programs are
+        considered (via a FAISS ID selector), so all k slots go to eligible ones.
+        Missing results are -1 like `index.search`.
+        """
+        q_embs = np.ascontiguousarray(q_embs, dtype="float32")
+        if mask is None:
+            D, I = self.index.search(q_embs, top_k)
+        else:
+            top_k = max(1, min(top_k, int(mask.sum())))
+            D, I = self.index.search(q_embs, top_k, params=search_parameters(mask))
+        return self._rescale(D), I
+
+    def distances(self, q_embs, ids):
+        """Exact (n_queries, n_ids) distances from queries to specific indexed programs"""
+        vectors = np.vstack([self.index.reconstruct(int(i)) for i in ids])
+        return self._rescale(((q_embs[:, np.newaxis, :] - vectors[np.newaxis]) ** 2).sum(axis=2))
+
+# --- OpenAI backend ---
+def index_path(dimensions):
+    """Path of the FAISS index holding vectors of the given size"""
+    if dimensions == EMBED_NATIVE_DIMENSIONS:
+        return FAISS_INDEX_PATH
+    return os.path.join(DATA_DIR, f"usda_grants_{dimensions}d.faiss")
+
+def reduce_embeddings(vectors, dimensions):
+    """
+    Shorten text-embedding-3 vectors the way the API's `dimensions` parameter
+    does: keep the leading components, then re-normalize to unit length.
+    """
+    if dimensions > vectors.shape[1]:
+        raise ValueError(f"Cannot reduce {vectors.shape[1]}-dim embeddings to {dimensions} dims")
+    reduced = np.ascontiguousarray(vectors[:, :dimensions], dtype="float32")
+    faiss.normalize_L2(reduced)
+    return reduced
+
+def build_reduced_index(dimensions, source_path=FAISS_INDEX_PATH):
+    """Derive a reduced-dimension flat index from the full-size program index"""
+    full_index = faiss.read_index(source_path)
+    vectors = full_index.reconstruct_n(0, full_index.ntotal)
+    reduced_index = faiss.IndexFlatL2(dimensions)
+    reduced_index.add(reduce_embeddings(vectors, dimensions))
+    return reduced_index
+
+def load_index(dimensions=EMBED_DIMENSIONS):
+    """Load the program index for `dimensions`, deriving it from the full index if not built yet"""
+    path = index_path(dimensions)
+    if os.path.exists(path):
+        loaded = faiss.read_index(path)
+    else:
+        loaded = build_reduced_index(dimensions)
+
+    if loaded.d != dimensions:
+        raise ValueError(f"Index at {path} has {loaded.d} dims, expected {dimensions}")
+    return loaded
+
+def _load_openai_backend():
+    openai_index = load_index()
+    # Request exactly the size the index was built with
+    params = {"model": EMBED_MODEL}
+    if openai_index.d != EMBED_NATIVE_DIMENSIONS:
+        params["dimensions"] = openai_index.d
+
+    def embed_batch(texts):
+        # One request per EMBED_BATCH_SIZE texts; the API accepts a list of inputs
+        try:
+            vectors = []
+            for start in range(0, len(texts), EMBED_BATCH_SIZE):
+                vectors += llm_gateway.embed(EMBED_AGENT, texts[start:start + EMBED_BATCH_SIZE],
+                                             timeout=EMBED_TIMEOUT, max_retries=EMBED_MAX_RETRIES, **params)
+            return np.array(vectors).astype("float32")
+        except Exception as e:
+            raise Exception(f"Embedding error: {str(e)}")
+
+    return EmbeddingBackend("openai", openai_index, embed_batch)
+
+# --- Hashed TF-IDF backend (offline) ---
+def build_hashed_index(records):
+    """Fit the TF-IDF vectorizer on the program corpus and index its vectors"""
+    texts = [program_text(program) for program in records]
+    vectorizer = HashedTfidfVectorizer().fit(texts)
+    hashed_index = faiss.IndexFlatL2(vectorizer.n_features)
+    hashed_index.add(np.ascontiguousarray(vectorizer.transform(texts), dtype="float32"))
+    return vectorizer, hashed_index
+
+def _load_hashed_backend():
+    if os.path.exists(HASHED_INDEX_PATH) and os.path.exists(HASHED_VECTORIZER_PATH):
+        vectorizer = HashedTfidfVectorizer.load(HASHED_VECTORIZER_PATH)
+        hashed_index = faiss.read_index(HASHED_INDEX_PATH)
+    else:
+        # Cheap enough to fit on the fly for a small corpus
+        vectorizer, hashed_index = build_hashed_index(programs)
+
+    if hashed_index.ntotal != len(programs):
+        raise ValueError(f"Hashed index has {hashed_index.ntotal} programs, expected {len(programs)}; rebuild it")
+    return EmbeddingBackend("hashed", hashed_index, vectorizer.transform, HASHED_SIMILARITY_EXPONENT)
+
+BACKEND_LOADERS = {
+    "openai": _load_openai_backend,
+    "hashed": _load_hashed_backend,
+}
+
+_backends = {}
+
+def get_backend(name=EMBED_BACKEND):
+    """Load a backend on first use and keep it for the life of the process"""
+    if name not in _backends:
+        if name not in BACKEND_LOADERS:
+            raise ValueError(f"Unknown embedding backend '{name}'. Choose from: {', '.join(BACKEND_LOADERS)}")
+        _backends[name] = BACKEND_LOADERS[name]()
+    return _backends[name]
+
+# Load once at module level
+backend = get_backend()
+index = backend.index
+lexical_index = BM25Index(programs)
+eligibility_scorer = EligibilityScorer(programs)
+program_filters = ProgramFilters(programs)
+
+def embed_with_fallback(texts):
+    """
+    Embed `texts` with the configured backend, or with the local fallback
+    backend if that fails (e.g. OpenAI outage). Returns (backend, embeddings).
+    """
     try:
-        response = client.embeddings.create(
-            model=EMBED_MODEL,
-            input=query
-        )
-        return np.array(response.data[0].embedding).astype("float32")
+        return backend, backend.embed_batch(texts)
     except Exception as e:
-        raise Exception(f"Embedding error: {str(e)}")
-
-def search_local_programs(query, farmer_profile, top_k=5, relevance_threshold=1.2):
-    """Search local FAISS database"""
-    from agents.grant_finder import calculate_match_score
-    
-    q_emb = embed_query(query)
-    if q_emb is None:
-        return [], 999
-    
-    D, I = index.search(np.array([q_emb]), top_k)
-    
+        if not EMBED_FALLBACK_BACKEND or EMBED_FALLBACK_BACKEND == backend.name:
+            raise
+        print(f"{e} - falling back to '{EMBED_FALLBACK_BACKEND}' embeddings")
+        fallback = get_backend(EMBED_FALLBACK_BACKEND)
+        return fallback, fallback.embed_batch(texts)
+
+def multi_search(queries, top_k=5, relevance_threshold=1.2, filters=None):
+    """
+    Search several intents at once, e.g. ["beginning farmer loans", "small farm microloans"].
+
+    All intents are embedded in one batched request and searched with a single
+    `index.search` over the query matrix. Each intent's dense and BM25 rankings
+    are merged with reciprocal rank fusion, so a program that ranks well for
+    any intent rises to the top without blurring them into one vector. Only
+    programs within `relevance_threshold` or with a confident lexical match
+    take part in an intent's rankings. `filters` (see filters.FILTER_KEYS)
+    restrict both searches to eligible programs.
+
+    Returns (hits, avg_distance): up to top_k hits, dicts with the program
+    index, best dense distance, best BM25 score, fused score and the intents
+    it matched, best first; avg_distance is the mean dense distance over every intent's
+    top_k (999 if unavailable).
+    """
+    queries = [q for q in queries if q and q.strip()]
+    if not queries:
+        return [], 999.0
+
+    mask = program_filters.mask(filters)
+    if mask is not None and not mask.any():
+        return [], 999.0
+
+    rankings = []  # (intent row, ranked program indexes)
+    dense_distances = []
+    try:
+        used_backend, q_embs = embed_with_fallback(queries)
+        D, I = used_backend.search(q_embs, top_k, mask)
+        for row, (ids, dists) in enumerate(zip(I, D)):
+            dense = [(int(idx), float(dist)) for idx, dist in zip(ids, dists) if idx >= 0]
+            dense_distances += [dist for _, dist in dense]
+            rankings.append((row, [idx for idx, dist in dense if dist < relevance_threshold]))
+    except Exception as e:
+        print(f"Dense search error: {e}")
+        q_embs = None
+
+    lexical_scores = {}
+    for row, query in enumerate(queries):
+        lexical = [(idx, score) for idx, score in lexical_index.search(query, top_k, mask)
+                   if score >= LEXICAL_MATCH_SCORE]
+        rankings.append((row, [idx for idx, _ in lexical]))
+        for idx, score in lexical:
+            lexical_scores[idx] = max(lexical_scores.get(idx, 0.0), score)
+
+    fused = reciprocal_rank_fusion(*(ranking for _, ranking in rankings))
+    intents = {}
+    for row, ranking in rankings:
+        for idx in ranking:
+            intents.setdefault(idx, set()).add(row)
+
+    # Each intent contributes up to top_k programs; keep the top_k overall
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+
+    # Exact best distance over all intents, including programs found only lexically
+    best_distance = {}
+    if q_embs is not None and ranked:
+        best_distance = dict(zip(ranked, map(float, used_backend.distances(q_embs, ranked).min(axis=0))))
+
+    hits = []
+    for idx in ranked:
+        hits.append({
+            "index": idx,
+            "distance": best_distance.get(idx, 999.0),
+            "lexical_score": lexical_scores.get(idx, 0.0),
+            "rrf_score": fused[idx],
+            "intents": sorted(intents[idx]),
+        })
+
+    avg_distance = float(np.mean(dense_distances)) if dense_distances else 999.0
+    return hits, avg_distance
+
+def hybrid_search(query, top_k=5, relevance_threshold=1.2, filters=None):
+    """
+    Dense FAISS search fused with the BM25 index through reciprocal rank fusion.
+    Single-intent case of `multi_search`; returns (hits, avg_distance).
+    """
+    return multi_search([query], top_k, relevance_threshold, filters)
+
+def program_from_hit(hit):
+    """Copy of the program record annotated with its search scores"""
+    program = programs[hit["index"]].copy()
+    program["_distance"] = hit["distance"]
+    program["_confidence"] = 1 / (1 + hit["distance"])
+    program["_lexical_score"] = hit["lexical_score"]
+    program["_rrf_score"] = hit["rrf_score"]
+    return program
+
+# Per-query fields added to search results by program_from_hit/search_local_programs
+SCORE_FIELDS = ("_distance", "_confidence", "_lexical_score", "_rrf_score", "_match_score")
+
+def program_ref(program):
+    """Compact reference to a search result: its program_id and scores only"""
+    ref = {"program_id": program.get("program_id")}
+    for field in SCORE_FIELDS:
+        if field in program:
+            ref[field] = program[field]
+    return ref
+
+def resolve_program(ref):
+    """Program record for a reference, annotated with the stored scores (None if unknown)"""
+    idx = program_index.get(ref.get("program_id"))
+    if idx is None:
+        return None
+    program = programs[idx].copy()
+    program.update((k, v) for k, v in ref.items() if k != "program_id")
+    return program
+
+def search_local_programs(query, farmer_profile, top_k=5, relevance_threshold=1.2, filters=None):
+    """
+    Search local FAISS + BM25 indexes and score matches against the profile.
+    `query` may be a single string or a list of intents (see `multi_search`).
+    `filters` limits the search to eligible programs, e.g.
+    {"program_type": "Grant", "agency": "AMS", "year_round": True}.
+    """
+    queries = [query] if isinstance(query, str) else list(query)
+    hits, avg_distance = multi_search(queries, top_k, relevance_threshold, filters)
+
+    # One vectorized pass scores every program for this profile
+    match_scores = eligibility_scorer.score_all(farmer_profile)
+
     results = []
-    for idx, distance in zip(I[0], D[0]):
-        if distance < relevance_threshold:
-            program = programs[idx].copy()
-            program["_distance"] = float(distance)
-            program["_confidence"] = 1 / (1 + distance)
-            program["_match_score"] = calculate_match_score(program, farmer_profile)
-            results.append(program)
-    
-    # Sort by match score
+    for hit in hits:
+        program = program_from_hit(hit)
+        program["_match_score"] = int(match_scores[hit["index"]])
+        results.append(program)
+
+    # Sort by match score (fused rank breaks ties)
     results.sort(key=lambda x: x.get("_match_score", 0), reverse=True)
-    
-    avg_distance = float(np.mean(D[0])) if len(D[0]) > 0 else 999.0
-    return results, avg_distance
\ No newline at end of file
+
+    return results, avg_distance
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build grant indexes for an embedding backend")
+    parser.add_argument("--backend", choices=list(BACKEND_LOADERS), default="openai")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256, 512, 1024],
+                        help="Reduced sizes to derive from the full OpenAI index")
+    args = parser.parse_args()
+
+    if args.backend == "hashed":
+        vectorizer, hashed_index = build_hashed_index(programs)
+        vectorizer.save(HASHED_VECTORIZER_PATH)
+        faiss.write_index(hashed_index, HASHED_INDEX_PATH)
+        print(f"Wrote {hashed_index.ntotal} x {hashed_index.d}-dim TF-IDF vectors to {HASHED_INDEX_PATH}")
+    else:
+        for dims in args.dimensions:
+            reduced = build_reduced_index(dims)
+            faiss.write_index(reduced, index_path(dims))
+            print(f"Wrote {reduced.ntotal} x {dims}-dim vectors to {index_path(dims)}")
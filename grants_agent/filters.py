@@ -0,0 +1,85 @@
+import re
+import faiss
+import numpy as np
+
+from .scoring import program_features
+
+# Filters accepted by ProgramFilters.mask / search_local_programs
+FILTER_KEYS = ("program_type", "agency", "category", "beginning_farmer", "year_round")
+
+def _words(text):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+class ProgramFilters:
+    """
+    Precomputed eligibility bitmaps over the program records.
+
+    One boolean column is built per distinct program type, agency and category
+    when the records load, plus flags for beginning-farmer and year-round
+    programs. A filter is then a few ORs/ANDs of those columns,
+    and the result can be handed to FAISS as an ID selector so top_k is only
+    spent on eligible programs.
+    """
+
+    def __init__(self, records):
+        self.size = len(records)
+        self.types = self._bitmaps(records, lambda p: [p.get("program_type") or ""])
+        self.agencies = self._bitmaps(records, lambda p: [p.get("agency") or ""])
+        self.categories = self._bitmaps(records, lambda p: [(p.get("metadata") or {}).get("category") or ""])
+        self.beginning = np.array([program_features(p)["beginning"] for p in records], dtype=bool)
+        self.year_round = np.array([bool(p.get("year_round_application")) for p in records], dtype=bool)
+
+    def _bitmaps(self, records, values):
+        bitmaps = {}
+        for i, program in enumerate(records):
+            for value in values(program):
+                if value:
+                    bitmaps.setdefault(value, np.zeros(self.size, dtype=bool))[i] = True
+        return bitmaps
+
+    def _match(self, bitmaps, wanted):
+        """Programs whose value matches any wanted value: exact (case-insensitive) or by words, e.g. "grant" or "FSA" """
+        wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+        mask = np.zeros(self.size, dtype=bool)
+        for value, bitmap in bitmaps.items():
+            for w in wanted:
+                if w.lower() == value.lower() or _words(w) <= _words(value):
+                    mask |= bitmap
+                    break
+        return mask
+
+    def mask(self, filters):
+        """Boolean mask of programs passing every filter, or None if no filter is set"""
+        if not filters:
+            return None
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown program filter(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(FILTER_KEYS)}")
+
+        mask = np.ones(self.size, dtype=bool)
+        active = False
+        for key, value in filters.items():
+            if value is None or value == "" or value == [] or value is False:
+                continue
+            active = True
+            if key == "program_type":
+                mask &= self._match(self.types, value)
+            elif key == "agency":
+                mask &= self._match(self.agencies, value)
+            elif key == "category":
+                mask &= self._match(self.categories, value)
+            elif key == "beginning_farmer":
+                mask &= self.beginning
+            elif key == "year_round":
+                mask &= self.year_round
+        return mask if active else None
+
+def search_parameters(mask):
+    """FAISS search parameters restricting a search to the programs in `mask`"""
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+    params = faiss.SearchParameters(sel=selector)
+    # The selector reads the bitmap by pointer; keep it alive with the params
+    params._bitmap = bitmap
+    params._selector = selector
+    return params
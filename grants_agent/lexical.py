@@ -0,0 +1,83 @@
+from collections import Counter, defaultdict
+import numpy as np
+
+from .local_embeddings import tokenize
+
+# Field weights: a term in `keywords` counts three times, like BM25F
+LEXICAL_FIELDS = {
+    "program_name": 2,
+    "keywords": 3,
+    "eligibility": 1,
+    "summary": 1,
+}
+
+# A program scoring at least this much on BM25 is a confident exact-term match
+# (e.g. "FSMIP", "organic certification") even if its dense distance is high
+LEXICAL_MATCH_SCORE = 3.0
+
+# Reciprocal rank fusion constant (standard value from Cormack et al.)
+RRF_K = 60
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over the program records.
+
+    Per-posting BM25 term weights are precomputed when the index is built, so
+    scoring a query is a sum over the postings of its terms. Bigrams are
+    indexed too, which rewards exact phrases like "organic certification".
+    """
+
+    def __init__(self, records, fields=LEXICAL_FIELDS, k1=1.2, b=0.75):
+        self.size = len(records)
+
+        doc_terms = [self._weighted_terms(record, fields) for record in records]
+        doc_lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype="float32")
+        avg_length = float(doc_lengths.mean()) if self.size else 0.0
+
+        postings = defaultdict(list)
+        for doc_id, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                postings[term].append((doc_id, tf))
+
+        self.postings = {}
+        for term, entries in postings.items():
+            doc_ids = np.array([doc_id for doc_id, _ in entries], dtype="int64")
+            tf = np.array([count for _, count in entries], dtype="float32")
+            idf = float(np.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5)))
+            norm = k1 * (1 - b + b * doc_lengths[doc_ids] / max(avg_length, 1e-6))
+            self.postings[term] = (doc_ids, idf * tf * (k1 + 1) / (tf + norm))
+
+    @staticmethod
+    def _weighted_terms(record, fields):
+        terms = Counter()
+        for field, weight in fields.items():
+            value = record.get(field) or ""
+            text = " ".join(value) if isinstance(value, list) else str(value)
+            for term in tokenize(text):
+                terms[term] += weight
+        return terms
+
+    def score(self, query):
+        """BM25 score of every program for the query"""
+        scores = np.zeros(self.size, dtype="float32")
+        for term in set(tokenize(query)):
+            if term in self.postings:
+                doc_ids, weights = self.postings[term]
+                scores[doc_ids] += weights
+        return scores
+
+    def search(self, query, top_k, mask=None):
+        """Top-k (program index, score) pairs with a non-zero score, among `mask` programs if given"""
+        scores = self.score(query)
+        if mask is not None:
+            scores[~mask] = 0
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(int(i), float(scores[i])) for i in order if scores[i] > 0]
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    """Fuse ranked lists of program indexes into {index: RRF score}"""
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, idx in enumerate(ranking, 1):
+            fused[idx] += 1.0 / (k + rank)
+    return dict(fused)
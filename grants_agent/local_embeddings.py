@@ -0,0 +1,66 @@
+import re
+import zlib
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from",
+    "get", "help", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or",
+    "the", "to", "what", "which", "with",
+}
+
+def _stem(word):
+    """Fold simple plurals so 'farmers' matches 'farmer'"""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text):
+    """Lowercased, plural-folded words without stop words, plus adjacent-word bigrams"""
+    words = [_stem(w) for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class HashedTfidfVectorizer:
+    """
+    Offline text embedder: hashed word unigrams/bigrams weighted by TF-IDF.
+
+    Tokens are hashed with crc32 (stable across processes, unlike hash()) into
+    a fixed number of buckets, so no vocabulary has to be stored - only the
+    per-bucket IDF weights fitted on the program corpus.
+    """
+
+    def __init__(self, n_features=2048, idf=None):
+        self.n_features = n_features
+        self.idf = idf
+
+    def _bucket_counts(self, text):
+        buckets = [zlib.crc32(token.encode("utf-8")) % self.n_features for token in tokenize(text)]
+        return np.bincount(buckets, minlength=self.n_features).astype("float32")
+
+    def fit(self, texts):
+        """Learn smoothed IDF weights from the corpus"""
+        counts = np.vstack([self._bucket_counts(text) for text in texts])
+        doc_freq = (counts > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + doc_freq)) + 1).astype("float32")
+        return self
+
+    def transform(self, texts):
+        """Embed texts as unit-length float32 rows"""
+        if self.idf is None:
+            raise ValueError("HashedTfidfVectorizer must be fitted before transform")
+        counts = np.vstack([self._bucket_counts(text) for text in texts])
+        weights = np.log1p(counts) * self.idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return weights / np.maximum(norms, 1e-12)
+
+    def embed(self, text):
+        """Embed a single query string"""
+        return self.transform([text])[0]
+
+    def save(self, path):
+        np.savez(path, n_features=self.n_features, idf=self.idf)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(n_features=int(data["n_features"]), idf=data["idf"])
@@ -0,0 +1,242 @@
+"""
+Token-budgeted prompt assembly for the grants chat.
+
+The system prompt, recent conversation and retrieved programs/web results are
+fitted under PROMPT_TOKEN_BUDGET. When they don't fit, the newest turns are
+trimmed like the older ones, then the lowest-scoring programs go, then the
+oldest turns, then the lowest-ranked web results.
+Programs already shown earlier in the conversation are referenced by ID
+instead of being pasted in full again.
+"""
+import os
+
+from .checklist_generator import program_details
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """tiktoken encoding, loaded on first use (it may download its BPE file); None if unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-4o")
+        except Exception:  # not installed, or the encoding can't be downloaded
+            _encoding = None
+    return _encoding
+
+# Max tokens sent per request (system prompt + history + question)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Prior turns considered at all, and how many of the newest stay verbatim
+HISTORY_TURNS = 6
+VERBATIM_TURNS = 2
+# Older turns and web snippets are cut to this many characters
+TRIMMED_TURN_CHARS = 300
+WEB_SNIPPET_CHARS = 300
+# Chat format overhead per message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def count_tokens(text):
+    """Token count of text (about 4 characters per token without tiktoken)"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def _trim(text, max_chars):
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " …"
+
+def program_block(program, i, details=None):
+    """Full prompt context for one local program; `details` is its precompiled program_details"""
+    if details is None:
+        details = program_details(program)
+    return f"""
+Local Program {i}: {program.get("program_name", "N/A")} [ID: {program.get("program_id", "N/A")}]
+- Match Score: {program.get("_match_score", 50)}/100
+- Match Confidence: {program.get("_confidence", 0):.2f}
+{details}"""
+
+def program_reference(program, i):
+    """Short prompt line for a program whose details were given in an earlier turn"""
+    return f"""
+Local Program {i}: {program.get("program_name", "N/A")} [ID: {program.get("program_id", "N/A")}]
+- Match Score: {program.get("_match_score", 50)}/100
+- Already discussed earlier in this conversation (see previous answers)
+- URL: {program.get("official_url", "N/A")}
+"""
+
+def web_block(result, i):
+    return f"""
+Web Result {i}: {result.get("title", "N/A")}
+- Snippet: {_trim(result.get("snippet", "N/A"), WEB_SNIPPET_CHARS)}
+- Source: {result.get("link", "N/A")}
+"""
+
+def farmer_context(farmer_profile):
+    if not farmer_profile:
+        return ""
+    return f"""
+**Farmer Profile:**
+- Beginning Farmer: {farmer_profile.get('beginning_farmer', False)}
+- Veteran: {farmer_profile.get('veteran', False)}
+- State: {farmer_profile.get('state', 'Not specified')}
+
+Use this profile to personalize your recommendations and highlight programs that are especially good matches.
+"""
+
+def system_prompt(query, strategy, local_context, web_context, profile_context):
+    """System prompt for a search strategy"""
+    if strategy == "web_only":
+        return f"""You are a USDA grants expert assistant.
+
+{profile_context}
+
+The user asked: "{query}"
+
+I searched my local database of 8 USDA programs, but couldn't find relevant matches.
+
+However, I found current information from the web:
+
+**Web Search Results:**
+{web_context}
+
+**Instructions:**
+- Answer based on the web results
+- Cite sources with clickable links in markdown format: [Source Name](URL)
+- Be clear that this info is from web search
+- If web results don't fully answer the question, say so
+- Suggest checking official USDA websites for complete details
+- Be conversational and helpful"""
+
+    if strategy == "local_only":
+        return f"""You are a USDA grants expert with a database of 8 programs.
+
+{profile_context}
+
+**Local Database Programs (sorted by match score):**
+{local_context}
+
+**Instructions:**
+- Answer based on your local database
+- Prioritize programs with higher match scores
+- Be specific about which programs match the user's needs
+- Include eligibility criteria and application details
+- Provide official URLs from the programs
+- Be conversational and helpful
+- If asked about programs not in the database, say so clearly"""
+
+    return f"""You are a USDA grants expert with both a local database AND web search capabilities.
+
+{profile_context}
+
+**Local Database Results (sorted by match score):**
+{local_context}
+
+**Web Search Results:**
+{web_context}
+
+**Instructions:**
+- Combine information from both sources for a comprehensive answer
+- Prioritize local programs with higher match scores
+- Use local database for structured program details (eligibility, funding, deadlines)
+- Use web results for updates, recent changes, or additional context
+- Clearly distinguish between local database info and web sources
+- Cite web sources with links: [Source](URL)
+- Provide actionable next steps
+- Be conversational and helpful"""
+
+def history_entries(conversation_history):
+    """The recent user/assistant turns that can go into the prompt"""
+    entries = [e for e in (conversation_history or []) if e["role"] in ("user", "assistant")]
+    return entries[-HISTORY_TURNS:]
+
+def shown_program_ids(entries):
+    """IDs of programs shown in the given assistant turns"""
+    shown = set()
+    for entry in entries:
+        for ref in entry.get("programs") or []:
+            shown.add(ref.get("program_id"))
+    return shown
+
+def history_messages(conversation_history, verbatim_turns=VERBATIM_TURNS):
+    """Recent turns as chat messages, newest kept verbatim and older ones trimmed"""
+    entries = history_entries(conversation_history)
+    messages = []
+    for i, entry in enumerate(entries):
+        content = entry["content"] if entry["role"] == "user" else entry.get("text", "")
+        if i < len(entries) - verbatim_turns:
+            content = _trim(content, TRIMMED_TURN_CHARS)
+        messages.append({"role": entry["role"], "content": content})
+    return messages
+
+def _messages_tokens(messages):
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+def build_messages(query, local_results, web_results, strategy, conversation_history=None,
+                   farmer_profile=None, budget=PROMPT_TOKEN_BUDGET, program_details_by_id=None):
+    """
+    Chat messages for one grants answer, fitted under the token budget.
+    `program_details_by_id` maps program_id to precompiled program_details.
+
+    Returns (messages, stats); stats records the prompt size and what was
+    kept or dropped so each turn's cost can be shown and logged.
+    """
+    programs = sorted(
+        local_results or [],
+        key=lambda p: (p.get("_match_score", 50), p.get("_rrf_score", 0)),
+        reverse=True,
+    )
+    web = list(web_results or [])
+    entries = history_entries(conversation_history)
+    verbatim_turns = VERBATIM_TURNS
+    history = history_messages(conversation_history, verbatim_turns)
+    profile_context = farmer_context(farmer_profile)
+    details = program_details_by_id or {}
+
+    while True:
+        # Only reference a program by name while the answer that showed it is
+        # still in the prompt word for word; a trimmed or shed turn no longer
+        # carries its details, so the program gets its full block again
+        kept_verbatim = min(verbatim_turns, len(history))
+        shown = shown_program_ids(entries[len(entries) - kept_verbatim:]) if kept_verbatim else set()
+        local_context = "\n---\n".join(
+            program_reference(p, i) if p.get("program_id") in shown
+            else program_block(p, i, details.get(p.get("program_id")))
+            for i, p in enumerate(programs, 1)
+        )
+        web_context = "\n---\n".join(web_block(r, i) for i, r in enumerate(web, 1))
+        messages = (
+            [{"role": "system", "content": system_prompt(query, strategy, local_context, web_context, profile_context)}]
+            + history
+            + [{"role": "user", "content": query}]
+        )
+        tokens = _messages_tokens(messages)
+        if tokens <= budget:
+            break
+        # Over budget: shed the least useful context first
+        if verbatim_turns:
+            verbatim_turns = 0
+            history = history_messages(conversation_history, verbatim_turns)
+        elif len(programs) > 1:
+            programs.pop()
+        elif history:
+            history.pop(0)
+        elif len(web) > 1:
+            web.pop()
+        else:
+            break
+
+    stats = {
+        "prompt_tokens": tokens,
+        "budget": budget,
+        "programs": len(programs),
+        "programs_dropped": len(local_results or []) - len(programs),
+        "programs_referenced": sum(1 for p in programs if p.get("program_id") in shown),
+        "history_turns": len(history),
+        "web_results": len(web),
+    }
+    return messages, stats
@@ -0,0 +1,87 @@
+import numpy as np
+
+BASE_SCORE = 50
+MAX_SCORE = 100
+
+# Program features compiled once from eligibility/summary text and flags
+FEATURES = ("beginning", "veteran", "small_farm", "operating", "year_round")
+
+# Points a matching feature adds for a profile that asks for it
+FEATURE_POINTS = {
+    "beginning": 30,
+    "veteran": 20,
+    "small_farm": 15,
+    "operating": 10,
+    "year_round": 10,
+}
+
+def program_features(program):
+    """Boolean feature row for one program record"""
+    eligibility = " ".join(program.get("eligibility", [])).lower()
+    summary = program.get("summary", "").lower()
+    metadata = program.get("metadata", {})
+    return {
+        "beginning": ("beginning" in eligibility or "new farmer" in summary
+                      or bool(metadata.get("targets_beginning_farmers"))),
+        "veteran": "veteran" in eligibility,
+        "small_farm": "small" in summary,
+        "operating": "operating" in summary or "expense" in summary,
+        "year_round": bool(program.get("year_round_application")),
+    }
+
+def profile_weights(farmer_profile):
+    """
+    Points per feature for a farmer profile. Accepts both profile shapes used
+    in the apps: the grants chat ({"beginning_farmer", "veteran", "state"})
+    and the advisory workflow ({"experience", "farm_size", ...}).
+    """
+    weights = np.zeros(len(FEATURES), dtype="float32")
+    if not farmer_profile:
+        return weights
+
+    advisory = "experience" in farmer_profile or "farm_size" in farmer_profile
+    wanted = {
+        "beginning": bool(farmer_profile.get("beginning_farmer")) or farmer_profile.get("experience") == "Beginner",
+        "veteran": bool(farmer_profile.get("veteran")),
+        "small_farm": farmer_profile.get("farm_size") is not None and farmer_profile["farm_size"] < 50,
+        # Only the advisory workflow's profile describes a farm being planned,
+        # where operating support and year-round intake count; the chat
+        # profile just says who the farmer is
+        "operating": advisory,
+        "year_round": advisory,
+    }
+    for i, feature in enumerate(FEATURES):
+        if wanted[feature]:
+            weights[i] = FEATURE_POINTS[feature]
+    return weights
+
+class EligibilityScorer:
+    """
+    Scores programs against farmer profiles as matrix operations.
+
+    Each program's text is compiled into a boolean feature row once, when the
+    scorer is built; scoring a profile is then one matrix-vector product over
+    all programs, and a batch of profiles is one matrix-matrix product.
+    """
+
+    def __init__(self, records):
+        self.features = np.array(
+            [[program_features(program)[f] for f in FEATURES] for program in records],
+            dtype=bool,
+        ).reshape(len(records), len(FEATURES))
+        self._feature_matrix = self.features.astype("float32")
+
+    def score_all(self, farmer_profile):
+        """0-100 match score of every program for one profile"""
+        if not farmer_profile:
+            return np.full(len(self.features), BASE_SCORE, dtype="int64")
+        scores = BASE_SCORE + self._feature_matrix @ profile_weights(farmer_profile)
+        return np.minimum(scores, MAX_SCORE).astype("int64")
+
+    def score_many(self, farmer_profiles):
+        """(n_profiles, n_programs) match scores for a batch of profiles"""
+        if not farmer_profiles:
+            return np.zeros((0, len(self.features)), dtype="int64")
+        weights = np.vstack([profile_weights(p) for p in farmer_profiles])
+        scores = BASE_SCORE + weights @ self._feature_matrix.T
+        return np.minimum(scores, MAX_SCORE).astype("int64")
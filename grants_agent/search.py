@@ -1,12 +1,34 @@
+import calendar
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
 import requests
-from config.settings import BRAVE_API_KEY
+
+from shared.sqlite import connect
+
+BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
+BRAVE_URL = "https://api.search.brave.com/res/v1/web/search"
+
+# Cache and quota configuration
+BRAVE_CACHE_PATH = os.getenv(
+    "BRAVE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "brave_cache.db"),
+)
+BRAVE_CACHE_TTL_HOURS = float(os.getenv("BRAVE_CACHE_TTL_HOURS", "24"))
+BRAVE_MONTHLY_QUOTA = int(os.getenv("BRAVE_MONTHLY_QUOTA", "2000"))
+# Free plan allows 1 request/second
+BRAVE_RATE_PER_SECOND = float(os.getenv("BRAVE_RATE_PER_SECOND", "1"))
+BRAVE_MAX_WAIT_SECONDS = 2.0
 
 def web_search_brave(query, num_results=5):
     """Search using Brave Search API"""
     if not BRAVE_API_KEY:
         raise ValueError("BRAVE_API_KEY not found!")
-    
-    url = "https://api.search.brave.com/res/v1/web/search"
+
     headers = {
         "Accept": "application/json",
         "X-Subscription-Token": BRAVE_API_KEY
@@ -15,12 +37,12 @@ def web_search_brave(query, num_results=5):
         "q": query,
         "count": num_results
     }
-    
+
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = requests.get(BRAVE_URL, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
-        
+
         results = []
         web_results = data.get("web", {}).get("results", [])
         for item in web_results:
@@ -29,7 +51,7 @@ def web_search_brave(query, num_results=5):
                 "snippet": item.get("description", ""),
                 "link": item.get("url", "")
             })
-        
+
         return results
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
@@ -39,4 +61,160 @@ def web_search_brave(query, num_results=5):
         else:
             raise Exception(f"Brave API error: {str(e)}")
     except Exception as e:
-        raise Exception(f"Web search error: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Web search error: {str(e)}")
+
+def normalize_query(query):
+    """Cache key form of a query: lowercase words, punctuation and extra spaces removed"""
+    return " ".join(re.findall(r"[a-z0-9]+", query.lower()))
+
+SEARCH_CACHE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS search_cache (
+        key TEXT PRIMARY KEY, results TEXT NOT NULL, fetched_at REAL NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS quota_usage (
+        month TEXT PRIMARY KEY, used INTEGER NOT NULL)""",
+)
+
+class SearchCache:
+    """Persistent web search results keyed by normalized query, with a TTL"""
+
+    def __init__(self, path=BRAVE_CACHE_PATH, ttl_hours=BRAVE_CACHE_TTL_HOURS):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+
+    @staticmethod
+    def key(query, num_results):
+        return f"{num_results}:{normalize_query(query)}"
+
+    def get(self, query, num_results, allow_stale=False):
+        """Cached results, or None if missing (or expired, unless allow_stale)"""
+        with connect(self.path, SEARCH_CACHE_SCHEMA) as conn:
+            row = conn.execute(
+                "SELECT results, fetched_at FROM search_cache WHERE key = ?",
+                (self.key(query, num_results),),
+            ).fetchone()
+        if row is None:
+            return None
+        results, fetched_at = row
+        if not allow_stale and time.time() - fetched_at > self.ttl_seconds:
+            return None
+        return json.loads(results)
+
+    def put(self, query, num_results, results):
+        with connect(self.path, SEARCH_CACHE_SCHEMA) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, results, fetched_at) VALUES (?, ?, ?)",
+                (self.key(query, num_results), json.dumps(results), time.time()),
+            )
+
+class QuotaAccountant:
+    """
+    Tracks live searches against the monthly budget (persisted, so restarts
+    don't reset it) and paces spending evenly across the month.
+    """
+
+    def __init__(self, path=BRAVE_CACHE_PATH, monthly_quota=BRAVE_MONTHLY_QUOTA):
+        self.path = path
+        self.monthly_quota = monthly_quota
+
+    @staticmethod
+    def _month(now=None):
+        return (now or datetime.now()).strftime("%Y-%m")
+
+    def used(self, now=None):
+        with connect(self.path, SEARCH_CACHE_SCHEMA) as conn:
+            row = conn.execute("SELECT used FROM quota_usage WHERE month = ?", (self._month(now),)).fetchone()
+        return row[0] if row else 0
+
+    def record(self, now=None):
+        with connect(self.path, SEARCH_CACHE_SCHEMA) as conn:
+            conn.execute(
+                "INSERT INTO quota_usage (month, used) VALUES (?, 1) "
+                "ON CONFLICT(month) DO UPDATE SET used = used + 1",
+                (self._month(now),),
+            )
+
+    def paced_allowance(self, now=None):
+        """Searches that may have been spent by now if the budget is spread over the month"""
+        now = now or datetime.now()
+        days_in_month = calendar.monthrange(now.year, now.month)[1]
+        fraction = (now.day - 1 + now.hour / 24) / days_in_month
+        # Always allow at least one day's share so early-month queries work
+        return min(self.monthly_quota, self.monthly_quota * fraction + self.monthly_quota / days_in_month)
+
+    def status(self, now=None):
+        """'ok', 'tight' (ahead of the monthly pace) or 'exhausted'"""
+        used = self.used(now)
+        if used >= self.monthly_quota:
+            return "exhausted"
+        if used >= self.paced_allowance(now):
+            return "tight"
+        return "ok"
+
+class TokenBucket:
+    """Thread-safe token bucket limiting live requests per second"""
+
+    def __init__(self, rate=BRAVE_RATE_PER_SECOND, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, max_wait=BRAVE_MAX_WAIT_SECONDS):
+        """Take a token, waiting up to max_wait seconds. Returns False if none came free"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+search_cache = SearchCache()
+quota = QuotaAccountant()
+rate_limiter = TokenBucket()
+
+def cached_web_search(query, num_results=5):
+    """
+    Brave search behind the result cache, monthly quota governor and rate limiter.
+
+    Returns (results, source). source is "cache" for a fresh cache hit and
+    "live" for a new Brave request. When the quota is exhausted, the search is
+    ahead of the monthly pace, the rate limit is hit or Brave rejects the
+    request, it degrades to stale cached results ("stale_cache") or to no web
+    results at all (None with source "quota" or "rate_limited") so the caller
+    answers from local data only.
+    """
+    cached = search_cache.get(query, num_results)
+    if cached is not None:
+        return cached, "cache"
+
+    budget = quota.status()
+    if budget != "ok":
+        return _degrade(query, num_results, "quota")
+
+    if not rate_limiter.acquire():
+        return _degrade(query, num_results, "rate_limited")
+
+    quota.record()
+    try:
+        results = web_search_brave(query, num_results)
+    except ValueError as e:
+        if "Rate limit" in str(e):
+            return _degrade(query, num_results, "rate_limited")
+        raise
+
+    search_cache.put(query, num_results, results)
+    return results, "live"
+
+def _degrade(query, num_results, reason):
+    stale = search_cache.get(query, num_results, allow_stale=True)
+    if stale is not None:
+        return stale, "stale_cache"
+    return None, reason
@@ -1,14 +1,16 @@
 import os
 import json
-from openai import OpenAI
 from dotenv import load_dotenv
 from .nass_service import get_historical_prices
 from .analysis_service import analyze_price_trends
 from .news_service import get_market_news
 from datetime import datetime
+from shared import llm_gateway
+from shared.singleflight import single_flight, text_key
 
 load_dotenv()
 
+@single_flight(key=text_key)
 def predict_market(commodity: str):
     """
     Orchestrates the market prediction workflow.
@@ -89,20 +91,19 @@ def predict_market(commodity: str):
         - If Confidence is High, the Action MUST be BUY or SELL.
         """
     
-    # 3. LLM Prediction (Common for both flows)
+    # 3. LLM Prediction (Common for both flows, through the shared gateway)
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         return {"error": "OPENAI_API_KEY missing."}
-        
-    client = OpenAI(api_key=api_key)
     
     try:
-        response = client.chat.completions.create(
+        content = llm_gateway.chat(
+            "market",
+            [{"role": "user", "content": prompt}],
             model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"}
         )
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(content)
     except Exception as e:
         result = {"error": f"LLM Error: {e}"}
         
@@ -2,7 +2,9 @@ import requests
 import os
 import json
 from datetime import datetime
+from shared.singleflight import single_flight, text_key
 
+@single_flight(key=text_key)
 def get_historical_prices(commodity: str, year_start: int, year_end: int):
     """
     Fetches historical price data from USDA NASS Quick Stats.
@@ -1,6 +1,8 @@
 from duckduckgo_search import DDGS
 from datetime import datetime
+from shared.singleflight import single_flight, text_key
 
+@single_flight(key=text_key)
 def get_market_news(commodity: str, limit=5):
     """
     Fetches recent news headlines for a commodity using DuckDuckGo.
@@ -0,0 +1,277 @@
+"""
+Shared gateway for the OpenAI chat completion and embedding calls of every agent.
+
+- Exact-prompt response cache for chat, in memory and on disk (SQLite, with a TTL)
+- A semaphore caps concurrent upstream calls; extra callers queue for a slot
+- 429s, 5xx responses and connection errors are retried with jittered
+  exponential backoff
+- Per-agent counters for calls, cache hits, retries, errors, tokens and latency
+
+Usage:
+    from shared import llm_gateway
+    text = llm_gateway.chat("soil", messages, model="gpt-4o",
+                            response_format={"type": "json_object"})
+    vectors = llm_gateway.embed("embeddings", texts, model="text-embedding-3-large")
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import openai
+from openai import OpenAI
+
+from .sqlite import connect
+
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "llm_cache.db"),
+)
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "24"))
+LLM_MEMORY_CACHE_SIZE = 512
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Seconds a caller waits in the queue for a free slot before giving up
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = 1.0
+LLM_BACKOFF_MAX_SECONDS = 20.0
+
+_client = None
+
+def get_client():
+    """OpenAI client created on first use; retries are handled here, not by the SDK"""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment.")
+        _client = OpenAI(api_key=api_key, max_retries=0)
+    return _client
+
+LLM_CACHE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)""",
+)
+
+def prompt_key(model, messages, params):
+    """Exact-prompt cache key: model, messages and generation parameters"""
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResponseCache:
+    """Completion texts by prompt key: a bounded in-memory LRU in front of SQLite"""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_hours=LLM_CACHE_TTL_HOURS, memory_size=LLM_MEMORY_CACHE_SIZE):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                return entry[0]
+
+        with connect(self.path, LLM_CACHE_SCHEMA) as conn:
+            row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl_seconds:
+            return None
+        self._remember(key, row[0], row[1])
+        return row[0]
+
+    def put(self, key, response):
+        created_at = time.time()
+        self._remember(key, response, created_at)
+        with connect(self.path, LLM_CACHE_SCHEMA) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, created_at),
+            )
+
+    def _remember(self, key, response, created_at):
+        with self._lock:
+            self._memory[key] = (response, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+class UsageCounters:
+    """Per-agent call, cache, retry, error, token and latency totals"""
+
+    FIELDS = ("calls", "cache_hits", "retries", "errors", "prompt_tokens", "completion_tokens", "latency_seconds")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents = {}
+
+    def add(self, agent, **amounts):
+        with self._lock:
+            totals = self._agents.setdefault(agent, dict.fromkeys(self.FIELDS, 0))
+            for field, amount in amounts.items():
+                totals[field] += amount
+
+    def stats(self):
+        with self._lock:
+            result = {}
+            for agent, totals in self._agents.items():
+                upstream = totals["calls"] - totals["cache_hits"]
+                result[agent] = {
+                    **totals,
+                    "latency_seconds": round(totals["latency_seconds"], 3),
+                    "avg_latency_seconds": round(totals["latency_seconds"] / upstream, 3) if upstream else None,
+                }
+            return result
+
+response_cache = ResponseCache()
+usage = UsageCounters()
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+def _is_retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+def _acquire_slot():
+    if not _slots.acquire(timeout=LLM_QUEUE_TIMEOUT):
+        raise TimeoutError(f"No LLM slot free after {LLM_QUEUE_TIMEOUT:.0f}s ({LLM_MAX_CONCURRENCY} calls in flight)")
+
+def _create(agent, create, max_retries=LLM_MAX_RETRIES, keep_slot=False, **request):
+    """
+    create(**request) with retries, inside a concurrency slot. The slot is
+    free again during backoff. With keep_slot the slot is still held when the
+    response is returned, and the caller must release it (for streams, which
+    keep the upstream connection busy until they are read).
+    """
+    for attempt in range(max_retries + 1):
+        _acquire_slot()
+        try:
+            response = create(**request)
+        except Exception as e:
+            _slots.release()
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            usage.add(agent, retries=1)
+            time.sleep(_backoff(attempt))
+            continue
+        if not keep_slot:
+            _slots.release()
+        return response
+
+def chat(agent, messages, model="gpt-4o", cache=True, **params):
+    """
+    Chat completion text for `messages`, served from the exact-prompt cache
+    when possible. `agent` labels the call in the usage counters.
+    """
+    key = prompt_key(model, messages, params)
+    if cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            usage.add(agent, calls=1, cache_hits=1)
+            return cached
+
+    start = time.perf_counter()
+    try:
+        response = _create(agent, get_client().chat.completions.create, model=model, messages=messages, **params)
+    except Exception:
+        usage.add(agent, calls=1, errors=1, latency_seconds=time.perf_counter() - start)
+        raise
+
+    content = response.choices[0].message.content
+    tokens = response.usage
+    usage.add(
+        agent,
+        calls=1,
+        prompt_tokens=tokens.prompt_tokens if tokens else 0,
+        completion_tokens=tokens.completion_tokens if tokens else 0,
+        latency_seconds=time.perf_counter() - start,
+    )
+    if cache and content:
+        response_cache.put(key, content)
+    return content
+
+def stream_chat(agent, messages, model="gpt-4o", cache=True, **params):
+    """
+    Like `chat`, but yields the text in chunks as it is generated. A cached
+    response is yielded in one chunk. The concurrency slot is held from the
+    moment the stream opens until it is fully read (or the generator is
+    closed), so a slow reader occupies a slot for the whole answer. Token
+    usage is read from the final chunk.
+    """
+    key = prompt_key(model, messages, params)
+    if cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            usage.add(agent, calls=1, cache_hits=1)
+            yield cached
+            return
+
+    start = time.perf_counter()
+    parts = []
+    prompt_tokens = completion_tokens = 0
+    try:
+        stream = _create(agent, get_client().chat.completions.create, keep_slot=True, model=model,
+                         messages=messages, stream=True, stream_options={"include_usage": True}, **params)
+        try:
+            with stream:
+                for chunk in stream:
+                    if chunk.usage:
+                        prompt_tokens = chunk.usage.prompt_tokens
+                        completion_tokens = chunk.usage.completion_tokens
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+        finally:
+            _slots.release()
+    except Exception:
+        usage.add(agent, calls=1, errors=1, latency_seconds=time.perf_counter() - start)
+        raise
+
+    usage.add(
+        agent,
+        calls=1,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency_seconds=time.perf_counter() - start,
+    )
+    if cache and parts:
+        response_cache.put(key, "".join(parts))
+
+def embed(agent, texts, model="text-embedding-3-large", timeout=None, max_retries=LLM_MAX_RETRIES, **params):
+    """
+    Embedding vectors for `texts`, in input order, through the same
+    concurrency slots, retries and usage counters as chat. `timeout` bounds
+    each attempt and `max_retries` can be lowered for callers with a fallback.
+    """
+    request = {"model": model, "input": list(texts), **params}
+    if timeout is not None:
+        request["timeout"] = timeout
+
+    start = time.perf_counter()
+    try:
+        response = _create(agent, get_client().embeddings.create, max_retries=max_retries, **request)
+    except Exception:
+        usage.add(agent, calls=1, errors=1, latency_seconds=time.perf_counter() - start)
+        raise
+
+    usage.add(
+        agent,
+        calls=1,
+        prompt_tokens=response.usage.prompt_tokens if response.usage else 0,
+        latency_seconds=time.perf_counter() - start,
+    )
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+def stats():
+    """Per-agent usage counters"""
+    return usage.stats()
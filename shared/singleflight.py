@@ -0,0 +1,98 @@
+"""
+Single-flight request coalescing.
+
+When several requests need the same upstream result at the same time (e.g. a
+newsletter sends dozens of farmers in one county to /recommend within
+seconds), only the first caller runs the computation; concurrent callers with
+the same key wait for it and share the result. Nothing is cached once the
+call finishes - this only collapses simultaneous duplicates.
+"""
+import copy
+import functools
+import threading
+
+# Coordinates are rounded to this many decimals (~1 km) to form keys, finer
+# than the weather model grid, so nearby duplicate requests coalesce. Only for
+# results that don't depend on the exact point (no echoed location, no
+# point-interpolated values)
+COORD_KEY_DECIMALS = 2
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Each caller gets its own copy so one can't mutate another's result
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn(*args, **kwargs)
+            # Followers copy from a private snapshot, never from the object
+            # the leader returns (and may go on to mutate)
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        return {"name": self.name, "executed": self.executed, "coalesced": self.coalesced}
+
+_groups = []
+
+def single_flight(key=None):
+    """
+    Decorator: concurrent calls with the same key share one execution.
+    `key(*args, **kwargs)` builds the key; by default it's the arguments as given.
+    """
+    def decorator(fn):
+        group = SingleFlight(f"{fn.__module__}.{fn.__qualname__}")
+        _groups.append(group)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return group.do(call_key, fn, *args, **kwargs)
+
+        wrapper.flight = group
+        return wrapper
+    return decorator
+
+def coordinate_key(lat, lon, *args, **kwargs):
+    return (round(float(lat), COORD_KEY_DECIMALS), round(float(lon), COORD_KEY_DECIMALS), args, tuple(sorted(kwargs.items())))
+
+def text_key(text, *args, **kwargs):
+    return (" ".join(str(text).lower().split()), args, tuple(sorted(kwargs.items())))
+
+def flight_stats():
+    """Executed vs coalesced call counts for every single-flight function"""
+    return [group.stats() for group in _groups]
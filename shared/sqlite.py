@@ -0,0 +1,26 @@
+"""
+SQLite connections for the on-disk caches and stores.
+
+Each store passes its own schema (CREATE ... IF NOT EXISTS statements), which
+is applied on every connect so a fresh or deleted database file just works.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+
+@contextmanager
+def connect(path, schema=(), row_factory=None):
+    """SQLite connection with `schema` applied, that commits on success and is always closed"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    if row_factory is not None:
+        conn.row_factory = row_factory
+    try:
+        with conn:
+            for statement in schema:
+                conn.execute(statement)
+            yield conn
+    finally:
+        conn.close()
@@ -0,0 +1,135 @@
+"""
+Full advisory pipeline run server-side as a dependency graph.
+
+    location ──> recommendation ──> market:<crop> (one per crop, in parallel)
+                                └──> grants (for the top recommended crop)
+
+If the location or recommendation fails, grants still run on the profile
+alone.
+
+Each stage is submitted as soon as its inputs are ready and reported as soon
+as it finishes, so total time approaches the critical path
+(location -> recommendation -> slowest market or grant call) rather than the
+sum of every step.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .agent import analyze_and_recommend
+from .geocoding_service import get_coordinates
+from market_price_agent import predict_market
+
+# Market calls for all crops plus the grant search run side by side
+ADVISORY_MAX_WORKERS = 8
+ADVISORY_TOP_GRANTS = 5
+
+def resolve_location(profile):
+    """Coordinates for the profile's location name or lat/lon"""
+    if profile.get("location_name"):
+        coords = get_coordinates(profile["location_name"])
+        if not coords:
+            raise ValueError(f"Could not find coordinates for '{profile['location_name']}'")
+        return {"lat": coords["lat"], "lon": coords["lon"]}
+    if profile.get("latitude") is None or profile.get("longitude") is None:
+        raise ValueError("Please provide either 'latitude'/'longitude' or a 'location_name'.")
+    return {"lat": profile["latitude"], "lon": profile["longitude"]}
+
+def recommend(location):
+    result = analyze_and_recommend(location["lat"], location["lon"])
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+def market(crop):
+    result = predict_market(crop)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+def find_grants(profile, crop=None):
+    """
+    Grant matches for the farmer profile (same search as the workflow's grant
+    step), including crop-specific programs when a crop is given.
+    """
+    # Imported here: loading the grant indexes is only needed for this stage
+    from grants_agent.cohort import profile_intents
+    from grants_agent.embeddings import search_local_programs
+
+    if crop:
+        profile = {**profile, "crops": [crop]}
+    matches, _ = search_local_programs(
+        profile_intents(profile), profile, top_k=ADVISORY_TOP_GRANTS, relevance_threshold=1.5
+    )
+    return [
+        {
+            "program_id": program.get("program_id"),
+            "name": program.get("program_name"),
+            "agency": program.get("agency"),
+            "type": program.get("program_type"),
+            "amount": program.get("funding_amount"),
+            "deadline": program.get("application_deadlines"),
+            "url": program.get("official_url"),
+            "match_score": program["_match_score"],
+            "distance": float(program["_distance"]),
+        }
+        for program in matches
+    ]
+
+def recommended_crops(recommendation):
+    recs = recommendation.get("recommendations", [])
+    return [rec["crop"] for rec in recs if isinstance(rec, dict) and rec.get("crop")]
+
+def run_advisory(profile, max_workers=ADVISORY_MAX_WORKERS):
+    """
+    Run the advisory graph for a profile, yielding one event per stage as it
+    completes: {"stage", "status" ("done"/"error"), "result" or "error",
+    "elapsed"} and finally {"stage": "complete", ...} with the total time.
+    A failed stage skips the stages that depend on it; the others still run.
+    """
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    failed = []
+
+    def submit(stage, fn, *args):
+        pending[executor.submit(fn, *args)] = stage
+
+    try:
+        submit("location", resolve_location, profile)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = pending.pop(future)
+                event = {"stage": stage, "elapsed": round(time.perf_counter() - start, 3)}
+                try:
+                    result = future.result()
+                except Exception as e:
+                    event.update(status="error", error=str(e))
+                    failed.append(stage)
+                    yield event
+                    if stage in ("location", "recommendation"):
+                        # No crop to search for
+                        submit("grants", find_grants, profile)
+                    continue
+
+                event.update(status="done", result=result)
+                yield event
+
+                # Start whatever this stage unblocks
+                if stage == "location":
+                    submit("recommendation", recommend, result)
+                elif stage == "recommendation":
+                    crops = recommended_crops(result)
+                    for crop in crops:
+                        submit(f"market:{crop}", market, crop)
+                    submit("grants", find_grants, profile, crops[0] if crops else None)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield {
+        "stage": "complete",
+        "status": "error" if failed else "done",
+        "failed": failed,
+        "elapsed": round(time.perf_counter() - start, 3),
+    }
@@ -1,15 +1,32 @@
 from .weather_service import get_weather_data
 from .soil_service import get_soil_data
+from .agroclimate import climate_indicators
+from .features import agronomy_features, feature_key
+from .soil_profile import profile_from_dict
+from .recommendation_cache import recommendation_cache
+from .suitability import SUITABILITY_MIN_CONFIDENCE, rank_crops, snapshot
 import json
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
+from shared import llm_gateway
+from shared.singleflight import single_flight
 
 load_dotenv()
 
+# "auto": rule engine first, LLM only when its confidence is low
+# "rules": rule engine only; "llm": always ask the LLM
+RECOMMENDATION_ENGINE = os.getenv("RECOMMENDATION_ENGINE", "auto")
+ENGINE_NOTES = {
+    "rules": "Recommendations scored from crop requirements against real-time data.",
+    "llm": "Recommendations generated by AI based on real-time data.",
+}
+
+# Exact coordinates: the result echoes the location and point-specific soil values
+@single_flight()
 def analyze_and_recommend(lat: float, lon: float):
     """
-    Orchestrates data fetching and generates crop recommendations using OpenAI.
+    Orchestrates data fetching and generates crop recommendations: from the
+    rule-based suitability engine when it is confident, otherwise using OpenAI.
     """
     weather = get_weather_data(lat, lon)
     soil = get_soil_data(lat, lon)
@@ -17,63 +34,95 @@ def analyze_and_recommend(lat: float, lon: float):
     if not weather or not soil:
         return {"error": "Failed to fetch necessary environmental data."}
 
+    # Climate normals (GDD, frost dates, rainfall) from cached history; None if unavailable
+    climate = climate_indicators(lat, lon)
+
+    # Discretize conditions; farms with the same features share recommendations
+    features = agronomy_features(lat, weather, soil, climate=climate)
+    key = feature_key(features)
+
+    # Fast path: score every crop against the measured conditions
+    ranked = rank_crops(snapshot(weather, soil, features["season"]))
+    confidence = ranked[0]["score"]
+    if RECOMMENDATION_ENGINE == "rules" or (
+        RECOMMENDATION_ENGINE == "auto" and confidence >= SUITABILITY_MIN_CONFIDENCE
+    ):
+        return _build_result(lat, lon, weather, soil, features, ranked, cached=False,
+                             engine="rules", confidence=confidence, climate=climate)
+    
+    recommendations = recommendation_cache.get(key)
+    if recommendations is not None:
+        return _build_result(lat, lon, weather, soil, features, recommendations, cached=True,
+                             engine="llm", confidence=confidence, climate=climate)
+    
     # Generate Prompt for LLM
-    prompt = _generate_agronomy_prompt(
-        location={"lat": lat, "lon": lon},
-        weather=weather,
-        soil=soil
-    )
+    prompt = _generate_agronomy_prompt(features)
     
-    # Call OpenAI
+    # Call OpenAI (through the shared gateway: prompt cache, retries, rate limits)
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
-        return {"error": "OPENAI_API_KEY not found in environment."}
-        
-    client = OpenAI(api_key=api_key)
+        return _build_result(lat, lon, weather, soil, features, ranked, cached=False,
+                             engine="rules", confidence=confidence, climate=climate)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o", # Using a capable model
-            messages=[
+        content = llm_gateway.chat(
+            "soil",
+            [
                 {"role": "system", "content": "You are a helpful agricultural expert. Output valid JSON only."},
                 {"role": "user", "content": prompt}
             ],
+            model="gpt-4o", # Using a capable model
             response_format={"type": "json_object"}
         )
         
-        content = response.choices[0].message.content
         llm_result = json.loads(content)
         recommendations = llm_result.get("recommendations", [])
+        if recommendations:
+            recommendation_cache.put(key, recommendations)
         
     except Exception as e:
         print(f"OpenAI Error: {e}")
-        recommendations = ["Error generating recommendations from AI."]
+        # Fall back to the rule engine's ranking
+        return _build_result(lat, lon, weather, soil, features, ranked, cached=False,
+                             engine="rules", confidence=confidence, climate=climate)
 
+    return _build_result(lat, lon, weather, soil, features, recommendations, cached=False,
+                         engine="llm", confidence=confidence, climate=climate)
+
+def _build_result(lat, lon, weather, soil, features, recommendations, cached, engine, confidence, climate):
+    profile = soil.get("data", [{}])[0].get("soil_profile")
+    profile = profile_from_dict(profile) if profile else None
     return {
         "location": {"lat": lat, "lon": lon},
         "environmental_summary": {
             "temperature": weather.get("current_weather", {}).get("temperature"),
             "soil_type": soil.get("data", [{}])[0].get("soil_type"),
-            "soil_texture": soil.get("data", [{}])[0].get("soil_texture", {})
+            "soil_texture": soil.get("data", [{}])[0].get("soil_texture", {}),
+            "soil_properties": profile.summary() if profile else None
         },
+        "climate": climate,
+        "conditions": features,
         "recommendations": recommendations,
-        "note": "Recommendations generated by AI based on real-time data."
+        "cached": cached,
+        "engine": engine,
+        "confidence": confidence,
+        "note": ENGINE_NOTES[engine]
     }
 
-def _generate_agronomy_prompt(location, weather, soil):
+def _generate_agronomy_prompt(features):
     """
     Constructs a detailed prompt for the LLM acting as an expert agronomist.
+    Uses discretized conditions only, so the same conditions give the same prompt.
     """
-    soil_data = soil.get("data", [{}])[0]
-    
     return f"""
     You are an expert Agronomist.
     
-    **Location**: {location['lat']}, {location['lon']}
     **Conditions**:
-    - Weather: {weather.get('current_weather', {})}
-    - Soil: {soil_data.get('soil_type', 'Unknown')} ({soil_data.get('soil_texture', 'Unknown')})
-    - Moisture: {soil_data.get('soil_moisture', 'Unknown')}% | Temp: {soil_data.get('soil_temperature', 'Unknown')}°C
+    - Climate Zone: {features['climate_zone']} | Season: {features['season']}
+    - Air Temperature: {features['temperature_band']}
+    - Soil: {features['soil_class']} | pH: {features['ph_band']} | Organic Matter: {features['organic_matter']}
+    - Soil Moisture: {features['moisture_band']}
+    - Frost Risk (next 30 days): {features['frost_risk']} | Growing Season Left: {features['growing_season']}
     
     **Task**:
     Recommend 3 optimal crops to plant *now*.
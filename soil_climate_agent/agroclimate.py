@@ -0,0 +1,258 @@
+"""
+Agro-climate indicators from Open-Meteo daily history.
+
+Daily max/min temperature and precipitation for the last CLIMATE_HISTORY_YEARS
+complete years are fetched once per grid cell (CLIMATE_CELL_DEG on a side)
+and cached as float32 (years x 365) arrays in an .npz file, leap days
+dropped. Indicators are computed from those arrays with NumPy over a leading
+batch axis, so many cells are summarised in one pass:
+
+- growing degree days (base 10°C, 30°C cap): annual normal and the normal
+  for the next CLIMATE_GDD_WINDOW_DAYS
+- frost dates: median and 90%-safe last spring / first autumn frost,
+  frost-free season length, and the chance of frost in the next 30 days
+- precipitation: annual and monthly normals, and the next-30-day normal
+"""
+import math
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import requests
+
+from shared.singleflight import single_flight
+
+OPEN_METEO_ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+CLIMATE_CACHE_DIR = os.getenv(
+    "CLIMATE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "climate"),
+)
+CLIMATE_CELL_DEG = float(os.getenv("CLIMATE_CELL_DEG", "0.25"))
+CLIMATE_HISTORY_YEARS = int(os.getenv("CLIMATE_HISTORY_YEARS", "10"))
+# Cells fetched at once by the batch API
+CLIMATE_FETCH_WORKERS = int(os.getenv("CLIMATE_FETCH_WORKERS", "4"))
+# History is fetched on the /recommend path, so archive calls are kept short
+# and a failed cell is not retried for a while
+CLIMATE_FETCH_TIMEOUT = float(os.getenv("CLIMATE_FETCH_TIMEOUT", "8"))
+CLIMATE_RETRY_AFTER_SECONDS = 300
+
+GDD_BASE_C = 10.0
+GDD_CAP_C = 30.0
+FROST_C = 0.0
+CLIMATE_GDD_WINDOW_DAYS = 120
+CLIMATE_OUTLOOK_DAYS = 30
+DAYS_PER_YEAR = 365
+# First day-of-year (0-based, non-leap) of each month
+MONTH_STARTS = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
+# Southern-hemisphere frost seasons are read from July 1
+SOUTHERN_SHIFT = 181
+
+def cell_of(lat, lon):
+    """Climate grid cell (row, col) containing a point"""
+    return math.floor(lat / CLIMATE_CELL_DEG), math.floor(lon / CLIMATE_CELL_DEG)
+
+def _cell_center(cell):
+    return (cell[0] + 0.5) * CLIMATE_CELL_DEG, (cell[1] + 0.5) * CLIMATE_CELL_DEG
+
+def _history_years(today=None):
+    last = (today or date.today()).year - 1
+    return last - CLIMATE_HISTORY_YEARS + 1, last
+
+def day_of_year(day):
+    """0-based day of a 365-day year (Feb 29 counts as Feb 28)"""
+    return (date(2001, day.month, min(day.day, 28) if day.month == 2 else day.day) - date(2001, 1, 1)).days
+
+def _calendar_date(doy):
+    return (date(2001, 1, 1) + timedelta(days=int(doy) % DAYS_PER_YEAR)).strftime("%m-%d")
+
+def _to_year_matrix(days, values, first_year, years):
+    """(years, 365) array from a daily series, leap days dropped, gaps NaN"""
+    matrix = np.full((years, DAYS_PER_YEAR), np.nan, dtype="float32")
+    for day, value in zip(days, values):
+        day = date.fromisoformat(day)
+        if value is None or (day.month == 2 and day.day == 29) or not 0 <= day.year - first_year < years:
+            continue
+        matrix[day.year - first_year, day_of_year(day)] = value
+    return matrix
+
+# cell -> time before which a failed fetch is not retried
+_failed_until = {}
+
+def _cache_path(cell, first_year, last_year):
+    return os.path.join(CLIMATE_CACHE_DIR, f"{cell[0]}_{cell[1]}_{first_year}-{last_year}.npz")
+
+@single_flight()
+def load_history(cell):
+    """
+    {"tmax", "tmin", "precip"} float32 (years, 365) arrays for a cell, from
+    the cache or fetched once from the Open-Meteo archive. None on failure
+    (and for CLIMATE_RETRY_AFTER_SECONDS afterwards, without calling again).
+    """
+    first_year, last_year = _history_years()
+    path = _cache_path(cell, first_year, last_year)
+    if os.path.exists(path):
+        with np.load(path) as cached:
+            return {name: cached[name] for name in ("tmax", "tmin", "precip")}
+
+    if time.time() < _failed_until.get(cell, 0):
+        return None
+
+    lat, lon = _cell_center(cell)
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "start_date": f"{first_year}-01-01",
+        "end_date": f"{last_year}-12-31",
+        "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
+        "timezone": "auto",
+    }
+    try:
+        response = requests.get(OPEN_METEO_ARCHIVE_URL, params=params, timeout=CLIMATE_FETCH_TIMEOUT)
+        response.raise_for_status()
+        daily = response.json().get("daily", {})
+    except Exception as e:
+        print(f"Open-Meteo Archive Error: {e}")
+        _failed_until[cell] = time.time() + CLIMATE_RETRY_AFTER_SECONDS
+        return None
+
+    years = last_year - first_year + 1
+    history = {
+        name: _to_year_matrix(daily.get("time", []), daily.get(field, []), first_year, years)
+        for name, field in (("tmax", "temperature_2m_max"), ("tmin", "temperature_2m_min"),
+                            ("precip", "precipitation_sum"))
+    }
+    os.makedirs(CLIMATE_CACHE_DIR, exist_ok=True)
+    np.savez_compressed(path, **history)
+    return history
+
+def _window(doy, length):
+    """Day indices of a window starting at doy, wrapping past the year end"""
+    return (doy + np.arange(length)) % DAYS_PER_YEAR
+
+def _year_mean(totals, has_data):
+    """
+    Mean of per-year totals over the last (years) axis, counting only years
+    with data; an all-missing year would otherwise add up to 0. NaN if none.
+    """
+    count = has_data.sum(axis=-1)
+    total = np.where(has_data, totals, 0).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+def compute_indicators(tmax, tmin, precip, doy, southern):
+    """
+    Indicators for a batch of cells. tmax/tmin/precip are (cells, years, 365)
+    arrays; doy is today's 0-based day of year; southern is a (cells,) bool
+    array. Returns a dict of (cells,) arrays (frost days of year are floats,
+    NaN where a cell never / always sees frost).
+    """
+    has_data = ~np.isnan(tmin).all(axis=-1)
+    has_precip = ~np.isnan(precip).all(axis=-1)
+    years_with_data = has_data.sum(axis=-1)
+
+    # Growing degree days: mean temperature with tmax capped and tmin floored
+    gdd = np.clip((np.minimum(tmax, GDD_CAP_C) + np.maximum(tmin, GDD_BASE_C)) / 2 - GDD_BASE_C, 0, None)
+    gdd_annual = _year_mean(np.nansum(gdd, axis=-1), has_data)
+    gdd_window = _year_mean(np.nansum(gdd[..., _window(doy, CLIMATE_GDD_WINDOW_DAYS)], axis=-1), has_data)
+
+    # Frost dates in a season frame starting Jan 1 (north) or Jul 1 (south)
+    shift = np.where(southern, SOUTHERN_SHIFT, 0)
+    order = (np.arange(DAYS_PER_YEAR)[np.newaxis, :] + shift[:, np.newaxis]) % DAYS_PER_YEAR
+    frost = np.take_along_axis(tmin <= FROST_C, order[:, np.newaxis, :], axis=-1)
+    half = DAYS_PER_YEAR // 2
+    days = np.arange(DAYS_PER_YEAR)
+    # No spring frost counts as "before the season", no autumn frost as "after it"
+    last_spring = np.where(frost[..., :half], days[:half], -1).max(axis=-1).astype("float32")
+    first_autumn = np.where(frost[..., half:], days[half:], DAYS_PER_YEAR).min(axis=-1).astype("float32")
+    last_spring[~has_data] = np.nan
+    first_autumn[~has_data] = np.nan
+    with warnings.catch_warnings():
+        # Cells with no data at all give NaN, which is what we want
+        warnings.simplefilter("ignore", RuntimeWarning)
+        last_spring_p50 = np.nanpercentile(last_spring, 50, axis=-1)
+        last_spring_p90 = np.nanpercentile(last_spring, 90, axis=-1)
+        first_autumn_p50 = np.nanpercentile(first_autumn, 50, axis=-1)
+        first_autumn_p10 = np.nanpercentile(first_autumn, 10, axis=-1)
+        frost_free_days = np.nanmedian(first_autumn - last_spring - 1, axis=-1)
+
+    outlook = _window(doy, CLIMATE_OUTLOOK_DAYS)
+    frost_chance = (tmin[..., outlook] <= FROST_C).any(axis=-1).sum(axis=-1) / np.maximum(years_with_data, 1)
+
+    precip_annual = _year_mean(np.nansum(precip, axis=-1), has_precip)
+    monthly = np.add.reduceat(np.nan_to_num(precip), MONTH_STARTS, axis=-1)
+    precip_monthly = _year_mean(np.moveaxis(monthly, -1, 0), has_precip).T
+    precip_outlook = _year_mean(np.nansum(precip[..., outlook], axis=-1), has_precip)
+
+    def to_calendar(season_doy, never):
+        calendar = (season_doy + shift) % DAYS_PER_YEAR
+        return np.where(never, np.nan, calendar)
+
+    return {
+        "years": years_with_data,
+        "gdd_annual": gdd_annual,
+        "gdd_window": gdd_window,
+        "last_spring_frost_p50": to_calendar(last_spring_p50, last_spring_p50 < 0),
+        "last_spring_frost_p90": to_calendar(last_spring_p90, last_spring_p90 < 0),
+        "first_autumn_frost_p50": to_calendar(first_autumn_p50, first_autumn_p50 >= DAYS_PER_YEAR),
+        "first_autumn_frost_p10": to_calendar(first_autumn_p10, first_autumn_p10 >= DAYS_PER_YEAR),
+        "frost_free_days": frost_free_days,
+        "frost_chance_outlook": frost_chance,
+        "precip_annual": precip_annual,
+        "precip_monthly": precip_monthly,
+        "precip_outlook": precip_outlook,
+    }
+
+def _summary(indicators, i):
+    """JSON-friendly indicators for cell i of a batch"""
+    def number(name, digits=0):
+        value = float(indicators[name][i])
+        return None if np.isnan(value) else round(value, digits) if digits else int(round(value))
+
+    def frost_date(name):
+        value = float(indicators[name][i])
+        return None if np.isnan(value) else _calendar_date(value)
+
+    return {
+        "years": int(indicators["years"][i]),
+        "gdd_base_c": GDD_BASE_C,
+        "gdd_annual": number("gdd_annual"),
+        f"gdd_next_{CLIMATE_GDD_WINDOW_DAYS}_days": number("gdd_window"),
+        "last_spring_frost_median": frost_date("last_spring_frost_p50"),
+        "last_spring_frost_90pct": frost_date("last_spring_frost_p90"),
+        "first_autumn_frost_median": frost_date("first_autumn_frost_p50"),
+        "first_autumn_frost_10pct": frost_date("first_autumn_frost_p10"),
+        "frost_free_days": number("frost_free_days"),
+        f"frost_chance_next_{CLIMATE_OUTLOOK_DAYS}_days": number("frost_chance_outlook", 2),
+        "precip_annual_mm": number("precip_annual"),
+        f"precip_next_{CLIMATE_OUTLOOK_DAYS}_days_mm": number("precip_outlook"),
+        "precip_monthly_mm": [None if np.isnan(v) else round(float(v)) for v in indicators["precip_monthly"][i]],
+    }
+
+def batch_indicators(points, now=None):
+    """
+    Indicators for many (lat, lon) points: one history per distinct cell
+    (fetched in parallel on a cache miss) and one vectorized pass over all
+    cells. Returns a list aligned with `points`; None where history is missing.
+    """
+    cells = [cell_of(lat, lon) for lat, lon in points]
+    unique = list(dict.fromkeys(cells))
+    with ThreadPoolExecutor(max_workers=CLIMATE_FETCH_WORKERS) as executor:
+        histories = dict(zip(unique, executor.map(load_history, unique)))
+    available = [cell for cell in unique if histories[cell] is not None]
+    if not available:
+        return [None] * len(points)
+
+    stacked = {name: np.stack([histories[cell][name] for cell in available])
+               for name in ("tmax", "tmin", "precip")}
+    southern = np.array([_cell_center(cell)[0] < 0 for cell in available])
+    indicators = compute_indicators(stacked["tmax"], stacked["tmin"], stacked["precip"],
+                                    day_of_year(now or datetime.now()), southern)
+    summaries = {cell: _summary(indicators, i) for i, cell in enumerate(available)}
+    return [summaries.get(cell) for cell in cells]
+
+def climate_indicators(lat, lon, now=None):
+    """Indicators for one point, or None if the history could not be fetched"""
+    return batch_indicators([(lat, lon)], now)[0]
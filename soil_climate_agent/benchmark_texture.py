@@ -0,0 +1,56 @@
+"""
+Benchmark the vectorized USDA texture classifier.
+
+Classifies random sand/silt/clay triples in one batch call and compares the
+per-point cost with classifying a sample of them one dict at a time.
+
+Usage (from the repo root):
+    python -m soil_climate_agent.benchmark_texture
+    python -m soil_climate_agent.benchmark_texture --points 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .texture import TEXTURE_CLASSES, classify_texture, texture_class
+
+def random_textures(n, rng):
+    """n random sand/silt/clay triples summing to 100"""
+    fractions = rng.dirichlet((1.0, 1.0, 1.0), size=n).astype("float32") * 100
+    return fractions[:, 0], fractions[:, 1], fractions[:, 2]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--scalar-sample", type=int, default=20_000,
+                        help="Points classified one at a time for comparison")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sand, silt, clay = random_textures(args.points, np.random.default_rng(args.seed))
+
+    timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        classes = classify_texture(sand, silt, clay)
+        timings.append(time.perf_counter() - start)
+    batch = min(timings)
+
+    sample = min(args.scalar_sample, args.points)
+    start = time.perf_counter()
+    scalar = [texture_class({"sand": sand[i], "silt": silt[i], "clay": clay[i]}) for i in range(sample)]
+    one_at_a_time = time.perf_counter() - start
+    agree = np.mean(np.array(scalar) == np.array(TEXTURE_CLASSES)[classes[:sample]])
+
+    print(f"Points: {args.points:,} | best of {args.repeats}")
+    print(f"{'mode':>14} {'total s':>9} {'ns/point':>9}")
+    print(f"{'batch':>14} {batch:>9.3f} {batch / args.points * 1e9:>9.1f}")
+    print(f"{'one at a time':>14} {one_at_a_time:>9.3f} {one_at_a_time / sample * 1e9:>9.1f}  ({sample:,} points)")
+    print(f"Speedup: {one_at_a_time / sample / (batch / args.points):.0f}x | agreement: {agree:.3f}")
+    counts = np.bincount(classes, minlength=len(TEXTURE_CLASSES))
+    print("Class counts: " + ", ".join(f"{name} {count}" for name, count in zip(TEXTURE_CLASSES, counts)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from .soil_profile import TOPSOIL_DEPTHS, profile_from_dict
+
+# Band edges (upper bounds) and labels for discretizing conditions
+TEMPERATURE_BANDS = [(0, "freezing"), (10, "cold"), (18, "cool"), (26, "warm"), (float("inf"), "hot")]
+MOISTURE_BANDS = [(10, "dry"), (25, "moderate"), (40, "moist"), (float("inf"), "wet")]
+PH_BANDS = [(5.5, "strongly acidic"), (6.5, "slightly acidic"), (7.5, "neutral"), (float("inf"), "alkaline")]
+# Topsoil organic carbon, g/kg
+ORGANIC_CARBON_BANDS = [(10, "low"), (20, "moderate"), (float("inf"), "high")]
+# Chance of frost in the next 30 days, from climate history
+FROST_RISK_BANDS = [(0.05, "none"), (0.3, "low"), (float("inf"), "high")]
+# Growing degree days (base 10°C) normally accumulated over the next 120 days
+GDD_BANDS = [(500, "short"), (1200, "moderate"), (float("inf"), "long")]
+# Climate zones by absolute latitude
+CLIMATE_ZONES = [(23.5, "tropical"), (35, "subtropical"), (55, "temperate"), (66.5, "boreal"), (90.1, "polar")]
+
+NORTHERN_SEASONS = {12: "winter", 1: "winter", 2: "winter", 3: "spring", 4: "spring", 5: "spring",
+                    6: "summer", 7: "summer", 8: "summer", 9: "autumn", 10: "autumn", 11: "autumn"}
+OPPOSITE_SEASON = {"winter": "summer", "summer": "winter", "spring": "autumn", "autumn": "spring"}
+
+def _band(value, bands):
+    if value is None:
+        return "unknown"
+    for upper, label in bands:
+        if value < upper:
+            return label
+    return bands[-1][1]
+
+def season(lat, now=None):
+    """Meteorological season at a latitude (flipped for the southern hemisphere)"""
+    name = NORTHERN_SEASONS[(now or datetime.now()).month]
+    return name if lat >= 0 else OPPOSITE_SEASON[name]
+
+def agronomy_features(lat, weather, soil, now=None, climate=None):
+    """
+    Discretized growing conditions: soil class, temperature band, soil
+    moisture band, topsoil pH and organic matter bands, frost risk and
+    growing season length (from agro-climate indicators), season and climate
+    zone. Nearby farms with similar conditions get the same features (and so
+    share recommendations).
+    """
+    soil_data = soil.get("data", [{}])[0]
+    profile = soil_data.get("soil_profile")
+    profile = profile_from_dict(profile) if profile else None
+    climate = climate or {}
+    return {
+        "soil_class": soil_data.get("soil_type") or "Unknown",
+        "temperature_band": _band(weather.get("current_weather", {}).get("temperature"), TEMPERATURE_BANDS),
+        "moisture_band": _band(soil_data.get("soil_moisture"), MOISTURE_BANDS),
+        "ph_band": _band(profile.mean("phh2o", TOPSOIL_DEPTHS) if profile else None, PH_BANDS),
+        "organic_matter": _band(profile.mean("soc", TOPSOIL_DEPTHS) if profile else None, ORGANIC_CARBON_BANDS),
+        "frost_risk": _band(climate.get("frost_chance_next_30_days"), FROST_RISK_BANDS),
+        "growing_season": _band(climate.get("gdd_next_120_days"), GDD_BANDS),
+        "season": season(lat, now),
+        "climate_zone": _band(abs(lat), CLIMATE_ZONES),
+    }
+
+def feature_key(features):
+    """Cache key for a feature set"""
+    return "|".join(str(features[name]) for name in
+                    ("soil_class", "temperature_band", "moisture_band", "ph_band", "organic_matter",
+                     "frost_risk", "growing_season", "season", "climate_zone"))
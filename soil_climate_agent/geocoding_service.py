@@ -2,7 +2,9 @@ import ssl
 import certifi
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+from shared.singleflight import single_flight, text_key
 
+@single_flight(key=text_key)
 def get_coordinates(location_name: str):
     """
     Converts a location name (e.g., "Ames, Iowa") to latitude and longitude.
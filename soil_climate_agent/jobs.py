@@ -0,0 +1,249 @@
+"""
+Background job queue for long-running advisories, single recommendation and
+market calls, and tile precomputation.
+
+Jobs are recorded in an SQLite store (so they survive restarts) and executed
+by a local worker pool. Stage events are saved as they arrive, so status
+calls can report progress, and finished results are kept for re-fetching. A
+new job with the same inputs as a recent finished one is answered from the
+store without re-running the pipeline.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .advisory import market, recommend, resolve_location, run_advisory
+from .tiles import run_tile_grid, tile_result, tile_store
+from shared.sqlite import connect
+
+JOB_STORE_PATH = os.getenv(
+    "JOB_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "jobs.db"),
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished results are reused for identical requests within this window
+JOB_RESULT_TTL_HOURS = float(os.getenv("JOB_RESULT_TTL_HOURS", "24"))
+
+ACTIVE_STATUSES = ("queued", "running")
+# A job in one of these states is never written to again
+FINAL_STATUSES = ("done", "partial", "error", "cancelled")
+
+JOB_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY, kind TEXT NOT NULL, input_key TEXT NOT NULL,
+        payload TEXT NOT NULL, status TEXT NOT NULL, events TEXT NOT NULL,
+        result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS jobs_input_key ON jobs (input_key, status)",
+)
+
+def input_key(kind, payload):
+    """Stable key for a job's inputs"""
+    return hashlib.sha256(f"{kind}:{json.dumps(payload, sort_keys=True, default=str)}".encode()).hexdigest()
+
+def advisory_result(events):
+    """Collect advisory stage events into one result document"""
+    result = {"markets": {}, "errors": {}}
+    for event in events:
+        stage = event["stage"]
+        if stage == "complete":
+            result["elapsed"] = event["elapsed"]
+            result["failed"] = event["failed"]
+        elif event["status"] == "error":
+            result["errors"][stage] = event["error"]
+        elif stage.startswith("market:"):
+            result["markets"][stage.split(":", 1)[1]] = event["result"]
+        else:
+            result[stage] = event["result"]
+    return result
+
+def single_stage(stage, fn):
+    """Runner for a one-step job: a single event with fn(payload); an exception fails the job"""
+    def run(payload):
+        start = time.perf_counter()
+        result = fn(payload)
+        yield {"stage": stage, "status": "done", "result": result,
+               "elapsed": round(time.perf_counter() - start, 3)}
+    return run
+
+def stage_result(events):
+    """Result of a one-step job"""
+    return events[-1]["result"] if events else None
+
+def recommend_location(payload):
+    """Crop recommendation for a location, from a precomputed tile when there is one (like /recommend)"""
+    location = resolve_location(payload)
+    tile = tile_store.get(location["lat"], location["lon"])
+    return tile if tile is not None else recommend(location)
+
+# Job kinds: (runner yielding stage events for a payload, events -> result)
+JOB_RUNNERS = {
+    "advisory": (run_advisory, advisory_result),
+    "tiles": (run_tile_grid, tile_result),
+    "recommend": (single_stage("recommendation", recommend_location), stage_result),
+    "market": (single_stage("market", lambda payload: market(payload["commodity"])), stage_result),
+}
+
+class JobStore:
+    """Persistent job records: status, stage events so far, and final result"""
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+
+    def create(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with connect(self.path, JOB_SCHEMA, row_factory=sqlite3.Row) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, input_key, payload, status, events, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', '[]', ?, ?)",
+                (job_id, kind, input_key(kind, payload), json.dumps(payload, default=str), now, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        """Job as a dict, or None if unknown"""
+        with connect(self.path, JOB_SCHEMA, row_factory=sqlite3.Row) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["events"] = json.loads(job["events"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def find_finished(self, kind, payload, max_age_seconds):
+        """ID of a recent job with the same inputs that finished with no failed stages, if any"""
+        with connect(self.path, JOB_SCHEMA, row_factory=sqlite3.Row) as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE input_key = ? AND status = 'done' AND updated_at >= ? "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (input_key(kind, payload), time.time() - max_age_seconds),
+            ).fetchone()
+        return row["id"] if row else None
+
+    def active(self):
+        """(id, kind, payload) of jobs that were queued or running"""
+        with connect(self.path, JOB_SCHEMA, row_factory=sqlite3.Row) as conn:
+            rows = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                ACTIVE_STATUSES,
+            ).fetchall()
+        return [(row["id"], row["kind"], json.loads(row["payload"])) for row in rows]
+
+    def restart(self, job_id):
+        """Put a job back in the queue, discarding events from an interrupted run"""
+        with connect(self.path, JOB_SCHEMA, row_factory=sqlite3.Row) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', events = '[]', updated_at = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (time.time(), job_id, *ACTIVE_STATUSES),
+            )
+
+    def update(self, job_id, status=None, event=None, result=None, error=None):
+        """
+        Change a job's status and/or append an event. Jobs that already
+        finished or were cancelled are left alone; returns False for those
+        (and for unknown jobs).
+        """
+        with connect(self.path, JOB_SCHEMA, row_factory=sqlite3.Row) as conn:
+            # Take the write lock before reading, so a concurrent cancel
+            # can't land between the status check and the write
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT status, events FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row["status"] in FINAL_STATUSES:
+                return False
+            events = json.loads(row["events"])
+            if event is not None:
+                events.append(event)
+            conn.execute(
+                "UPDATE jobs SET status = ?, events = ?, result = COALESCE(?, result), "
+                "error = COALESCE(?, error), updated_at = ? WHERE id = ?",
+                (
+                    status or row["status"],
+                    json.dumps(events, default=str),
+                    json.dumps(result, default=str) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+            return True
+
+class JobQueue:
+    """Runs stored jobs on a local worker pool"""
+
+    def __init__(self, store=None, workers=JOB_WORKERS):
+        self.store = store or JobStore()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.cancelled = set()
+        self.lock = threading.Lock()
+
+    def submit(self, kind, payload):
+        """Queue a job (or reuse a recent identical finished one). Returns the job ID"""
+        if kind not in JOB_RUNNERS:
+            raise ValueError(f"Unknown job kind '{kind}'. Choose from: {', '.join(JOB_RUNNERS)}")
+        finished = self.store.find_finished(kind, payload, JOB_RESULT_TTL_HOURS * 3600)
+        if finished:
+            return finished
+        job_id = self.store.create(kind, payload)
+        self.executor.submit(self._run, job_id, kind, payload)
+        return job_id
+
+    def resume(self):
+        """Re-queue jobs left queued or running by a previous process"""
+        for job_id, kind, payload in self.store.active():
+            self.store.restart(job_id)
+            self.executor.submit(self._run, job_id, kind, payload)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns False if it had already finished"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return False
+        with self.lock:
+            self.cancelled.add(job_id)
+        if not self.store.update(job_id, status="cancelled"):
+            # It finished in the meantime
+            with self.lock:
+                self.cancelled.discard(job_id)
+            return False
+        return True
+
+    def _is_cancelled(self, job_id):
+        with self.lock:
+            return job_id in self.cancelled
+
+    def _run(self, job_id, kind, payload):
+        # The store refuses the write if the job was cancelled meanwhile
+        if self._is_cancelled(job_id) or not self.store.update(job_id, status="running"):
+            with self.lock:
+                self.cancelled.discard(job_id)
+            return
+        runner, collect = JOB_RUNNERS[kind]
+        events = []
+        stages = runner(payload)
+        try:
+            for event in stages:
+                if self._is_cancelled(job_id):
+                    return
+                events.append(event)
+                self.store.update(job_id, event=event)
+            if not self._is_cancelled(job_id):
+                # A job with failed stages keeps its result but is never reused
+                status = "partial" if events and events[-1]["status"] == "error" else "done"
+                self.store.update(job_id, status=status, result=collect(events))
+        except Exception as e:
+            self.store.update(job_id, status="error", error=str(e))
+        finally:
+            # Stops the runner's remaining stages if the job was cancelled
+            stages.close()
+            with self.lock:
+                self.cancelled.discard(job_id)
+
+job_queue = JobQueue()
@@ -1,14 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import json
 from .agent import analyze_and_recommend
+from .advisory import run_advisory
+from .agroclimate import batch_indicators
+from .jobs import job_queue
+from .recommendation_cache import recommendation_cache
+from .tiles import TILE_BBOX, TILE_RESOLUTION_DEG, grid_cells, parse_bbox, tile_result, tile_store, today
+from shared import llm_gateway
+from shared.singleflight import flight_stats
 from market_price_agent import predict_market
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="Soil and Climate Agent")
+@asynccontextmanager
+async def lifespan(app):
+    # Pick up advisory and tile jobs interrupted by a restart
+    job_queue.resume()
+    yield
 
-from typing import Optional
+app = FastAPI(title="Soil and Climate Agent", lifespan=lifespan)
+
+from typing import List, Optional
 from .geocoding_service import get_coordinates
 
 class LocationRequest(BaseModel):
@@ -19,10 +35,43 @@ class LocationRequest(BaseModel):
 class MarketRequest(BaseModel):
     commodity: str
 
+class Point(BaseModel):
+    latitude: float
+    longitude: float
+
+class ClimateRequest(BaseModel):
+    points: List[Point]
+
+# Points accepted per /climate request
+CLIMATE_MAX_POINTS = 1000
+
+class TileJobRequest(BaseModel):
+    # "min_lat,min_lon,max_lat,max_lon"; defaults to TILE_BBOX
+    bbox: Optional[str] = None
+    resolution: Optional[float] = None
+
+class AdvisoryRequest(BaseModel):
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    location_name: Optional[str] = None
+    farm_size: Optional[float] = None
+    experience: Optional[str] = None
+    risk_tolerance: Optional[str] = None
+    budget: Optional[str] = None
+
 @app.get("/")
 def read_root():
     return {"message": "Soil and Climate Agent API is running."}
 
+@app.get("/stats")
+def get_stats():
+    """Upstream call coalescing, recommendation cache and per-agent LLM counters"""
+    return {
+        "single_flight": flight_stats(),
+        "recommendation_cache": recommendation_cache.stats(),
+        "llm": llm_gateway.stats(),
+    }
+
 @app.post("/recommend")
 def get_recommendation(location: LocationRequest):
     lat = location.latitude
@@ -40,11 +89,28 @@ def get_recommendation(location: LocationRequest):
     if lat is None or lon is None:
         raise HTTPException(status_code=400, detail="Please provide either 'latitude'/'longitude' or a 'location_name'.")
 
+    # Precomputed regional tile first; compute live on a miss or stale tile
+    tile = tile_store.get(lat, lon)
+    if tile is not None:
+        return tile
+
     result = analyze_and_recommend(lat, lon)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     return result
 
+@app.post("/climate")
+def get_climate_indicators(request: ClimateRequest):
+    """
+    Agro-climate indicators (growing degree days, frost dates, precipitation
+    normals) for a batch of points, in request order. A point whose history
+    could not be fetched gets null.
+    """
+    if len(request.points) > CLIMATE_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {CLIMATE_MAX_POINTS} points per request.")
+    indicators = batch_indicators([(p.latitude, p.longitude) for p in request.points])
+    return {"indicators": indicators}
+
 @app.post("/market_predict")
 def get_market_prediction(request: MarketRequest):
     result = predict_market(request.commodity)
@@ -52,6 +118,102 @@ def get_market_prediction(request: MarketRequest):
         raise HTTPException(status_code=500, detail=result["error"])
     return result
 
+@app.post("/advisory")
+def get_advisory(request: AdvisoryRequest):
+    """
+    Full pipeline (location, crop recommendation, market outlook per crop,
+    grants) in one request. Stages run in parallel where they don't depend
+    on each other and stream back as newline-delimited JSON as they finish.
+    """
+    profile = request.model_dump()
+    if not profile["location_name"] and (profile["latitude"] is None or profile["longitude"] is None):
+        raise HTTPException(status_code=400, detail="Please provide either 'latitude'/'longitude' or a 'location_name'.")
+
+    def events():
+        for event in run_advisory(profile):
+            yield json.dumps(event, default=str) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+def _job_or_404(job_id):
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@app.post("/jobs/advisory", status_code=202)
+def submit_advisory_job(request: AdvisoryRequest):
+    """Queue a full advisory; poll /jobs/{job_id} and fetch /jobs/{job_id}/result"""
+    profile = request.model_dump()
+    if not profile["location_name"] and (profile["latitude"] is None or profile["longitude"] is None):
+        raise HTTPException(status_code=400, detail="Please provide either 'latitude'/'longitude' or a 'location_name'.")
+    job_id = job_queue.submit("advisory", profile)
+    return {"job_id": job_id, "status": job_queue.store.get(job_id)["status"]}
+
+@app.post("/jobs/recommend", status_code=202)
+def submit_recommend_job(location: LocationRequest):
+    """Queue a crop recommendation (as /recommend); poll /jobs/{job_id} for the result"""
+    if not location.location_name and (location.latitude is None or location.longitude is None):
+        raise HTTPException(status_code=400, detail="Please provide either 'latitude'/'longitude' or a 'location_name'.")
+    job_id = job_queue.submit("recommend", location.model_dump())
+    return {"job_id": job_id, "status": job_queue.store.get(job_id)["status"]}
+
+@app.post("/jobs/market", status_code=202)
+def submit_market_job(request: MarketRequest):
+    """Queue a market prediction (as /market_predict); poll /jobs/{job_id} for the result"""
+    job_id = job_queue.submit("market", request.model_dump())
+    return {"job_id": job_id, "status": job_queue.store.get(job_id)["status"]}
+
+@app.post("/jobs/tiles", status_code=202)
+def submit_tile_job(request: TileJobRequest):
+    """
+    Precompute recommendation tiles over a bounding box. Re-submitting after
+    an interruption or a partial run (failed cells) computes only the cells
+    still missing today.
+    """
+    bbox = request.bbox or TILE_BBOX
+    resolution = request.resolution or TILE_RESOLUTION_DEG
+    if not bbox:
+        raise HTTPException(status_code=400, detail="Please provide a 'bbox' (TILE_BBOX is not set).")
+    try:
+        cells = grid_cells(parse_bbox(bbox), resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job_id = job_queue.submit("tiles", {"bbox": bbox, "resolution": resolution, "date": today()})
+    return {"job_id": job_id, "status": job_queue.store.get(job_id)["status"], "cells": len(cells)}
+
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = _job_or_404(job_id)
+    status = {
+        "job_id": job_id,
+        "kind": job["kind"],
+        "status": job["status"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["kind"] == "tiles":
+        # Tile jobs report cell counts rather than stages
+        status["progress"] = tile_result(job["events"]) if job["events"] else None
+    else:
+        status["completed_stages"] = [event["stage"] for event in job["events"] if event["stage"] != "complete"]
+    return status
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = _job_or_404(job_id)
+    if job["status"] not in ("done", "partial"):
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is {job['status']}, no result yet")
+    return job["result"]
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = _job_or_404(job_id)
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' is already {job['status']}")
+    return {"job_id": job_id, "status": "cancelled"}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
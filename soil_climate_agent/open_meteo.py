@@ -0,0 +1,55 @@
+"""
+Thin Open-Meteo forecast client.
+
+Requests only the variables a caller reads, over a few hours around now
+(past_hours/forecast_hours) instead of the default multi-day forecast. Times
+are requested in UTC and parsed into a datetime64 array, so the reading for
+the current hour is found with a binary search rather than taking index 0
+(midnight).
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+# Hours fetched either side of now: enough to bracket the current hour
+PAST_HOURS = 1
+FORECAST_HOURS = 2
+
+def fetch_forecast(lat, lon, hourly=(), current_weather=False, past_hours=PAST_HOURS,
+                   forecast_hours=FORECAST_HOURS, timeout=10):
+    """Forecast response with just the requested hourly variables and/or current weather"""
+    params = {"latitude": lat, "longitude": lon, "timezone": "GMT"}
+    if hourly:
+        params.update(hourly=",".join(hourly), past_hours=past_hours, forecast_hours=forecast_hours)
+    if current_weather:
+        params["current_weather"] = True
+    response = requests.get(FORECAST_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+def hourly_times(hourly):
+    """The hourly time axis ("YYYY-MM-DDTHH:MM", UTC) as datetime64[m]"""
+    return np.array(hourly.get("time", []), dtype="datetime64[m]")
+
+def nearest_index(times, now=None):
+    """Index of the time closest to now in a sorted datetime64 array (binary search)"""
+    if len(times) == 0:
+        raise ValueError("Empty time axis")
+    now = np.datetime64((now or datetime.now(timezone.utc)).replace(tzinfo=None), "m")
+    i = int(np.searchsorted(times, now))
+    if i == 0:
+        return 0
+    if i == len(times):
+        return len(times) - 1
+    return i if times[i] - now < now - times[i - 1] else i - 1
+
+def values_now(data, variables, now=None):
+    """{variable: value} for the hour nearest now (None where missing)"""
+    hourly = data.get("hourly", {})
+    times = hourly_times(hourly)
+    if len(times) == 0:
+        return dict.fromkeys(variables)
+    i = nearest_index(times, now)
+    return {name: (hourly.get(name) or [None] * len(times))[i] for name in variables}
@@ -0,0 +1,60 @@
+import json
+import os
+import threading
+import time
+
+from shared.sqlite import connect
+
+RECOMMENDATION_CACHE_PATH = os.getenv(
+    "RECOMMENDATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "recommendation_cache.db"),
+)
+# Seasons change the feature key anyway; the TTL lets advice refresh within one
+RECOMMENDATION_CACHE_TTL_HOURS = float(os.getenv("RECOMMENDATION_CACHE_TTL_HOURS", "72"))
+
+RECOMMENDATION_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS recommendations (
+        key TEXT PRIMARY KEY, recommendations TEXT NOT NULL, created_at REAL NOT NULL)""",
+)
+
+class RecommendationCache:
+    """LLM crop recommendations keyed by discretized conditions, with a TTL and hit counters"""
+
+    def __init__(self, path=RECOMMENDATION_CACHE_PATH, ttl_hours=RECOMMENDATION_CACHE_TTL_HOURS):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached recommendations for a feature key, or None if missing/expired"""
+        with connect(self.path, RECOMMENDATION_SCHEMA) as conn:
+            row = conn.execute(
+                "SELECT recommendations, created_at FROM recommendations WHERE key = ?", (key,)
+            ).fetchone()
+        fresh = row is not None and time.time() - row[1] <= self.ttl_seconds
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if fresh else None
+
+    def put(self, key, recommendations):
+        with connect(self.path, RECOMMENDATION_SCHEMA) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO recommendations (key, recommendations, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(recommendations), time.time()),
+            )
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+recommendation_cache = RecommendationCache()
@@ -0,0 +1,97 @@
+"""
+Multi-property, multi-depth SoilGrids profile in one request.
+
+All PROFILE_PROPERTIES at all PROFILE_DEPTHS come back from a single
+SoilGrids query and are kept as one float32 (property x depth) array in
+conventional units (%, pH, g/kg, cmol(c)/kg, kg/dm³); missing values are NaN.
+"""
+import os
+
+import numpy as np
+import requests
+
+SOILGRIDS_URL = "https://rest.isric.org/soilgrids/v2.0/properties/query"
+PROFILE_PROPERTIES = ("clay", "silt", "sand", "phh2o", "soc", "cec", "nitrogen", "bdod")
+PROFILE_DEPTHS = ("0-5cm", "5-15cm", "15-30cm", "30-60cm", "60-100cm", "100-200cm")
+# A slow SoilGrids call must not hold up a recommendation for long
+SOILGRIDS_TIMEOUT = float(os.getenv("SOILGRIDS_TIMEOUT", "8"))
+# Mapped-unit divisors, used when a layer's response has no d_factor
+DEFAULT_D_FACTORS = {"clay": 10, "silt": 10, "sand": 10, "phh2o": 10, "soc": 10,
+                     "cec": 10, "nitrogen": 100, "bdod": 100}
+PROPERTY_UNITS = {"clay": "%", "silt": "%", "sand": "%", "phh2o": "pH", "soc": "g/kg",
+                  "cec": "cmol(c)/kg", "nitrogen": "g/kg", "bdod": "kg/dm³"}
+TOPSOIL_DEPTHS = ("0-5cm", "5-15cm", "15-30cm")
+SUBSOIL_DEPTHS = ("30-60cm", "60-100cm")
+
+class SoilProfile:
+    """(property x depth) float32 values with their property and depth labels"""
+
+    def __init__(self, values, properties=PROFILE_PROPERTIES, depths=PROFILE_DEPTHS):
+        self.values = np.asarray(values, dtype="float32")
+        self.properties = tuple(properties)
+        self.depths = tuple(depths)
+        if self.values.shape != (len(self.properties), len(self.depths)):
+            raise ValueError(f"Profile values must be {len(self.properties)} x {len(self.depths)}, "
+                             f"got {self.values.shape}")
+
+    def get(self, prop, depth="0-5cm"):
+        """One value, or None if missing"""
+        value = self.values[self.properties.index(prop), self.depths.index(depth)]
+        return None if np.isnan(value) else round(float(value), 2)
+
+    def mean(self, prop, depths):
+        """Mean of a property over depth layers (unweighted), or None if all missing"""
+        columns = [self.depths.index(d) for d in depths]
+        row = self.values[self.properties.index(prop), columns]
+        if np.isnan(row).all():
+            return None
+        return round(float(np.nanmean(row)), 2)
+
+    def texture(self, depth="0-5cm"):
+        """{"clay", "silt", "sand"} % at a depth, or {} if any is missing"""
+        texture = {name: self.get(name, depth) for name in ("clay", "silt", "sand")}
+        return {} if None in texture.values() else {k: round(v, 1) for k, v in texture.items()}
+
+    def summary(self):
+        """Topsoil (0-30cm) and subsoil (30-100cm) means of every property"""
+        return {
+            layer: {prop: self.mean(prop, depths) for prop in self.properties}
+            for layer, depths in (("topsoil", TOPSOIL_DEPTHS), ("subsoil", SUBSOIL_DEPTHS))
+        }
+
+    def to_dict(self):
+        """JSON-friendly form: labels, units and values (None for missing)"""
+        return {
+            "properties": list(self.properties),
+            "depths": list(self.depths),
+            "units": [PROPERTY_UNITS.get(p) for p in self.properties],
+            "values": [[None if np.isnan(v) else round(float(v), 2) for v in row] for row in self.values],
+        }
+
+def profile_from_dict(data):
+    """SoilProfile from its to_dict() form"""
+    values = [[np.nan if v is None else v for v in row] for row in data["values"]]
+    return SoilProfile(values, data["properties"], data["depths"])
+
+def parse_profile(data, properties=PROFILE_PROPERTIES, depths=PROFILE_DEPTHS):
+    """SoilProfile from a SoilGrids properties/query response"""
+    values = np.full((len(properties), len(depths)), np.nan, dtype="float32")
+    for layer in data.get("properties", {}).get("layers", []):
+        name = layer.get("name")
+        if name not in properties:
+            continue
+        d_factor = layer.get("unit_measure", {}).get("d_factor") or DEFAULT_D_FACTORS.get(name, 1)
+        row = properties.index(name)
+        for depth in layer.get("depths", []):
+            label = depth.get("label")
+            mean = depth.get("values", {}).get("mean")
+            if label in depths and mean is not None:
+                values[row, depths.index(label)] = mean / d_factor
+    return SoilProfile(values, properties, depths)
+
+def fetch_profile(lat, lon, properties=PROFILE_PROPERTIES, depths=PROFILE_DEPTHS, timeout=SOILGRIDS_TIMEOUT):
+    """Every property at every depth for a point, in a single SoilGrids request"""
+    params = {"lat": lat, "lon": lon, "property": list(properties), "depth": list(depths), "value": "mean"}
+    response = requests.get(SOILGRIDS_URL, params=params, timeout=timeout)
+    response.raise_for_status()
+    return parse_profile(response.json(), properties, depths)
@@ -0,0 +1,176 @@
+"""
+Offline soil texture raster: clay/silt/sand percentages for a region, served
+from a memory-mapped array instead of the SoilGrids REST API.
+
+The raster is imported once from SoilGrids GeoTIFF exports (EPSG:4326, one
+file per property, 0-5cm mean) into SOIL_RASTER_DIR:
+    texture.npy  float32 (rows, cols, 3) - clay, silt, sand in %, NaN = no data
+    texture.json georeferencing: west, north, pixel width/height in degrees
+
+Usage (from the repo root; importing needs rasterio, lookups only numpy):
+    python -m soil_climate_agent.soil_raster clay.tif silt.tif sand.tif
+"""
+import json
+import os
+
+import numpy as np
+
+from .texture import classify_texture
+
+SOIL_RASTER_DIR = os.getenv(
+    "SOIL_RASTER_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "soil_raster"),
+)
+TEXTURE_BANDS = ("clay", "silt", "sand")
+# SoilGrids stores texture fractions in g/kg
+SOILGRIDS_SCALE = 10.0
+
+def write_raster(texture, west, north, pixel_width, pixel_height, directory=SOIL_RASTER_DIR):
+    """Save a (rows, cols, 3) clay/silt/sand array in % with its georeferencing"""
+    texture = np.asarray(texture, dtype="float32")
+    if texture.ndim != 3 or texture.shape[2] != len(TEXTURE_BANDS):
+        raise ValueError(f"Texture raster must be (rows, cols, {len(TEXTURE_BANDS)}), got {texture.shape}")
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, "texture.npy"), texture)
+    meta = {
+        "west": west, "north": north,
+        "pixel_width": pixel_width, "pixel_height": pixel_height,
+        "rows": texture.shape[0], "cols": texture.shape[1], "bands": list(TEXTURE_BANDS),
+    }
+    with open(os.path.join(directory, "texture.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+def import_soilgrids(clay_path, silt_path, sand_path, directory=SOIL_RASTER_DIR):
+    """Build the local raster from three SoilGrids GeoTIFFs on the same EPSG:4326 grid"""
+    import rasterio
+
+    bands, transform = [], None
+    for path in (clay_path, silt_path, sand_path):
+        with rasterio.open(path) as src:
+            if src.crs is None or src.crs.to_epsg() != 4326:
+                raise ValueError(f"{path}: expected an EPSG:4326 raster, got {src.crs}")
+            if transform is not None and src.transform != transform:
+                raise ValueError(f"{path}: grid differs from {clay_path}")
+            transform = src.transform
+            data = src.read(1).astype("float32")
+            if src.nodata is not None:
+                data[data == src.nodata] = np.nan
+            bands.append(data / SOILGRIDS_SCALE)
+
+    write_raster(np.stack(bands, axis=-1), transform.c, transform.f, transform.a, -transform.e, directory)
+    return bands[0].shape
+
+class SoilRaster:
+    """Memory-mapped texture raster with nearest, bilinear and batch lookups"""
+
+    def __init__(self, directory=SOIL_RASTER_DIR):
+        with open(os.path.join(directory, "texture.json")) as f:
+            meta = json.load(f)
+        self.west = meta["west"]
+        self.north = meta["north"]
+        self.pixel_width = meta["pixel_width"]
+        self.pixel_height = meta["pixel_height"]
+        self.texture = np.load(os.path.join(directory, "texture.npy"), mmap_mode="r")
+        self.rows, self.cols = self.texture.shape[:2]
+
+    @property
+    def bounds(self):
+        """(min_lat, min_lon, max_lat, max_lon)"""
+        return (self.north - self.rows * self.pixel_height, self.west,
+                self.north, self.west + self.cols * self.pixel_width)
+
+    def _pixel_coords(self, lats, lons):
+        """Fractional (row, col) of each point, measured from pixel centres, and an in-bounds mask"""
+        lats = np.atleast_1d(np.asarray(lats, dtype="float64"))
+        lons = np.atleast_1d(np.asarray(lons, dtype="float64"))
+        rows = (self.north - lats) / self.pixel_height
+        cols = (lons - self.west) / self.pixel_width
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return rows - 0.5, cols - 0.5, inside
+
+    def nearest(self, lats, lons):
+        """(n, 3) clay/silt/sand % of the pixel containing each point (NaN outside the raster)"""
+        rows, cols, inside = self._pixel_coords(lats, lons)
+        r = np.clip(np.floor(rows + 0.5).astype(np.intp), 0, self.rows - 1)
+        c = np.clip(np.floor(cols + 0.5).astype(np.intp), 0, self.cols - 1)
+        values = np.array(self.texture[r, c], dtype="float32")
+        values[~inside] = np.nan
+        return values
+
+    def bilinear(self, lats, lons):
+        """
+        (n, 3) clay/silt/sand % interpolated between the four nearest pixel
+        centres. Neighbours without data are left out of the weighting; NaN
+        outside the raster or when all four are missing.
+        """
+        rows, cols, inside = self._pixel_coords(lats, lons)
+        rows = np.clip(rows, 0, self.rows - 1)
+        cols = np.clip(cols, 0, self.cols - 1)
+        r0 = np.floor(rows).astype(np.intp)
+        c0 = np.floor(cols).astype(np.intp)
+        r1 = np.minimum(r0 + 1, self.rows - 1)
+        c1 = np.minimum(c0 + 1, self.cols - 1)
+        fr = (rows - r0)[:, None]
+        fc = (cols - c0)[:, None]
+
+        total = np.zeros((len(rows), len(TEXTURE_BANDS)), dtype="float64")
+        weight = np.zeros_like(total)
+        for r, c, w in ((r0, c0, (1 - fr) * (1 - fc)), (r0, c1, (1 - fr) * fc),
+                        (r1, c0, fr * (1 - fc)), (r1, c1, fr * fc)):
+            values = self.texture[r, c]
+            valid = ~np.isnan(values)
+            total += np.where(valid, values * w, 0)
+            weight += np.where(valid, w, 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = (total / weight).astype("float32")
+        values[~inside] = np.nan
+        return values
+
+    def lookup(self, lats, lons, method="bilinear"):
+        """Batch lookup for coordinate arrays: (n, 3) clay/silt/sand %"""
+        if method == "bilinear":
+            return self.bilinear(lats, lons)
+        if method == "nearest":
+            return self.nearest(lats, lons)
+        raise ValueError(f"Unknown lookup method '{method}'. Choose from: bilinear, nearest")
+
+    def texture_classes(self, lats, lons, method="bilinear"):
+        """USDA texture class indices (see texture.TEXTURE_CLASSES) for coordinate arrays"""
+        clay, silt, sand = self.lookup(lats, lons, method).T
+        return classify_texture(sand, silt, clay)
+
+    def texture_at(self, lat, lon, method="bilinear"):
+        """{"clay", "silt", "sand"} % at one point, or None if outside the raster or no data"""
+        values = self.lookup([lat], [lon], method)[0]
+        if np.isnan(values).any():
+            return None
+        return {band: round(float(v), 1) for band, v in zip(TEXTURE_BANDS, values)}
+
+_raster = None
+_raster_checked = False
+
+def get_raster():
+    """The local raster if one has been imported, loaded on first use; else None"""
+    global _raster, _raster_checked
+    if not _raster_checked:
+        _raster_checked = True
+        if os.path.exists(os.path.join(SOIL_RASTER_DIR, "texture.json")):
+            try:
+                _raster = SoilRaster()
+            except Exception as e:
+                print(f"Soil raster error: {e}")
+    return _raster
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import SoilGrids texture GeoTIFFs into the local soil raster")
+    parser.add_argument("clay")
+    parser.add_argument("silt")
+    parser.add_argument("sand")
+    parser.add_argument("--output", default=SOIL_RASTER_DIR)
+    args = parser.parse_args()
+
+    rows, cols = import_soilgrids(args.clay, args.silt, args.sand, args.output)
+    print(f"Wrote {rows} x {cols} texture raster to {args.output}")
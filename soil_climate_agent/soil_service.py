@@ -1,17 +1,35 @@
 import requests
+from .open_meteo import fetch_forecast, values_now
+from .soil_profile import fetch_profile
+from .soil_raster import get_raster
+from .texture import texture_class
+from shared.singleflight import single_flight
 
+SOIL_VARIABLES = ("soil_temperature_0cm", "soil_moisture_0_to_1cm")
+
+# Exact coordinates: raster texture is interpolated at the point
+@single_flight()
 def get_soil_data(lat: float, lon: float):
     """
     Fetches soil data from free public APIs:
     1. Open-Meteo: For dynamic soil moisture and temperature.
-    2. ISRIC SoilGrids: For static soil texture (Sand, Silt, Clay).
+    2. Static texture from the local soil raster when it covers the point,
+       otherwise ISRIC SoilGrids: soil properties by depth (texture, pH,
+       organic carbon, CEC, ...), all in one request.
     """
     
     # 1. Fetch Dynamic Data (Open-Meteo)
     dynamic_data = _get_open_meteo_soil(lat, lon)
     
-    # 2. Fetch Static Data (ISRIC SoilGrids)
-    static_data = _get_isric_soil_texture(lat, lon)
+    # 2. Static Data: texture from the local raster when it covers the point
+    # (no network call); otherwise one SoilGrids profile request
+    static_data = _get_raster_texture(lat, lon)
+    profile = None
+    static_source = "local soil raster" if static_data else None
+    if not static_data:
+        profile = _get_isric_soil_profile(lat, lon)
+        static_data = _get_isric_soil_texture(lat, lon, profile)
+        static_source = "ISRIC SoilGrids" if profile is not None else None
     
     if not dynamic_data and not static_data:
         return None
@@ -23,113 +41,58 @@ def get_soil_data(lat: float, lon: float):
             "soil_moisture": dynamic_data.get("soil_moisture"),
             "soil_texture": static_data,
             "soil_type": _determine_soil_type(static_data),
-            "source": "Open-Meteo & ISRIC SoilGrids (Free)"
+            # SoilProfile.to_dict(); None if SoilGrids failed or wasn't needed
+            "soil_profile": profile.to_dict() if profile is not None else None,
+            # The backends that actually supplied values
+            "source": _source(dynamic_data, static_source),
         }]
     }
     return result
 
+def _source(dynamic_data, static_source):
+    sources = (["Open-Meteo"] if dynamic_data else []) + ([static_source] if static_source else [])
+    return " & ".join(sources) or None
+
 def _get_open_meteo_soil(lat, lon):
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": "soil_temperature_0cm,soil_moisture_0_to_1cm",
-        "current_weather": True
-    }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Get current hour's data (approximate)
-        # For simplicity, we just take the first value or current weather context
-        # Open-Meteo returns hourly arrays. We'll take the value closest to now.
-        # But for this MVP, let's just take the first element of the forecast which is "now"
-        
-        hourly = data.get("hourly", {})
-        temp = hourly.get("soil_temperature_0cm", [0])[0]
-        moisture = hourly.get("soil_moisture_0_to_1cm", [0])[0]
+        # Only the two soil series, for the hours around now
+        data = fetch_forecast(lat, lon, hourly=SOIL_VARIABLES)
+        values = values_now(data, SOIL_VARIABLES)
+        moisture = values["soil_moisture_0_to_1cm"]
         
         return {
-            "soil_temperature": temp,
-            "soil_moisture": moisture * 100 # Convert to percentage if needed, usually it's m³/m³
+            "soil_temperature": values["soil_temperature_0cm"],
+            "soil_moisture": moisture * 100 if moisture is not None else None # m³/m³ to percentage
         }
     except Exception as e:
         print(f"Open-Meteo Soil Error: {e}")
         return {}
 
-def _get_isric_soil_texture(lat, lon):
+def _get_isric_soil_profile(lat, lon):
     """
-    Queries ISRIC SoilGrids for clay, silt, sand content at 0-5cm depth.
+    Queries ISRIC SoilGrids once for texture, pH, organic carbon, CEC,
+    nitrogen and bulk density at every standard depth.
     """
-    # ISRIC REST API
-    # https://rest.isric.org/soilgrids/v2.0/properties/query
-    url = "https://rest.isric.org/soilgrids/v2.0/properties/query"
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "property": ["clay", "silt", "sand"],
-        "depth": "0-5cm",
-        "value": "mean"
-    }
-    
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Parse response structure
-        # { "properties": { "layers": [ { "name": "clay", "depths": [...] } ] } }
-        layers = data.get("properties", {}).get("layers", [])
-        texture = {}
-        
-        for layer in layers:
-            name = layer.get("name")
-            depths = layer.get("depths", [])
-            if depths:
-                # Value is usually scaled by 10 (e.g. 250 = 25.0%)
-                value = depths[0].get("values", {}).get("mean")
-                if value is not None:
-                    texture[name] = value / 10.0
-        
-        return texture
+        return fetch_profile(lat, lon)
     except Exception as e:
         print(f"ISRIC SoilGrids Error: {e}")
-        # Fallback: Generate deterministic "mock" data based on location
-        # This ensures different locations get different soil types, even if the API is down.
-        import random
-        random.seed(lat + lon) # Deterministic seed
-        
-        # Generate random texture that sums to 100%
-        sand = random.uniform(10, 80)
-        clay = random.uniform(10, 100 - sand)
-        silt = 100 - sand - clay
-        
-        return {
-            "clay": round(clay, 1), 
-            "silt": round(silt, 1), 
-            "sand": round(sand, 1)
-        }
+        return None
+
+def _get_raster_texture(lat, lon):
+    """Clay, silt, sand content from the local soil raster, or None if it doesn't cover the point"""
+    raster = get_raster()
+    return raster.texture_at(lat, lon) if raster is not None else None
+
+def _get_isric_soil_texture(lat, lon, profile=None):
+    """
+    Clay, silt, sand content at 0-5cm depth from the SoilGrids profile, or {}
+    if SoilGrids has no value (the soil type is then reported as Unknown).
+    """
+    return profile.texture() if profile is not None else {}
 
 def _determine_soil_type(texture):
     """
-    Simple approximation of USDA Soil Texture Triangle.
+    USDA Soil Texture Triangle class (all 12 classes).
     """
-    if not texture:
-        return "Unknown"
-        
-    sand = texture.get("sand", 0)
-    clay = texture.get("clay", 0)
-    silt = texture.get("silt", 0)
-    
-    if clay >= 40:
-        return "Clay"
-    elif sand >= 50:
-        if clay >= 20:
-            return "Sandy Clay"
-        else:
-            return "Sandy Loam" if silt > 0 else "Sand"
-    elif silt >= 50:
-        return "Silty Clay" if clay >= 27 else "Silt Loam"
-    else:
-        return "Loam"
+    return texture_class(texture)
@@ -0,0 +1,179 @@
+"""
+Rule-based crop suitability engine.
+
+Each crop has a parameter row: soil temperature and soil moisture ranges
+(min, optimal low, optimal high, max), the sand and clay percentages it
+prefers, and the seasons it is planted in. A snapshot of conditions is scored
+against every crop at once with NumPy trapezoid memberships, so ranking all
+crops for one snapshot - or for thousands of grid cells - takes milliseconds.
+"""
+import os
+
+import numpy as np
+
+SEASONS = ("winter", "spring", "summer", "autumn")
+
+# crop: (soil temp C (min, low, high, max), soil moisture % (min, low, high, max),
+#        optimal sand %, optimal clay %, planting seasons)
+CROP_PARAMETERS = {
+    "Corn": ((10, 16, 30, 35), (15, 22, 35, 45), (20, 60), (10, 35), ("spring",)),
+    "Soybeans": ((10, 18, 30, 35), (15, 22, 35, 45), (20, 60), (10, 35), ("spring", "summer")),
+    "Winter Wheat": ((3, 10, 22, 30), (12, 18, 32, 42), (15, 55), (15, 40), ("autumn",)),
+    "Spring Wheat": ((3, 8, 20, 28), (12, 18, 32, 42), (15, 55), (15, 40), ("spring",)),
+    "Oats": ((3, 8, 20, 28), (15, 20, 35, 45), (10, 60), (10, 40), ("spring", "autumn")),
+    "Barley": ((3, 8, 20, 28), (10, 16, 30, 40), (20, 65), (10, 35), ("spring", "autumn")),
+    "Cereal Rye": ((1, 5, 18, 26), (8, 14, 32, 42), (10, 80), (5, 40), ("autumn",)),
+    "Rice": ((15, 22, 32, 38), (30, 38, 50, 60), (5, 35), (30, 60), ("spring", "summer")),
+    "Cotton": ((16, 20, 32, 38), (12, 18, 30, 40), (30, 70), (10, 35), ("spring",)),
+    "Sorghum": ((15, 20, 33, 40), (8, 14, 28, 38), (25, 70), (10, 40), ("spring", "summer")),
+    "Peanuts": ((16, 20, 30, 36), (10, 15, 28, 36), (50, 85), (5, 20), ("spring",)),
+    "Potatoes": ((7, 12, 22, 28), (18, 25, 35, 42), (40, 75), (5, 25), ("spring",)),
+    "Tomatoes": ((15, 20, 30, 35), (18, 24, 34, 42), (30, 65), (10, 30), ("spring", "summer")),
+    "Lettuce": ((4, 8, 20, 26), (20, 25, 35, 42), (30, 65), (10, 30), ("spring", "autumn")),
+    "Spinach": ((2, 7, 18, 24), (18, 24, 34, 42), (25, 60), (10, 35), ("spring", "autumn")),
+    "Carrots": ((7, 10, 24, 30), (15, 20, 32, 40), (45, 80), (5, 20), ("spring", "summer")),
+    "Alfalfa": ((5, 10, 25, 32), (12, 18, 30, 40), (25, 65), (10, 35), ("spring", "summer")),
+    "Sunflower": ((8, 10, 30, 35), (10, 15, 28, 38), (25, 70), (10, 35), ("spring",)),
+    "Winter Canola": ((5, 8, 20, 28), (14, 20, 32, 40), (20, 60), (10, 35), ("autumn",)),
+    "Crimson Clover": ((5, 10, 24, 30), (14, 20, 34, 42), (20, 70), (5, 35), ("autumn",)),
+    "Garlic": ((2, 5, 18, 24), (14, 18, 30, 38), (35, 70), (5, 25), ("autumn",)),
+}
+
+# How far (percentage points) outside its preferred sand/clay range a crop still scores > 0
+TEXTURE_TOLERANCE = 15
+# Component weights, and the factor applied to crops planted in another season
+WEIGHTS = {"temperature": 0.45, "moisture": 0.30, "texture": 0.25}
+OUT_OF_SEASON_FACTOR = 0.25
+# A top score at least this high is trusted without asking the LLM
+SUITABILITY_MIN_CONFIDENCE = float(os.getenv("SUITABILITY_MIN_CONFIDENCE", "0.7"))
+
+CROPS = tuple(CROP_PARAMETERS)
+_TEMPERATURE = np.array([CROP_PARAMETERS[c][0] for c in CROPS], dtype="float32")
+_MOISTURE = np.array([CROP_PARAMETERS[c][1] for c in CROPS], dtype="float32")
+_SAND = np.array([CROP_PARAMETERS[c][2] for c in CROPS], dtype="float32")
+_CLAY = np.array([CROP_PARAMETERS[c][3] for c in CROPS], dtype="float32")
+_SEASONS = np.array([[s in CROP_PARAMETERS[c][4] for s in SEASONS] for c in CROPS], dtype=bool)
+
+def _trapezoid(values, ranges):
+    """
+    Membership of each value (m,) in each crop's (min, low, high, max) range
+    (n, 4): 1 inside [low, high], falling linearly to 0 at min/max. Returns (m, n).
+    """
+    x = values[:, np.newaxis]
+    lo_min, lo, hi, hi_max = (ranges[:, i] for i in range(4))
+    rising = (x - lo_min) / np.maximum(lo - lo_min, 1e-6)
+    falling = (hi_max - x) / np.maximum(hi_max - hi, 1e-6)
+    return np.clip(np.minimum(rising, falling), 0, 1)
+
+def _with_tolerance(optimal):
+    return np.column_stack([optimal[:, 0] - TEXTURE_TOLERANCE, optimal[:, 0],
+                            optimal[:, 1], optimal[:, 1] + TEXTURE_TOLERANCE])
+
+_SAND_RANGES = _with_tolerance(_SAND)
+_CLAY_RANGES = _with_tolerance(_CLAY)
+
+def score_snapshots(temperature, moisture, sand, clay, season):
+    """
+    Suitability of every crop for each of m snapshots.
+
+    Arguments are length-m sequences (season as names from SEASONS). Missing
+    values (NaN) count as neutral. Returns (scores, components): scores is
+    (m, n_crops) in [0, 1]; components maps temperature/moisture/texture/season
+    to (m, n_crops) arrays.
+    """
+    temperature = np.asarray(temperature, dtype="float32")
+    moisture = np.asarray(moisture, dtype="float32")
+    sand = np.asarray(sand, dtype="float32")
+    clay = np.asarray(clay, dtype="float32")
+    season_idx = np.array([SEASONS.index(s) for s in season])
+
+    components = {
+        "temperature": np.where(np.isnan(temperature)[:, None], 0.5, _trapezoid(temperature, _TEMPERATURE)),
+        "moisture": np.where(np.isnan(moisture)[:, None], 0.5, _trapezoid(moisture, _MOISTURE)),
+        "texture": np.where(
+            (np.isnan(sand) | np.isnan(clay))[:, None], 0.5,
+            np.sqrt(_trapezoid(sand, _SAND_RANGES) * _trapezoid(clay, _CLAY_RANGES)),
+        ),
+        "season": _SEASONS[:, season_idx].T,
+    }
+    weighted = sum(WEIGHTS[name] * components[name] for name in WEIGHTS)
+    scores = weighted * np.where(components["season"], 1.0, OUT_OF_SEASON_FACTOR)
+    return scores, components
+
+def _nan(value):
+    return np.nan if value is None else float(value)
+
+def snapshot(weather, soil, season):
+    """Engine inputs from the weather/soil service responses"""
+    soil_data = soil.get("data", [{}])[0]
+    texture = soil_data.get("soil_texture") or {}
+    temperature = soil_data.get("soil_temperature")
+    if temperature is None:
+        temperature = weather.get("current_weather", {}).get("temperature")
+    return {
+        "temperature": _nan(temperature),
+        "moisture": _nan(soil_data.get("soil_moisture")),
+        "sand": _nan(texture.get("sand")),
+        "clay": _nan(texture.get("clay")),
+        "season": season,
+    }
+
+def _known(conditions, component):
+    inputs = ("sand", "clay") if component == "texture" else (component,)
+    return not any(np.isnan(conditions[name]) for name in inputs)
+
+def _describe(crop, conditions, component, fit):
+    """Phrase for how one measured condition fits a crop (fit: component score 0-1)"""
+    temperature, moisture = CROP_PARAMETERS[crop][0], CROP_PARAMETERS[crop][1]
+    where = "within" if fit >= 1 else "near" if fit > 0 else "outside"
+    if component == "temperature":
+        return (f"soil at {conditions['temperature']:.0f}°C is {where} "
+                f"its {temperature[1]}-{temperature[2]}°C optimum")
+    if component == "moisture":
+        return (f"soil moisture of {conditions['moisture']:.0f}% is {where} "
+                f"its {moisture[1]}-{moisture[2]}% optimum")
+    texture = f"{conditions['sand']:.0f}% sand, {conditions['clay']:.0f}% clay"
+    return f"the soil texture ({texture}) is {where} its preferred range"
+
+def _sentence(text):
+    return text[0].upper() + text[1:] + "."
+
+def _reason_and_risk(crop, conditions, parts):
+    """One-sentence reason (strongest condition) and risk (weakest) for a ranked crop"""
+    seasons = CROP_PARAMETERS[crop][4]
+    in_season = bool(parts["season"])
+    window = (f"{conditions['season']} is a planting window" if in_season
+              else f"it is usually planted in {' or '.join(seasons)}, not {conditions['season']}")
+
+    known = [name for name in WEIGHTS if _known(conditions, name)]
+    if not known:
+        return _sentence(window), "Field conditions unknown; verify the soil before planting."
+
+    strongest = max(known, key=lambda name: parts[name])
+    weakest = min(known, key=lambda name: parts[name])
+    reason = _sentence(_describe(crop, conditions, strongest, parts[strongest])
+                       + (f", and {window}" if in_season else ""))
+    if not in_season:
+        risk = _sentence(window)
+    elif parts[weakest] < 1:
+        risk = _sentence(_describe(crop, conditions, weakest, parts[weakest]))
+    else:
+        risk = "Conditions are near optimal; the main risk is weather variability."
+    return reason, risk
+
+def rank_crops(conditions, top_k=3):
+    """
+    Ranked crops for one snapshot: dicts with crop, reason, risk and score
+    (0-1), in the same shape as the LLM recommendations.
+    """
+    scores, components = score_snapshots(
+        [conditions["temperature"]], [conditions["moisture"]],
+        [conditions["sand"]], [conditions["clay"]], [conditions["season"]],
+    )
+    order = np.argsort(-scores[0], kind="stable")[:top_k]
+    ranked = []
+    for idx in order:
+        parts = {name: components[name][0, idx] for name in components}
+        reason, risk = _reason_and_risk(CROPS[idx], conditions, parts)
+        ranked.append({"crop": CROPS[idx], "reason": reason, "risk": risk, "score": round(float(scores[0, idx]), 3)})
+    return ranked
@@ -0,0 +1,62 @@
+"""
+USDA soil texture triangle over NumPy arrays.
+
+classify_texture takes sand/silt/clay percentages of any shape (a batch of
+points or a whole raster) and returns the class index of every element in
+one pass of boolean masks, using the NRCS texture calculator's boundaries.
+"""
+import numpy as np
+
+TEXTURE_CLASSES = (
+    "Sand", "Loamy Sand", "Sandy Loam", "Loam", "Silt Loam", "Silt",
+    "Sandy Clay Loam", "Clay Loam", "Silty Clay Loam", "Sandy Clay", "Silty Clay", "Clay",
+)
+UNKNOWN = -1
+
+def classify_texture(sand, silt, clay):
+    """
+    USDA texture class index (into TEXTURE_CLASSES) for each sand/silt/clay
+    triple, or UNKNOWN (-1) where a value is missing. Inputs are rescaled to
+    sum to 100, since measured fractions rarely sum exactly.
+    """
+    sand, silt, clay = np.broadcast_arrays(
+        np.asarray(sand, dtype="float32"), np.asarray(silt, dtype="float32"), np.asarray(clay, dtype="float32")
+    )
+    total = sand + silt + clay
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(total > 0, 100 / total, np.nan)
+    sand, silt, clay = sand * scale, silt * scale, clay * scale
+
+    coarse = silt + 1.5 * clay
+    fine = silt + 2 * clay
+    conditions = [
+        coarse < 15,
+        fine < 30,
+        ((clay >= 7) & (clay < 20) & (sand > 52)) | ((clay < 7) & (silt < 50)),
+        (clay >= 7) & (clay < 27) & (silt >= 28) & (silt < 50) & (sand <= 52),
+        ((silt >= 50) & (clay >= 12) & (clay < 27)) | ((silt >= 50) & (silt < 80) & (clay < 12)),
+        (silt >= 80) & (clay < 12),
+        (clay >= 20) & (clay < 35) & (silt < 28) & (sand > 45),
+        (clay >= 27) & (clay < 40) & (sand > 20) & (sand <= 45),
+        (clay >= 27) & (clay < 40) & (sand <= 20),
+        (clay >= 35) & (sand > 45),
+        (clay >= 40) & (silt >= 40),
+        clay >= 40,
+    ]
+    # np.select picks the first matching class, so each condition only needs
+    # to separate its class from the ones after it
+    classes = np.select(conditions, np.arange(len(TEXTURE_CLASSES)), default=UNKNOWN)
+    return np.where(np.isnan(total * scale), UNKNOWN, classes).astype(np.int8)
+
+def texture_names(classes):
+    """Class names for an array of class indices ("Unknown" for UNKNOWN)"""
+    names = np.array(TEXTURE_CLASSES + ("Unknown",))
+    return names[np.asarray(classes)]
+
+def texture_class(texture):
+    """Class name for one {"sand", "silt", "clay"} dict"""
+    if not texture:
+        return "Unknown"
+    index = int(classify_texture(texture.get("sand", np.nan), texture.get("silt", np.nan),
+                                 texture.get("clay", np.nan)))
+    return "Unknown" if index == UNKNOWN else TEXTURE_CLASSES[index]
@@ -0,0 +1,193 @@
+"""
+Precomputed regional recommendation tiles.
+
+A grid of cells (TILE_RESOLUTION_DEG on a side) covers a bounding box. The
+tile job runs analyze_and_recommend at each cell's centre and stores the
+result keyed by cell and date, so /recommend can answer any point in the
+region from the store. Cells that already have a fresh tile for the day are
+skipped, so re-running an interrupted job picks up where it stopped. A job
+with failed cells finishes as "partial" and is not reused, so submitting it
+again retries just the missing cells.
+"""
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from .agent import analyze_and_recommend
+from shared.sqlite import connect
+
+TILE_STORE_PATH = os.getenv(
+    "TILE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tiles.db"),
+)
+TILE_RESOLUTION_DEG = float(os.getenv("TILE_RESOLUTION_DEG", "0.25"))
+# Default region: min_lat,min_lon,max_lat,max_lon
+TILE_BBOX = os.getenv("TILE_BBOX", "")
+TILE_MAX_AGE_HOURS = float(os.getenv("TILE_MAX_AGE_HOURS", "24"))
+# Cells computed at once; each cell makes weather, soil and possibly LLM calls
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", "4"))
+TILE_MAX_CELLS = 10000
+# A progress event is emitted every this many finished cells
+TILE_PROGRESS_EVERY = 25
+
+TILE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS tiles (
+        cell TEXT NOT NULL, date TEXT NOT NULL, resolution REAL NOT NULL,
+        result TEXT NOT NULL, created_at REAL NOT NULL,
+        PRIMARY KEY (cell, date, resolution))""",
+)
+
+def today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+def cell_of(lat, lon, resolution=TILE_RESOLUTION_DEG):
+    """Grid cell (row, col) containing a point"""
+    return math.floor(lat / resolution), math.floor(lon / resolution)
+
+def cell_id(cell):
+    return f"{cell[0]}:{cell[1]}"
+
+def cell_center(cell, resolution=TILE_RESOLUTION_DEG):
+    return (round((cell[0] + 0.5) * resolution, 6), round((cell[1] + 0.5) * resolution, 6))
+
+def parse_bbox(text):
+    """(min_lat, min_lon, max_lat, max_lon) from "min_lat,min_lon,max_lat,max_lon" """
+    try:
+        min_lat, min_lon, max_lat, max_lon = (float(v) for v in text.split(","))
+    except ValueError:
+        raise ValueError("Bounding box must be 'min_lat,min_lon,max_lat,max_lon'")
+    return min_lat, min_lon, max_lat, max_lon
+
+def grid_cells(bbox, resolution=TILE_RESOLUTION_DEG):
+    """Cells covering a bounding box, row by row"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if min_lat >= max_lat or min_lon >= max_lon:
+        raise ValueError("Bounding box minimums must be below its maximums")
+    row_lo, col_lo = cell_of(min_lat, min_lon, resolution)
+    row_hi, col_hi = cell_of(max_lat, max_lon, resolution)
+    # A maximum exactly on a grid line does not reach into the next cell
+    if max_lat == row_hi * resolution:
+        row_hi -= 1
+    if max_lon == col_hi * resolution:
+        col_hi -= 1
+    count = (row_hi - row_lo + 1) * (col_hi - col_lo + 1)
+    if count > TILE_MAX_CELLS:
+        raise ValueError(f"Bounding box covers {count} cells; the limit is {TILE_MAX_CELLS}. "
+                         "Use a smaller box or a coarser resolution.")
+    return [(row, col) for row in range(row_lo, row_hi + 1) for col in range(col_lo, col_hi + 1)]
+
+class TileStore:
+    """Recommendation results by grid cell and date"""
+
+    def __init__(self, path=TILE_STORE_PATH, max_age_hours=TILE_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+
+    def get(self, lat, lon):
+        """
+        Today's tile for the cell containing a point, at whichever resolution
+        tiles were computed (finest first), or None if missing/stale
+        """
+        day = today()
+        with connect(self.path, TILE_SCHEMA) as conn:
+            resolutions = [row[0] for row in conn.execute(
+                "SELECT DISTINCT resolution FROM tiles WHERE date = ? ORDER BY resolution", (day,)
+            )]
+            for resolution in resolutions:
+                cell = cell_id(cell_of(lat, lon, resolution))
+                row = conn.execute(
+                    "SELECT result, created_at FROM tiles WHERE cell = ? AND date = ? AND resolution = ?",
+                    (cell, day, resolution),
+                ).fetchone()
+                if row is not None and time.time() - row[1] <= self.max_age_seconds:
+                    return {**json.loads(row[0]), "tile": {"cell": cell, "date": day, "resolution": resolution}}
+        return None
+
+    def done_cells(self, cells, resolution=TILE_RESOLUTION_DEG):
+        """The cells (of those given) that already have a fresh tile today"""
+        with connect(self.path, TILE_SCHEMA) as conn:
+            rows = conn.execute(
+                "SELECT cell FROM tiles WHERE date = ? AND resolution = ? AND created_at >= ?",
+                (today(), resolution, time.time() - self.max_age_seconds),
+            ).fetchall()
+        fresh = {row[0] for row in rows}
+        return {cell for cell in cells if cell_id(cell) in fresh}
+
+    def put(self, cell, result, resolution=TILE_RESOLUTION_DEG):
+        with connect(self.path, TILE_SCHEMA) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tiles (cell, date, resolution, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (cell_id(cell), today(), resolution, json.dumps(result, default=str), time.time()),
+            )
+
+tile_store = TileStore()
+
+def compute_tile(cell, resolution):
+    lat, lon = cell_center(cell, resolution)
+    result = analyze_and_recommend(lat, lon)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    tile_store.put(cell, result, resolution)
+
+def run_tile_grid(payload, workers=TILE_WORKERS):
+    """
+    Compute tiles for every cell in payload["bbox"] (default TILE_BBOX) at
+    payload["resolution"], yielding progress events: {"stage": "cells",
+    "status", "total", "skipped", "done", "failed", "elapsed"} every few
+    cells, and finally {"stage": "complete", ...}. At most `workers` cells
+    are in flight; cells with a fresh tile today are skipped.
+    """
+    start = time.perf_counter()
+    resolution = float(payload.get("resolution") or TILE_RESOLUTION_DEG)
+    bbox = payload.get("bbox") or TILE_BBOX
+    if not bbox:
+        raise ValueError("No bounding box given and TILE_BBOX is not set")
+    cells = grid_cells(parse_bbox(bbox) if isinstance(bbox, str) else bbox, resolution)
+    skipped = tile_store.done_cells(cells, resolution)
+    todo = iter([cell for cell in cells if cell not in skipped])
+    counts = {"total": len(cells), "skipped": len(skipped), "done": 0, "failed": 0}
+    errors = {}
+
+    def progress(stage="cells"):
+        return {"stage": stage, "status": "error" if stage == "complete" and counts["failed"] else "done",
+                **counts, "errors": dict(list(errors.items())[:20]),
+                "elapsed": round(time.perf_counter() - start, 3)}
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}
+
+    def fill():
+        # Only `workers` cells are queued at a time, so cancelling stops promptly
+        while len(pending) < workers:
+            cell = next(todo, None)
+            if cell is None:
+                return
+            pending[executor.submit(compute_tile, cell, resolution)] = cell
+
+    try:
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                cell = pending.pop(future)
+                try:
+                    future.result()
+                    counts["done"] += 1
+                except Exception as e:
+                    counts["failed"] += 1
+                    errors[cell_id(cell)] = str(e)
+                if (counts["done"] + counts["failed"]) % TILE_PROGRESS_EVERY == 0:
+                    yield progress()
+            fill()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield progress("complete")
+
+def tile_result(events):
+    """Final counts of a tile job"""
+    final = events[-1] if events else {}
+    return {key: final.get(key) for key in ("total", "skipped", "done", "failed", "errors", "elapsed")}
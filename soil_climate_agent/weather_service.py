@@ -1,22 +1,15 @@
 import requests
+from .open_meteo import fetch_forecast
+from shared.singleflight import coordinate_key, single_flight
 
+@single_flight(key=coordinate_key)
 def get_weather_data(lat: float, lon: float):
     """
     Fetches current weather data from Open-Meteo API.
     """
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "current_weather": True,
-        "hourly": "temperature_2m,precipitation_probability,soil_temperature_0cm"
-    }
-    
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return data
+        # Current conditions only; no hourly series are read downstream
+        return fetch_forecast(lat, lon, current_weather=True)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching weather data: {e}")
         return None
@@ -18,6 +18,32 @@ if not os.getenv("OPENAI_API_KEY"):
 
 # Configuration
 API_URL = "http://localhost:8000"
+# Slow analyses run as background jobs on the API; the app polls for them
+JOB_POLL_SECONDS = 1.0
+JOB_TIMEOUT_SECONDS = 300
+
+def run_job(kind, payload):
+    """
+    Submit a background job to the API and poll it until it finishes.
+    Returns (result, error); every HTTP call is short, so a slow analysis
+    doesn't hold an API worker or hit a request timeout.
+    """
+    response = requests.post(f"{API_URL}/jobs/{kind}", json=payload, timeout=10)
+    if response.status_code != 202:
+        return None, response.json().get('detail', 'Unknown error')
+    job_id = response.json()["job_id"]
+
+    deadline = time.time() + JOB_TIMEOUT_SECONDS
+    while time.time() < deadline:
+        job = requests.get(f"{API_URL}/jobs/{job_id}", timeout=10).json()
+        if job["status"] == "done":
+            return requests.get(f"{API_URL}/jobs/{job_id}/result", timeout=10).json(), None
+        if job["status"] in ("error", "partial", "cancelled"):
+            return None, job.get("error") or f"Job {job['status']}"
+        time.sleep(JOB_POLL_SECONDS)
+
+    requests.post(f"{API_URL}/jobs/{job_id}/cancel", timeout=10)
+    return None, f"No result after {JOB_TIMEOUT_SECONDS}s"
 
 # Page config
 st.set_page_config(
@@ -694,15 +720,11 @@ elif st.session_state.workflow_step == 2:
                         payload["latitude"] = data['latitude']
                         payload["longitude"] = data['longitude']
                     
-                    # Call API
-                    response = requests.post(
-                        f"{API_URL}/recommend",
-                        json=payload,
-                        timeout=60
-                    )
+                    # Run as a background job on the API
+                    result, error = run_job("recommend", payload)
                     
-                    if response.status_code == 200:
-                        st.session_state.soil_result = response.json()
+                    if error is None:
+                        st.session_state.soil_result = result
                         
                         # Extract crop names
                         recs = st.session_state.soil_result.get('recommendations', [])
@@ -715,7 +737,7 @@ elif st.session_state.workflow_step == 2:
                         time.sleep(1)
                         st.rerun()
                     else:
-                        st.error(f"❌ Error: {response.json().get('detail', 'Unknown error')}")
+                        st.error(f"❌ Error: {error}")
                 
                 except Exception as e:
                     st.error(f"❌ Error: {str(e)}")
@@ -736,10 +758,12 @@ elif st.session_state.workflow_step == 2:
         with col2:
             st.metric("🏞️ Soil Type", env.get('soil_type', 'Unknown'))
         with col3:
-            soil_tex = env.get('soil_texture', {})
-            st.metric("🪨 Clay", f"{soil_tex.get('clay', 0):.1f}%")
+            soil_tex = env.get('soil_texture') or {}
+            clay = soil_tex.get('clay')
+            st.metric("🪨 Clay", f"{clay:.1f}%" if clay is not None else "N/A")
         with col4:
-            st.metric("🏖️ Sand", f"{soil_tex.get('sand', 0):.1f}%")
+            sand = soil_tex.get('sand')
+            st.metric("🏖️ Sand", f"{sand:.1f}%" if sand is not None else "N/A")
         
         # Crop Recommendations
         st.markdown("---")
@@ -808,18 +832,12 @@ elif st.session_state.workflow_step == 3:
                 progress_bar.progress((idx + 1) / len(crops))
                 
                 try:
-                    response = requests.post(
-                        f"{API_URL}/market_predict",
-                        json={"commodity": crop},
-                        timeout=60
-                    )
+                    result, error = run_job("market", {"commodity": crop})
                     
-                    if response.status_code == 200:
-                        st.session_state.market_results[crop] = response.json()
+                    if error is None:
+                        st.session_state.market_results[crop] = result
                     else:
-                        st.session_state.market_results[crop] = {
-                            "error": response.json().get('detail', 'Error')
-                        }
+                        st.session_state.market_results[crop] = {"error": error}
                 
                 except Exception as e:
                     st.session_state.market_results[crop] = {"error": str(e)}
@@ -904,107 +922,53 @@ elif st.session_state.workflow_step == 4:
         if st.button("🔍 Search for Grants & Subsidies", type="primary", use_container_width=True):
             with st.spinner("🤖 Agent 3 is searching USDA grant databases..."):
                 try:
-                    import faiss
-                    import numpy as np
-                    from openai import OpenAI
-                    
-                    # Initialize OpenAI client with API key from environment
+                    # Check API key from environment
                     api_key = os.getenv("OPENAI_API_KEY")
                     if not api_key:
                         st.error("❌ OPENAI_API_KEY not found in environment!")
                         st.info("💡 Make sure .env file exists with OPENAI_API_KEY=your_key_here")
                         st.stop()
                     
-                    client = OpenAI(api_key=api_key)
-                    
-                    # Load FAISS index and metadata from data folder
-                    index = faiss.read_index("data/usda_grants.faiss")
-                    with open("data/usda_grants_meta.json", "r", encoding="utf-8") as f:
-                        import json
-                        programs_meta = json.load(f)
-                    
-                    with open("data/usda_grants.json", "r", encoding="utf-8") as f:
-                        programs_full = json.load(f)
+                    # Shared FAISS index and program records from data folder
+                    from grants_agent.embeddings import programs as programs_full, program_artifact, search_local_programs
+                    from grants_agent.cohort import profile_intents
                     
-                    # Build search query based on profile
-                    query_parts = []
-                    
-                    if experience == "Beginner":
-                        query_parts.append("beginning farmer new rancher startup loans")
-                    
-                    if farm_size < 50:
-                        query_parts.append("small farm microloans")
-                    elif farm_size > 500:
-                        query_parts.append("large scale commercial operations")
-                    
-                    # Add crop-specific queries if available
-                    if st.session_state.recommended_crops:
-                        crops = " ".join(st.session_state.recommended_crops[:2])
-                        query_parts.append(f"{crops} specialty crops")
-                    
-                    query_parts.append("operating loans grants subsidies")
-                    
-                    query = " ".join(query_parts)
+                    # Build one search intent per profile need
+                    query_parts = profile_intents({
+                        **data,
+                        "crops": st.session_state.recommended_crops
+                    })
                     
-                    # Create embedding using new OpenAI client
-                    response = client.embeddings.create(
-                        model="text-embedding-3-large",
-                        input=query
+                    # Embed all intents in one request, search them together and
+                    # fuse per-intent rankings (offline embeddings if OpenAI is unreachable);
+                    # match scores come from the shared eligibility scorer
+                    matches, _ = search_local_programs(
+                        query_parts, data, top_k=min(5, len(programs_full)), relevance_threshold=1.5
                     )
-                    q_emb = np.array(response.data[0].embedding).astype("float32")
-                    
-                    # Search FAISS
-                    D, I = index.search(np.array([q_emb]), min(5, len(programs_meta)))
-                    
-                    # Calculate match scores based on profile
-                    def calculate_match_score(program, profile):
-                        score = 50  # Base score
-                        
-                        eligibility = " ".join(program.get("eligibility", [])).lower()
-                        summary = program.get("summary", "").lower()
-                        
-                        # Boost for beginning farmers
-                        if profile.get("experience") == "Beginner" and ("beginning" in eligibility or "new farmer" in summary):
-                            score += 30
-                        
-                        # Boost for farm size match
-                        farm_size = profile.get("farm_size", 0)
-                        if farm_size < 50 and "small" in summary:
-                            score += 15
-                        
-                        # Boost for operating expense needs
-                        if "operating" in summary or "expense" in summary:
-                            score += 10
-                        
-                        # Boost for year-round availability
-                        if program.get("year_round_application"):
-                            score += 10
-                        
-                        return min(score, 100)
                     
                     # Build results
                     grants = []
-                    for idx, distance in zip(I[0], D[0]):
-                        if distance < 1.5:  # Relevance threshold
-                            program = programs_full[idx]
-                            
-                            match_score = calculate_match_score(program, data)
-                            
-                            grants.append({
-                                "name": program.get("program_name"),
-                                "agency": program.get("agency"),
-                                "amount": program.get("funding_amount"),
-                                "match_score": match_score,
-                                "eligibility": program.get("eligibility", []),
-                                "deadline": program.get("application_deadlines"),
-                                "type": program.get("program_type"),
-                                "url": program.get("official_url"),
-                                "summary": program.get("summary"),
-                                "required_documents": program.get("required_documents", []),
-                                "contact_info": program.get("contact_info"),
-                                "distance": float(distance),
-                                "confidence": 1 / (1 + distance)
-                            })
+                    for program in matches:
+                        distance = program["_distance"]
+                        
+                        grants.append({
+                            "name": program.get("program_name"),
+                            "agency": program.get("agency"),
+                            "amount": program.get("funding_amount"),
+                            "match_score": program["_match_score"],
+                            "eligibility": program.get("eligibility", []),
+                            "deadline": program.get("application_deadlines"),
+                            "type": program.get("program_type"),
+                            "url": program.get("official_url"),
+                            "summary": program.get("summary"),
+                            "required_documents": program.get("required_documents", []),
+                            "contact_info": program.get("contact_info"),
+                            "distance": float(distance),
+                            "confidence": 1 / (1 + distance),
+                            # Checklists are rendered once per program when the index loads
+                            "checklist": program_artifact(program, "application_steps"),
+                            "checklist_file": program_artifact(program, "checklist_file")
+                        })
                     
                     # Sort by match score
                     grants.sort(key=lambda x: x['match_score'], reverse=True)
@@ -1043,6 +1007,20 @@ elif st.session_state.workflow_step == 4:
                         "type": "Loan",
                         "url": "https://www.fsa.usda.gov/programs-and-services/farm-loan-programs/farm-operating-loans"
                     })
+                    
+                    from grants_agent.checklist_generator import generate_application_steps, generate_checklist_file
+                    for grant in grants:
+                        record = {
+                            "program_name": grant["name"],
+                            "agency": grant["agency"],
+                            "program_type": grant["type"],
+                            "funding_amount": grant["amount"],
+                            "application_deadlines": grant["deadline"],
+                            "eligibility": grant["eligibility"],
+                            "official_url": grant["url"]
+                        }
+                        grant["checklist"] = generate_application_steps(record)
+                        grant["checklist_file"] = generate_checklist_file(record)
                     st.session_state.grant_results = grants
     
     # Display grant results
@@ -1117,41 +1095,12 @@ elif st.session_state.workflow_step == 4:
                 if grant.get('contact_info'):
                     st.markdown(f"**📞 Contact:** {grant['contact_info']}")
                 
-                # Generate application checklist
+                # Application checklist (precompiled with the grant results)
                 st.markdown("**✅ Application Checklist:**")
-                checklist = f"""
-- [ ] Review full eligibility requirements at {grant['url']}
-- [ ] Check application deadline: {grant['deadline']}
-- [ ] Gather required documents (see list above)
-- [ ] Prepare farm/business plan
-- [ ] Contact {grant['agency']} for guidance
-- [ ] Submit application through official portal
-"""
-                st.markdown(checklist)
+                st.markdown(grant['checklist'])
                 
                 # Download option
-                checklist_file = f"""# Application Checklist for {grant['name']}
-
-## Program Information
-- **Agency:** {grant['agency']}
-- **Type:** {grant['type']}
-- **Funding:** {grant['amount']}
-- **Deadline:** {grant['deadline']}
-
-## Eligibility Requirements
-{chr(10).join(f"- {req}" for req in grant['eligibility'])}
-
-## Required Documents
-{chr(10).join(f"- {doc}" for doc in grant.get('required_documents', ['See program website']))}
-
-## Application Steps
-1. Review full program details at: {grant['url']}
-2. Verify you meet all eligibility requirements
-3. Gather all required documents
-4. Prepare detailed farm/business plan
-5. Contact {grant.get('contact_info', 'local USDA office')} for guidance
-6. Submit application before deadline: {grant['deadline']}
-
+                checklist_file = grant['checklist_file'] + f"""
 ## Notes
 - Match Score: {match_score}%
 - Generated: {datetime.now().strftime("%Y-%m-%d")}
@@ -0,0 +1,31 @@
+from soil_climate_agent import advisory
+
+def stub_stages(monkeypatch, recommend):
+    grant_crops = []
+    monkeypatch.setattr(advisory, "resolve_location", lambda profile: {"lat": 41.5, "lon": -93.6})
+    monkeypatch.setattr(advisory, "recommend", recommend)
+    monkeypatch.setattr(advisory, "market", lambda crop: {"crop": crop})
+    def find_grants(profile, crop=None):
+        grant_crops.append(crop)
+        return []
+    monkeypatch.setattr(advisory, "find_grants", find_grants)
+    return grant_crops
+
+def test_grants_search_for_the_top_recommended_crop(monkeypatch):
+    grant_crops = stub_stages(monkeypatch, lambda location: {
+        "recommendations": [{"crop": "Soybeans"}, {"crop": "Corn"}]})
+    events = list(advisory.run_advisory({"latitude": 41.5, "longitude": -93.6}))
+    stages = [event["stage"] for event in events]
+    assert grant_crops == ["Soybeans"]
+    assert stages.index("recommendation") < stages.index("grants")
+    assert {"market:Soybeans", "market:Corn"} <= set(stages)
+    assert events[-1]["failed"] == []
+
+def test_grants_still_run_when_the_recommendation_fails(monkeypatch):
+    def fail(location):
+        raise RuntimeError("LLM unavailable")
+    grant_crops = stub_stages(monkeypatch, fail)
+    events = list(advisory.run_advisory({"latitude": 41.5, "longitude": -93.6}))
+    assert grant_crops == [None]
+    assert events[-1]["failed"] == ["recommendation"]
+    assert "grants" in [event["stage"] for event in events]
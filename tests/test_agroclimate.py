@@ -0,0 +1,47 @@
+import numpy as np
+
+from soil_climate_agent.agroclimate import DAYS_PER_YEAR, compute_indicators
+
+def climate(years=3, tmax=25.0, tmin=15.0, precip=1.0):
+    shape = (1, years, DAYS_PER_YEAR)
+    return (np.full(shape, tmax, dtype="float32"), np.full(shape, tmin, dtype="float32"),
+            np.full(shape, precip, dtype="float32"))
+
+def test_growing_degree_days_and_precipitation_totals():
+    tmax, tmin, precip = climate()
+    indicators = compute_indicators(tmax, tmin, precip, doy=0, southern=np.array([False]))
+    # (25 + 15) / 2 - 10 = 10 degree days a day
+    assert indicators["years"][0] == 3
+    assert indicators["gdd_annual"][0] == 10 * DAYS_PER_YEAR
+    assert indicators["precip_annual"][0] == DAYS_PER_YEAR
+    assert indicators["precip_monthly"][0, 0] == 31
+    assert indicators["precip_outlook"][0] == 30
+    assert indicators["frost_chance_outlook"][0] == 0
+    assert np.isnan(indicators["last_spring_frost_p50"][0])
+
+def test_years_without_data_do_not_lower_the_means():
+    tmax, tmin, precip = climate()
+    for series in (tmax, tmin, precip):
+        series[0, 0] = np.nan
+    indicators = compute_indicators(tmax, tmin, precip, doy=0, southern=np.array([False]))
+    assert indicators["years"][0] == 2
+    assert indicators["gdd_annual"][0] == 10 * DAYS_PER_YEAR
+    assert indicators["precip_annual"][0] == DAYS_PER_YEAR
+
+def test_spring_frost_dates():
+    tmax, tmin, precip = climate()
+    tmin[..., :100] = -5  # frost every day until day 99 (April 10)
+    indicators = compute_indicators(tmax, tmin, precip, doy=0, southern=np.array([False]))
+    assert indicators["last_spring_frost_p50"][0] == 99
+    assert np.isnan(indicators["first_autumn_frost_p50"][0])
+    assert indicators["frost_free_days"][0] == DAYS_PER_YEAR - 100
+    assert indicators["frost_chance_outlook"][0] == 1
+
+def test_cells_without_any_data_give_nan():
+    tmax, tmin, precip = climate()
+    tmax[:], tmin[:], precip[:] = np.nan, np.nan, np.nan
+    indicators = compute_indicators(tmax, tmin, precip, doy=0, southern=np.array([False]))
+    assert indicators["years"][0] == 0
+    assert np.isnan(indicators["gdd_annual"][0])
+    assert np.isnan(indicators["precip_annual"][0])
+    assert np.isnan(indicators["last_spring_frost_p50"][0])
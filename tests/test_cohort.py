@@ -0,0 +1,34 @@
+from grants_agent import embeddings
+from grants_agent.cohort import load_profiles, match_cohort, profile_intents
+
+PROFILES_CSV = """id,experience,farm_size,veteran,crops
+a,Beginner,20,yes,tomatoes
+b,Experienced,800,no,
+c,,,no,apples;pears
+"""
+
+def test_loads_profiles_from_csv(tmp_path):
+    path = tmp_path / "profiles.csv"
+    path.write_text(PROFILES_CSV)
+    profiles = load_profiles(str(path))
+    assert [p["id"] for p in profiles] == ["a", "b", "c"]
+    assert profiles[0]["veteran"] and not profiles[1]["veteran"]
+    assert profiles[1]["farm_size"] == 800.0 and profiles[2]["farm_size"] is None
+    assert profiles[2]["crops"] == ["apples", "pears"]
+
+def test_matches_each_profile_like_a_single_search(tmp_path):
+    path = tmp_path / "profiles.csv"
+    path.write_text(PROFILES_CSV)
+    profiles = load_profiles(str(path))
+    for top_k in (2, 3):
+        results = match_cohort(profiles, top_k=top_k, search_k=top_k)
+        assert len(results) == len(profiles)
+        for profile, matches in zip(profiles, results):
+            single, _ = embeddings.search_local_programs(profile_intents(profile), profile, top_k=top_k,
+                                                         relevance_threshold=1.5)
+            assert [embeddings.programs[m["index"]]["program_id"] for m in matches] == \
+                [p["program_id"] for p in single]
+            assert [m["match_score"] for m in matches] == [p["_match_score"] for p in single]
+
+def test_empty_cohort():
+    assert match_cohort([]) == []
@@ -0,0 +1,55 @@
+import faiss
+import numpy as np
+import pytest
+
+from grants_agent.embeddings import FAISS_INDEX_PATH, build_reduced_index, get_backend, hybrid_search, multi_search, reduce_embeddings
+
+def full_vectors():
+    index = faiss.read_index(FAISS_INDEX_PATH)
+    return index.reconstruct_n(0, index.ntotal)
+
+def test_reduced_vectors_are_truncated_and_unit_length():
+    vectors = full_vectors()
+    for dimensions in (256, 512, 1024):
+        reduced = reduce_embeddings(vectors, dimensions)
+        assert reduced.shape == (len(vectors), dimensions)
+        assert np.allclose(np.linalg.norm(reduced, axis=1), 1, atol=1e-5)
+        # Same direction as the leading components of the full vector
+        leading = vectors[:, :dimensions] / np.linalg.norm(vectors[:, :dimensions], axis=1, keepdims=True)
+        assert np.allclose(reduced, leading, atol=1e-5)
+
+def test_reduced_index_finds_the_same_top_result():
+    vectors = full_vectors()
+    full = faiss.IndexFlatL2(vectors.shape[1])
+    full.add(vectors)
+    _, full_top = full.search(vectors, 1)
+    for dimensions in (256, 1024):
+        reduced_index = build_reduced_index(dimensions)
+        assert reduced_index.d == dimensions
+        _, reduced_top = reduced_index.search(reduce_embeddings(vectors, dimensions), 1)
+        assert (reduced_top == full_top).all()
+
+def test_cannot_grow_vectors():
+    with pytest.raises(ValueError):
+        reduce_embeddings(full_vectors(), 4096)
+
+def test_hashed_results_keep_distinct_ordered_confidences():
+    backend = get_backend("hashed")
+    D, I = backend.search(backend.embed_batch(["grants for farmers markets and CSAs"]), 4)
+    distances = D[0].tolist()
+    confidences = [1 / (1 + d) for d in distances]
+    assert distances == sorted(distances)
+    assert len(set(confidences)) == len(confidences)
+    assert 0 < distances[0] < 1.2 < distances[1]
+
+def test_hashed_unrelated_query_is_not_relevant():
+    backend = get_backend("hashed")
+    D, _ = backend.search(backend.embed_batch(["What are the latest USDA grants for 2025?"]), 3)
+    assert (D[0] > 1.2).all()
+
+def test_multi_search_returns_at_most_top_k():
+    queries = ["beginning farmer loans", "organic certification", "farmers market grants", "crop insurance"]
+    hits, _ = multi_search(queries, top_k=2, relevance_threshold=2.0)
+    assert len(hits) == 2
+    assert hits[0]["rrf_score"] >= hits[1]["rrf_score"]
+    assert len(hybrid_search("farm loans", top_k=1, relevance_threshold=2.0)[0]) == 1
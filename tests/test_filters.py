@@ -0,0 +1,35 @@
+import faiss
+import numpy as np
+import pytest
+
+from grants_agent.filters import ProgramFilters, search_parameters
+
+PROGRAMS = [
+    {"program_type": "Grant", "agency": "NRCS", "metadata": {"category": "Conservation"},
+     "year_round_application": True},
+    {"program_type": "Loan", "agency": "FSA", "metadata": {"category": "Credit"},
+     "program_name": "Beginning Farmer Loans", "year_round_application": True},
+    {"program_type": "Grant", "agency": "AMS", "metadata": {"category": "Marketing"}},
+]
+
+def test_masks_combine_filters():
+    filters = ProgramFilters(PROGRAMS)
+    assert filters.mask({}) is None
+    assert filters.mask({"program_type": None, "year_round": False}) is None
+    assert filters.mask({"program_type": "grant"}).tolist() == [True, False, True]
+    assert filters.mask({"program_type": "Grant", "year_round": True}).tolist() == [True, False, False]
+    assert filters.mask({"agency": ["FSA", "AMS"]}).tolist() == [False, True, True]
+    assert filters.mask({"category": "credit", "year_round": True}).tolist() == [False, True, False]
+
+def test_unknown_filter_is_rejected():
+    with pytest.raises(ValueError):
+        ProgramFilters(PROGRAMS).mask({"state": "IA"})
+
+def test_search_parameters_restrict_faiss_to_the_mask():
+    vectors = np.eye(3, dtype="float32")
+    index = faiss.IndexFlatL2(3)
+    index.add(vectors)
+    mask = np.array([False, True, True])
+    _, ids = index.search(vectors[:1], 3, params=search_parameters(mask))
+    # Only masked-in programs come back; the rest of top_k is -1
+    assert sorted(ids[0].tolist()) == [-1, 1, 2]
@@ -0,0 +1,55 @@
+from soil_climate_agent import jobs
+from soil_climate_agent.jobs import JobQueue, JobStore
+
+def stages_cancelled_midway(store, job_ids):
+    """Runner whose job is cancelled from outside (e.g. another process) between its two stages"""
+    def run(payload):
+        yield {"stage": "first", "status": "done", "result": 1}
+        store.update(job_ids[0], status="cancelled")
+        yield {"stage": "second", "status": "done", "result": 2}
+    return run
+
+def test_cancel_between_stages_is_not_overwritten(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_ids = []
+    monkeypatch.setitem(jobs.JOB_RUNNERS, "test", (stages_cancelled_midway(store, job_ids), lambda events: events))
+    queue = JobQueue(store, workers=1)
+    job_ids.append(store.create("test", {}))
+
+    queue._run(job_ids[0], "test", {})
+
+    job = store.get(job_ids[0])
+    assert job["status"] == "cancelled"
+    assert job["result"] is None
+    assert store.active() == []
+
+def test_cancelled_job_does_not_start(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.create("advisory", {})
+    store.update(job_id, status="cancelled")
+
+    assert not store.update(job_id, status="running")
+    store.restart(job_id)
+    assert store.get(job_id)["status"] == "cancelled"
+
+def test_finished_job_cannot_be_cancelled(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store, workers=1)
+    job_id = store.create("advisory", {})
+    store.update(job_id, status="done", result={"ok": True})
+
+    assert not queue.cancel(job_id)
+    assert store.get(job_id)["status"] == "done"
+
+def test_job_with_failed_stage_is_partial_and_not_reused(tmp_path, monkeypatch):
+    def run(payload):
+        yield {"stage": "complete", "status": "error"}
+    store = JobStore(str(tmp_path / "jobs.db"))
+    monkeypatch.setitem(jobs.JOB_RUNNERS, "test", (run, lambda events: {}))
+    queue = JobQueue(store, workers=1)
+    job_id = store.create("test", {"a": 1})
+
+    queue._run(job_id, "test", {"a": 1})
+
+    assert store.get(job_id)["status"] == "partial"
+    assert store.find_finished("test", {"a": 1}, 3600) is None
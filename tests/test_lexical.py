@@ -0,0 +1,38 @@
+import numpy as np
+
+from grants_agent.lexical import RRF_K, BM25Index, reciprocal_rank_fusion
+
+PROGRAMS = [
+    {"program_name": "Farm Operating Loans", "keywords": ["operating loan", "FSA"],
+     "summary": "Loans for seed, feed and fertilizer."},
+    {"program_name": "Organic Certification Cost Share", "keywords": ["organic certification"],
+     "summary": "Reimburses organic certification costs."},
+    {"program_name": "Farmers Market Promotion Program", "keywords": ["farmers market", "CSA"],
+     "summary": "Grants for direct-to-consumer marketing."},
+]
+
+def test_bm25_ranks_exact_term_match_first():
+    index = BM25Index(PROGRAMS)
+    hits = index.search("organic certification costs", top_k=3)
+    assert hits[0][0] == 1
+    assert all(score > 0 for _, score in hits)
+
+def test_bm25_unknown_terms_score_nothing():
+    index = BM25Index(PROGRAMS)
+    assert index.search("aquaculture", top_k=3) == []
+    assert not index.score("aquaculture").any()
+
+def test_bm25_mask_excludes_programs():
+    index = BM25Index(PROGRAMS)
+    mask = np.array([True, False, True])
+    assert 1 not in [idx for idx, _ in index.search("organic certification", top_k=3, mask=mask)]
+
+def test_rrf_rewards_programs_ranked_by_several_lists():
+    fused = reciprocal_rank_fusion([1, 2], [2, 3])
+    assert max(fused, key=fused.get) == 2
+    assert fused[2] == 1 / (RRF_K + 2) + 1 / (RRF_K + 1)
+    assert fused[3] == 1 / (RRF_K + 2)
+
+def test_rrf_of_nothing_is_empty():
+    assert reciprocal_rank_fusion() == {}
+    assert reciprocal_rank_fusion([]) == {}
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from shared import llm_gateway
+from shared.llm_gateway import LLM_MAX_CONCURRENCY, ResponseCache
+
+def free_slots():
+    return llm_gateway._slots._value
+
+def failing(errors, response="ok"):
+    """create() that raises each of `errors` in turn, then returns `response`"""
+    calls = []
+    def create(**request):
+        calls.append(request)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return response
+    return create, calls
+
+def test_retries_connection_errors_then_succeeds(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_backoff", lambda attempt: 0)
+    create, calls = failing([openai.APIConnectionError(request=None)] * 2)
+    assert llm_gateway._create("test-retry", create, max_retries=3, model="m") == "ok"
+    assert len(calls) == 3
+    assert llm_gateway.stats()["test-retry"]["retries"] == 2
+    assert free_slots() == LLM_MAX_CONCURRENCY
+
+def test_gives_up_after_max_retries_and_on_other_errors(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "_backoff", lambda attempt: 0)
+    create, calls = failing([openai.APIConnectionError(request=None)] * 5)
+    with pytest.raises(openai.APIConnectionError):
+        llm_gateway._create("test-give-up", create, max_retries=1)
+    assert len(calls) == 2
+
+    create, calls = failing([ValueError("bad request")])
+    with pytest.raises(ValueError):
+        llm_gateway._create("test-give-up", create, max_retries=3)
+    assert len(calls) == 1
+    assert free_slots() == LLM_MAX_CONCURRENCY
+
+class FakeStream:
+    def __init__(self, texts):
+        self.chunks = [SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=t))])
+                       for t in texts]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+def test_stream_holds_its_slot_until_closed(monkeypatch):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda **request: FakeStream(["Hello", " farmer"]))))
+    monkeypatch.setattr(llm_gateway, "get_client", lambda: client)
+    stream = llm_gateway.stream_chat("test-stream", [{"role": "user", "content": "hi"}], cache=False)
+    assert next(stream) == "Hello"
+    assert free_slots() == LLM_MAX_CONCURRENCY - 1
+    stream.close()
+    assert free_slots() == LLM_MAX_CONCURRENCY
+
+    stream = llm_gateway.stream_chat("test-stream", [{"role": "user", "content": "hi"}], cache=False)
+    assert "".join(stream) == "Hello farmer"
+    assert free_slots() == LLM_MAX_CONCURRENCY
+
+def test_cached_responses_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"), ttl_hours=1)
+    cache.put("key", "answer")
+    assert cache.get("key") == "answer"
+    # A fresh cache (empty memory) reads the same entry from disk
+    assert ResponseCache(str(tmp_path / "llm_cache.db"), ttl_hours=1).get("key") == "answer"
+
+    later = time.time() + 2 * 3600
+    monkeypatch.setattr(llm_gateway.time, "time", lambda: later)
+    assert cache.get("key") is None
+    assert ResponseCache(str(tmp_path / "llm_cache.db"), ttl_hours=1).get("key") is None
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from soil_climate_agent.open_meteo import hourly_times, nearest_index, values_now
+
+HOURLY = {
+    "time": ["2026-05-01T10:00", "2026-05-01T11:00", "2026-05-01T12:00", "2026-05-01T13:00"],
+    "soil_temperature_0cm": [14.0, 15.5, 17.0, 18.2],
+    "soil_moisture_0_to_1cm": [0.31, 0.30, None, 0.28],
+}
+
+def at(hour, minute=0):
+    return datetime(2026, 5, 1, hour, minute, tzinfo=timezone.utc)
+
+def test_nearest_index_picks_the_closest_hour():
+    times = hourly_times(HOURLY)
+    assert nearest_index(times, at(11, 20)) == 1
+    assert nearest_index(times, at(11, 40)) == 2
+    assert nearest_index(times, at(12)) == 2
+    # Halfway goes to the earlier hour; outside the axis clamps to its ends
+    assert nearest_index(times, at(12, 30)) == 2
+    assert nearest_index(times, at(6)) == 0
+    assert nearest_index(times, at(23)) == 3
+    with pytest.raises(ValueError):
+        nearest_index(hourly_times({}), at(12))
+
+def test_values_now_reads_the_current_hour():
+    data = {"hourly": HOURLY}
+    assert values_now(data, ("soil_temperature_0cm", "soil_moisture_0_to_1cm"), at(11, 50)) == {
+        "soil_temperature_0cm": 17.0, "soil_moisture_0_to_1cm": None}
+    assert values_now(data, ("precipitation",), at(13)) == {"precipitation": None}
+    assert values_now({}, ("soil_temperature_0cm",)) == {"soil_temperature_0cm": None}
@@ -0,0 +1,36 @@
+from grants_agent.prompting import build_messages
+
+PROGRAM = {"program_id": "FSA-OL-2025", "program_name": "Farm Operating Loans",
+           "summary": "Operating loans for seed and feed.", "_match_score": 70}
+
+def history(answer_words=40, later_turns=0):
+    turns = [
+        {"role": "user", "content": "What operating loans are there?"},
+        {"role": "assistant", "text": "Farm Operating Loans cover seed and feed. " * answer_words,
+         "programs": [{"program_id": "FSA-OL-2025", "program_name": "Farm Operating Loans"}]},
+    ]
+    for i in range(later_turns):
+        turns += [{"role": "user", "content": f"Follow-up {i}"}, {"role": "assistant", "text": f"Answer {i}"}]
+    return turns
+
+def system_text(messages):
+    return messages[0]["content"]
+
+def test_program_from_verbatim_turn_is_referenced():
+    messages, stats = build_messages("How do I apply?", [PROGRAM], [], "local", history())
+    assert stats["programs_referenced"] == 1
+    assert "Already discussed earlier" in system_text(messages)
+
+def test_program_from_trimmed_turn_gets_full_block():
+    # The turn that showed it is older than the verbatim window, so it is trimmed
+    messages, stats = build_messages("How do I apply?", [PROGRAM], [], "local", history(later_turns=1))
+    assert stats["programs_referenced"] == 0
+    assert "Already discussed earlier" not in system_text(messages)
+
+def test_tight_budget_trims_history_and_drops_references():
+    _, roomy = build_messages("How do I apply?", [PROGRAM], [], "local", history(answer_words=100))
+    messages, stats = build_messages("How do I apply?", [PROGRAM], [], "local", history(answer_words=100),
+                                     budget=roomy["prompt_tokens"] - 50)
+    assert stats["programs_referenced"] == 0
+    assert "Already discussed earlier" not in system_text(messages)
+    assert all(len(m["content"]) <= 310 for m in messages[1:-1])
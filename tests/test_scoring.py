@@ -0,0 +1,42 @@
+import json
+
+from grants_agent.embeddings import PROGRAMS_PATH
+from grants_agent.scoring import EligibilityScorer
+
+with open(PROGRAMS_PATH, encoding="utf-8") as f:
+    PROGRAMS = json.load(f)
+
+def scores(profile):
+    """{program_id: score} for one profile"""
+    scorer = EligibilityScorer(PROGRAMS)
+    return dict(zip((p["program_id"] for p in PROGRAMS), scorer.score_all(profile).tolist()))
+
+def test_profile_without_needs_gets_the_base_score():
+    # Only a state filled in: nothing to match on, as with the original chat scorer
+    assert set(scores({"state": "Iowa", "beginning_farmer": False, "veteran": False}).values()) == {50}
+    assert set(scores({}).values()) == {50}
+
+def test_chat_profiles_match_the_original_scores():
+    veteran = scores({"veteran": True, "state": ""})
+    assert veteran["FSA-OL-2025"] == 70
+    assert sum(score != 50 for score in veteran.values()) == 1
+
+    both = scores({"beginning_farmer": True, "veteran": True})
+    assert both["FSA-OL-2025"] == 100
+    # One beginning-farmer rule for both apps: the Beginning Farmers loans
+    # (a "new farmers" summary) now match a chat beginner too
+    assert both["FSA-BFR-2025"] == 80
+    assert sum(score != 50 for score in both.values()) == 2
+
+def test_advisory_profiles_match_the_original_scores():
+    scorer = EligibilityScorer(PROGRAMS)
+    profiles = [
+        {"experience": "Beginner", "farm_size": 20},
+        {"experience": "Experienced", "farm_size": 600},
+    ]
+    expected = [
+        [100, 60, 90, 50, 50, 50, 50, 50],
+        [70, 60, 60, 50, 50, 50, 50, 50],
+    ]
+    assert scorer.score_many(profiles).tolist() == expected
+    assert [scorer.score_all(p).tolist() for p in profiles] == expected
@@ -0,0 +1,54 @@
+import time
+from datetime import datetime
+
+from grants_agent import search
+from grants_agent.search import QuotaAccountant, SearchCache, TokenBucket
+
+RESULTS = [{"title": "EQIP", "snippet": "Conservation funding", "link": "https://www.nrcs.usda.gov"}]
+
+def test_cache_matches_normalized_queries_and_expires(tmp_path, monkeypatch):
+    cache = SearchCache(str(tmp_path / "brave.db"), ttl_hours=1)
+    cache.put("USDA grants, Iowa!", 5, RESULTS)
+    assert cache.get("usda  grants iowa", 5) == RESULTS
+    assert cache.get("usda grants iowa", 10) is None
+
+    later = time.time() + 2 * 3600
+    monkeypatch.setattr(search.time, "time", lambda: later)
+    assert cache.get("usda grants iowa", 5) is None
+    assert cache.get("usda grants iowa", 5, allow_stale=True) == RESULTS
+
+def test_quota_is_paced_over_the_month(tmp_path):
+    quota = QuotaAccountant(str(tmp_path / "brave.db"), monthly_quota=300)
+    start_of_month = datetime(2026, 4, 1, 0)
+    assert quota.status(start_of_month) == "ok"
+    # A day's share (10) is allowed on the first day, no more
+    for _ in range(10):
+        quota.record(start_of_month)
+    assert quota.status(start_of_month) == "tight"
+    assert quota.status(datetime(2026, 4, 15)) == "ok"
+    # Each month has its own count
+    assert quota.used(datetime(2026, 5, 1)) == 0
+
+    full = QuotaAccountant(str(tmp_path / "full.db"), monthly_quota=2)
+    for _ in range(2):
+        full.record(start_of_month)
+    assert full.status(datetime(2026, 4, 30)) == "exhausted"
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    assert bucket.acquire(max_wait=0)
+    assert not bucket.acquire(max_wait=0)
+    # The next token comes free after 1/rate seconds
+    assert bucket.acquire(max_wait=1)
+
+def test_degrades_to_stale_cache_when_over_quota(tmp_path, monkeypatch):
+    cache = SearchCache(str(tmp_path / "brave.db"), ttl_hours=-1)
+    cache.put("farm loans", 5, RESULTS)
+    exhausted = QuotaAccountant(str(tmp_path / "brave.db"), monthly_quota=0)
+    monkeypatch.setattr(search, "search_cache", cache)
+    monkeypatch.setattr(search, "quota", exhausted)
+    def no_request(query, num_results):
+        raise AssertionError("Brave should not be called")
+    monkeypatch.setattr(search, "web_search_brave", no_request)
+    assert search.cached_web_search("farm loans") == (RESULTS, "stale_cache")
+    assert search.cached_web_search("crop insurance") == (None, "quota")
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from shared.singleflight import SingleFlight, coordinate_key
+
+def run_concurrently(group, key, fn):
+    """Leader and one follower on the same key; returns their results/errors once both finish"""
+    outcomes = [None, None]
+    def call(i):
+        try:
+            outcomes[i] = group.do(key, fn)
+        except Exception as e:
+            outcomes[i] = e
+    leader = threading.Thread(target=call, args=(0,))
+    leader.start()
+    while group.executed == 0:
+        time.sleep(0.001)
+    follower = threading.Thread(target=call, args=(1,))
+    follower.start()
+    while group.coalesced == 0:
+        time.sleep(0.001)
+    return outcomes, (leader, follower)
+
+def test_follower_shares_one_execution_and_gets_its_own_copy():
+    group = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"crops": ["corn"]}
+    outcomes, threads = run_concurrently(group, "key", fetch)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert outcomes[0] == outcomes[1] == {"crops": ["corn"]}
+    assert outcomes[0] is not outcomes[1]
+    assert group.stats() == {"name": "test", "executed": 1, "coalesced": 1}
+
+def test_leader_error_reaches_the_follower_and_is_not_kept():
+    group = SingleFlight("test")
+    release = threading.Event()
+    def fail():
+        release.wait(5)
+        raise RuntimeError("upstream down")
+    outcomes, threads = run_concurrently(group, "key", fail)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    # Nothing is cached: the next call runs again
+    assert group.do("key", lambda: "ok") == "ok"
+
+def test_coordinate_key_rounds_nearby_points_together():
+    assert coordinate_key(41.5012, -93.6049) == coordinate_key(41.4998, -93.6001)
+    assert coordinate_key(41.51, -93.60) != coordinate_key(41.52, -93.60)
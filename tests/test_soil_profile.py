@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from soil_climate_agent.soil_profile import PROFILE_DEPTHS, SoilProfile, parse_profile, profile_from_dict
+
+def layer(name, means, d_factor=None):
+    layer = {"name": name, "depths": [{"label": depth, "values": {"mean": mean}}
+                                      for depth, mean in zip(PROFILE_DEPTHS, means)]}
+    if d_factor is not None:
+        layer["unit_measure"] = {"d_factor": d_factor}
+    return layer
+
+RESPONSE = {"properties": {"layers": [
+    layer("clay", [200, 220, 250, 300, 310, 320], d_factor=10),
+    layer("silt", [400, 400, 380, 350, 340, 330]),
+    layer("sand", [400, 380, 370, 350, 350, 350]),
+    layer("phh2o", [65, 66, None, 70, 71, 72]),
+    layer("nitrogen", [250, 200, 150, 100, 80, 60]),
+    layer("unknown", [1, 2, 3, 4, 5, 6]),
+]}}
+
+def test_parses_units_and_missing_values():
+    profile = parse_profile(RESPONSE)
+    assert profile.values.shape == (8, 6)
+    assert profile.get("clay") == 20.0
+    assert profile.get("phh2o", "5-15cm") == 6.6
+    # Missing in the response or not requested at all
+    assert profile.get("phh2o", "15-30cm") is None
+    assert profile.get("soc") is None
+    # nitrogen's default d_factor is 100
+    assert profile.get("nitrogen") == 2.5
+    assert profile.texture() == {"clay": 20.0, "silt": 40.0, "sand": 40.0}
+    assert profile.mean("phh2o", ("0-5cm", "5-15cm", "15-30cm")) == 6.55
+    assert profile.summary()["subsoil"]["clay"] == 30.5
+
+def test_texture_needs_all_three_fractions():
+    assert parse_profile({"properties": {"layers": [layer("clay", [200] * 6)]}}).texture() == {}
+    assert parse_profile({}).texture() == {}
+
+def test_dict_round_trip():
+    profile = parse_profile(RESPONSE)
+    data = profile.to_dict()
+    assert data["units"][0] == "%"
+    assert data["values"][3][2] is None
+    restored = profile_from_dict(data)
+    np.testing.assert_array_equal(np.isnan(restored.values), np.isnan(profile.values))
+    assert restored.texture() == profile.texture()
+
+def test_rejects_mismatched_values():
+    with pytest.raises(ValueError):
+        SoilProfile(np.zeros((2, 2)))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from soil_climate_agent.soil_raster import SoilRaster, write_raster
+
+def raster(tmp_path):
+    """2 x 2 pixels of 0.5°, north-west corner at 42N 94W; the south-east pixel has no data"""
+    texture = np.array([
+        [[10, 30, 60], [30, 30, 40]],
+        [[20, 40, 40], [np.nan, np.nan, np.nan]],
+    ])
+    write_raster(texture, west=-94.0, north=42.0, pixel_width=0.5, pixel_height=0.5, directory=str(tmp_path))
+    return SoilRaster(str(tmp_path))
+
+def test_nearest_and_bilinear_lookup(tmp_path):
+    soil = raster(tmp_path)
+    assert soil.bounds == (41.0, -94.0, 42.0, -93.0)
+    assert soil.nearest([41.9, 41.6], [-93.9, -93.1]).tolist() == [[10, 30, 60], [30, 30, 40]]
+    # At a pixel centre bilinear is that pixel; between centres missing neighbours are left out
+    assert soil.bilinear([41.75], [-93.75]).tolist() == [[10, 30, 60]]
+    np.testing.assert_allclose(soil.bilinear([41.5], [-93.5])[0], [20, 100 / 3, 140 / 3], rtol=1e-5)
+
+def test_texture_at_points_without_data(tmp_path):
+    soil = raster(tmp_path)
+    assert soil.texture_at(41.75, -93.75) == {"clay": 10.0, "silt": 30.0, "sand": 60.0}
+    assert soil.texture_at(41.25, -93.25) is None
+    assert soil.texture_at(45.0, -93.5) is None
+    assert np.isnan(soil.lookup([45.0], [-93.5], method="nearest")).all()
+    with pytest.raises(ValueError):
+        soil.lookup([41.5], [-93.5], method="cubic")
+
+def test_write_raster_checks_bands(tmp_path):
+    with pytest.raises(ValueError):
+        write_raster(np.zeros((2, 2, 2)), -94.0, 42.0, 0.5, 0.5, directory=str(tmp_path))
@@ -0,0 +1,43 @@
+import numpy as np
+
+from soil_climate_agent import soil_service
+from soil_climate_agent.soil_profile import PROFILE_DEPTHS, PROFILE_PROPERTIES, SoilProfile
+
+def open_meteo(monkeypatch):
+    monkeypatch.setattr(soil_service, "_get_open_meteo_soil",
+                        lambda lat, lon: {"soil_temperature": 12.0, "soil_moisture": 25.0})
+
+def test_no_texture_is_unknown(monkeypatch):
+    open_meteo(monkeypatch)
+    monkeypatch.setattr(soil_service, "get_raster", lambda: None)
+    monkeypatch.setattr(soil_service, "fetch_profile", lambda lat, lon: None)
+    data = soil_service.get_soil_data(41.5, -93.6)["data"][0]
+    assert data["soil_texture"] == {}
+    assert data["soil_type"] == "Unknown"
+    assert data["soil_temperature"] == 12.0
+    assert data["source"] == "Open-Meteo"
+
+class FakeRaster:
+    def texture_at(self, lat, lon):
+        return {"clay": 20.0, "silt": 40.0, "sand": 40.0}
+
+def test_source_is_the_raster_when_it_covers_the_point(monkeypatch):
+    open_meteo(monkeypatch)
+    monkeypatch.setattr(soil_service, "get_raster", FakeRaster)
+    def no_request(lat, lon):
+        raise AssertionError("SoilGrids should not be queried")
+    monkeypatch.setattr(soil_service, "fetch_profile", no_request)
+    data = soil_service.get_soil_data(41.5, -93.6)["data"][0]
+    assert data["soil_type"] == "Loam"
+    assert data["soil_profile"] is None
+    assert data["source"] == "Open-Meteo & local soil raster"
+
+def test_source_is_soilgrids_without_raster(monkeypatch):
+    open_meteo(monkeypatch)
+    monkeypatch.setattr(soil_service, "get_raster", lambda: None)
+    values = np.full((len(PROFILE_PROPERTIES), len(PROFILE_DEPTHS)), np.nan)
+    values[:3, 0] = (20, 40, 40)
+    monkeypatch.setattr(soil_service, "fetch_profile", lambda lat, lon: SoilProfile(values))
+    data = soil_service.get_soil_data(41.5, -93.6)["data"][0]
+    assert data["soil_texture"] == {"clay": 20.0, "silt": 40.0, "sand": 40.0}
+    assert data["source"] == "Open-Meteo & ISRIC SoilGrids"
@@ -0,0 +1,32 @@
+import numpy as np
+
+from soil_climate_agent.suitability import CROPS, _trapezoid, rank_crops, score_snapshots
+
+def test_trapezoid_membership():
+    ranges = np.array([[10, 16, 30, 35]], dtype="float32")
+    values = np.array([5, 10, 13, 16, 25, 30, 32.5, 35, 40], dtype="float32")
+    assert _trapezoid(values, ranges)[:, 0].tolist() == [0, 0, 0.5, 1, 1, 1, 0.5, 0, 0]
+
+def test_scores_every_crop_for_every_snapshot():
+    scores, components = score_snapshots(
+        [22, np.nan], [28, np.nan], [40, np.nan], [20, np.nan], ["spring", "autumn"])
+    assert scores.shape == (2, len(CROPS))
+    assert ((scores >= 0) & (scores <= 1)).all()
+    corn = CROPS.index("Corn")
+    # Ideal spring conditions for corn; missing values are neutral, and
+    # autumn is not a corn planting season
+    assert scores[0, corn] == 1.0
+    assert components["temperature"][1, corn] == 0.5
+    assert scores[1, corn] == 0.25 * 0.5
+
+def test_ranks_in_season_crops_with_reasons():
+    ranked = rank_crops({"temperature": 22.0, "moisture": 28.0, "sand": 40.0, "clay": 20.0,
+                         "season": "spring"})
+    assert len(ranked) == 3
+    assert [r["score"] for r in ranked] == sorted((r["score"] for r in ranked), reverse=True)
+    assert ranked[0]["score"] == 1.0
+    assert "spring is a planting window" in ranked[0]["reason"]
+
+    winter = rank_crops({"temperature": np.nan, "moisture": np.nan, "sand": np.nan, "clay": np.nan,
+                         "season": "winter"}, top_k=1)[0]
+    assert winter["risk"] == "Field conditions unknown; verify the soil before planting."
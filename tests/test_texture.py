@@ -0,0 +1,37 @@
+import numpy as np
+
+from soil_climate_agent.texture import TEXTURE_CLASSES, UNKNOWN, classify_texture, texture_class
+
+def test_classifies_points_across_the_triangle():
+    cases = [
+        ((92, 5, 3), "Sand"),
+        ((82, 10, 8), "Loamy Sand"),
+        ((65, 25, 10), "Sandy Loam"),
+        ((40, 40, 20), "Loam"),
+        ((20, 65, 15), "Silt Loam"),
+        ((5, 90, 5), "Silt"),
+        ((60, 12, 28), "Sandy Clay Loam"),
+        ((30, 35, 35), "Clay Loam"),
+        ((10, 60, 30), "Silty Clay Loam"),
+        ((50, 5, 45), "Sandy Clay"),
+        ((5, 50, 45), "Silty Clay"),
+        ((20, 20, 60), "Clay"),
+    ]
+    for (sand, silt, clay), name in cases:
+        assert texture_class({"sand": sand, "silt": silt, "clay": clay}) == name
+
+def test_batch_keeps_shape_and_marks_missing_values():
+    sand = np.array([[92, 40], [np.nan, 20]])
+    silt = np.array([[5, 40], [40, 20]])
+    clay = np.array([[3, 20], [20, 60]])
+    classes = classify_texture(sand, silt, clay)
+    assert classes.shape == (2, 2)
+    assert classes[1, 0] == UNKNOWN
+    assert [TEXTURE_CLASSES[i] for i in (classes[0, 0], classes[0, 1], classes[1, 1])] == ["Sand", "Loam", "Clay"]
+
+def test_fractions_are_rescaled_to_100():
+    assert texture_class({"sand": 46, "silt": 46, "clay": 23}) == "Loam"
+
+def test_empty_or_partial_texture_is_unknown():
+    assert texture_class({}) == "Unknown"
+    assert texture_class({"sand": 40, "silt": 40}) == "Unknown"
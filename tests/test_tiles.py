@@ -0,0 +1,37 @@
+import pytest
+
+from soil_climate_agent import tiles
+from soil_climate_agent.tiles import TileStore, grid_cells, run_tile_grid, tile_result
+
+BBOX = "41.0,-94.0,41.5,-93.5"
+
+def test_grid_cells_cover_the_bbox():
+    assert grid_cells((41.0, -94.0, 41.5, -93.5), 0.25) == [(164, -376), (164, -375), (165, -376), (165, -375)]
+    with pytest.raises(ValueError):
+        grid_cells((41.5, -94.0, 41.0, -93.5), 0.25)
+
+def test_rerun_retries_only_failed_cells(tmp_path, monkeypatch):
+    store = TileStore(str(tmp_path / "tiles.db"))
+    monkeypatch.setattr(tiles, "tile_store", store)
+    calls = []
+    def analyze(lat, lon):
+        calls.append((lat, lon))
+        if (lat, lon) == (41.125, -93.875) and calls.count((lat, lon)) == 1:
+            return {"error": "weather service unavailable"}
+        return {"recommendations": [{"crop": "Corn"}]}
+    monkeypatch.setattr(tiles, "analyze_and_recommend", analyze)
+
+    first = tile_result(list(run_tile_grid({"bbox": BBOX, "resolution": 0.25}, workers=2)))
+    assert (first["total"], first["done"], first["failed"]) == (4, 3, 1)
+    assert first["errors"] == {"164:-376": "weather service unavailable"}
+    assert store.get(41.1, -93.9) is None
+
+    events = list(run_tile_grid({"bbox": BBOX, "resolution": 0.25}, workers=2))
+    assert events[-1]["status"] == "done"
+    second = tile_result(events)
+    assert (second["skipped"], second["done"], second["failed"]) == (3, 1, 0)
+    assert len(calls) == 5
+
+    tile = store.get(41.1, -93.9)
+    assert tile["recommendations"] == [{"crop": "Corn"}]
+    assert tile["tile"]["cell"] == "164:-376"